@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+# synthetic data and timing harness for the quicklook pipeline
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# time the quicklook pipeline on synthetic archives
+###############################################################################
+
+# usage (from the repository root):
+#   python -m benchmarks.bench --days 1 7 30 --engines c pyarrow
+# # every case runs in a fresh process so its peak memory is its own; results
+# # are appended to a json-lines file to track throughput across revisions
+
+# import packages
+import argparse
+import datetime as dt
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from benchmarks.synthetic import write_grimm_archive, write_quant_archive
+from quicklook import grimm, quant, timing
+from quicklook.config import SITES
+from quicklook.daily import split
+from quicklook.plotting import plot_size_dist
+
+
+# site and bins table the synthetic archives of each instrument stand in for
+SITE = {'grimm': 'wbb', 'quant': 'alta'}
+
+
+# bins table of an instrument, as its built-in site uses it
+def site_bins(instrument):
+    return pd.DataFrame(SITES[SITE[instrument]][instrument]['bins'])
+
+
+# generate one archive and time read/bin/split/plot on it (runs in its own process)
+def run_case(instrument, days, cadence, files_per_day, engine, nul_fraction, plot_days, renderers):
+    report = timing.reset()
+
+    with tempfile.TemporaryDirectory(prefix='quicklook-bench-') as root:
+        data_dir, save_dir = os.path.join(root, 'data'), os.path.join(root, 'plots')
+        os.makedirs(save_dir)
+
+        # synthetic archive for this case
+        with timing.stage('generate'):
+            if instrument == 'grimm':
+                write_grimm_archive(data_dir, days=days, cadence=cadence, files_per_day=files_per_day,
+                                    nul_fraction=nul_fraction)
+            else:
+                write_quant_archive(data_dir, days=days, cadence=cadence, files_per_day=files_per_day)
+
+        # read, format and bin
+        if instrument == 'grimm':
+            with timing.stage('read_grimm'):
+                utc, df = grimm.read_grimm(data_dir, [], save_dir, 'bench', [2024, 2025], engine=engine)
+            with timing.stage('bin', rows=len(df)):
+                df, bins = grimm.bin(df, site_bins('grimm'))
+            with timing.stage('combine', rows=len(df)):
+                df = grimm.combine(utc, df)
+        else:
+            with timing.stage('read_quant'):
+                df = quant.read_quant(data_dir, [], [2024, 2025], engine=engine, products=['opc'])[0]
+            with timing.stage('bin', rows=len(df)):
+                df, bins = quant.bin(df, site_bins('quant'), 'opc')
+
+        # split every day, but only plot the first few (plots dominate otherwise)
+        daily = list(split(df))
+        for renderer in renderers:
+            for date, day_data in daily[:plot_days]:
+                with timing.stage(f'plot_size_dist[{renderer}]', date, rows=len(day_data)):
+                    plot_size_dist(day_data, date, bins, 0, SITES[SITE[instrument]][instrument]['max_count'],
+                                   save_dir, 'bench', renderer)
+
+    case = {'instrument': instrument, 'days': days, 'cadence': cadence, 'files_per_day': files_per_day,
+            'engine': engine, 'nul_fraction': nul_fraction, 'rows': len(df)}
+    stages = report.totals()
+    for total in stages.values():
+        total['rows_per_s'] = round(total['rows'] / total['seconds']) if total['seconds'] and total['rows'] else None
+    return {**case, 'peak_rss_mb': timing.peak_rss_mb(), 'stages': stages}
+
+
+# short git revision of the working tree (None outside a git checkout)
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# print one line per stage of a finished case
+def print_case(result):
+    print(f"{result['instrument']} {result['days']} d @ {result['cadence']} x{result['files_per_day']} files, "
+          f"{result['engine']}: {result['rows']} rows, peak {result['peak_rss_mb']} MB")
+    for name, total in result['stages'].items():
+        rate = f"{total['rows_per_s']:>12,} rows/s" if total['rows_per_s'] else ''
+        print(f"  {name:<26} {total['seconds']:9.3f} s {rate}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the quicklook pipeline on synthetic data.')
+    parser.add_argument('--instruments', nargs='+', default=['grimm', 'quant'], choices=['grimm', 'quant'])
+    parser.add_argument('--days', nargs='+', type=int, default=[1, 7, 30], help='archive sizes in days')
+    parser.add_argument('--grimm-cadence', default='6s')
+    parser.add_argument('--quant-cadence', default='60s')
+    parser.add_argument('--files-per-day', type=int, default=1)
+    parser.add_argument('--engines', nargs='+', default=['c', 'pyarrow'], choices=['c', 'pyarrow'])
+    parser.add_argument('--nul-fraction', type=float, default=0.001, help='share of GRIMM lines with \\x00 bytes')
+    parser.add_argument('--plot-days', type=int, default=1, help='days to plot per case (0 skips plotting)')
+    parser.add_argument('--renderers', nargs='+', default=['contour', 'raster'], choices=['contour', 'raster'])
+    parser.add_argument('--output', default=os.path.join('benchmarks', 'results.jsonl'),
+                        help='json-lines file the results are appended to')
+    args = parser.parse_args()
+
+    run = {'started': dt.datetime.now().isoformat(timespec='seconds'), 'revision': git_revision()}
+    context = mp.get_context('spawn')
+
+    with open(args.output, 'a') as output:
+        for instrument in args.instruments:
+            cadence = args.grimm_cadence if instrument == 'grimm' else args.quant_cadence
+            for days in args.days:
+                for engine in args.engines:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        result = pool.submit(run_case, instrument, days, cadence, args.files_per_day, engine,
+                                             args.nul_fraction, args.plot_days, args.renderers).result()
+                    print_case(result)
+                    output.write(json.dumps({**run, **result}) + '\n')
+                    output.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# synthetic GRIMM and Quant archives for benchmarking
+###############################################################################
+
+# import packages
+import os
+import numpy as np
+import pandas as pd
+
+from quicklook.parsing import GRIMM_CHANNELS, QUANT_PRODUCTS
+
+
+# time stamp layout written by both loggers
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# count matrix (samples x channels) shaped like ambient aerosol: a lognormal
+# size distribution falling off with channel, a diurnal cycle and noise
+def synthetic_counts(times, channels, peak, rng):
+    channel = np.arange(channels)
+    shape = peak * np.exp(-0.5 * ((channel - 2) / (channels / 5)) ** 2)
+    hours = (times.hour + times.minute / 60).to_numpy()
+    diurnal = 1 + 0.5 * np.sin(2 * np.pi * (hours - 9) / 24)
+    noise = rng.lognormal(0, 0.3, (len(times), channels))
+    return np.round(shape[None, :] * diurnal[:, None] * noise)
+
+
+# split one day of samples into files_per_day consecutive pieces
+def day_pieces(day, cadence, files_per_day):
+    times = pd.date_range(day, day + pd.Timedelta(days=1), freq=cadence, inclusive='left')
+    return [piece for piece in np.array_split(np.arange(len(times)), files_per_day) if len(piece)], times
+
+
+# write a GRIMM archive: <root>/<year>/<YYYYMMDD>[_n].csv, headerless, time + 32 channels
+# # nul_fraction of the lines get \x00 bytes injected into their time stamp,
+# # the way the GRIMM logger occasionally corrupts them
+def write_grimm_archive(root, start='2024-06-01', days=1, cadence='6s', files_per_day=1, nul_fraction=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    file_paths = []
+
+    for day in pd.date_range(start, periods=days, freq='D'):
+        pieces, times = day_pieces(day, cadence, files_per_day)
+        counts = synthetic_counts(times, GRIMM_CHANNELS, 60000, rng).astype(np.int64)
+        stamps = times.strftime(TIME_FORMAT).to_numpy()
+
+        for number, piece in enumerate(pieces):
+            lines = [f"{stamps[i]},{','.join(map(str, counts[i]))}\n".encode() for i in piece]
+
+            # corrupt a random subset of the time stamps
+            for i in np.flatnonzero(rng.random(len(lines)) < nul_fraction):
+                cut = int(rng.integers(1, 19))
+                lines[i] = lines[i][:cut] + b'\x00' * int(rng.integers(1, 40)) + lines[i][cut:]
+
+            suffix = f'_{number}' if files_per_day > 1 else ''
+            file_paths.append(_write(root, str(day.year), f'{day:%Y%m%d}{suffix}.csv', b''.join(lines)))
+
+    return file_paths
+
+
+# write a Quant archive: <root>/<year>/raw/<YYYY-MM-DD>[_n].csv with an index
+# column, timestamp, timestamp_local and the opc/neph bin and pm columns
+def write_quant_archive(root, start='2024-06-01', days=1, cadence='60s', files_per_day=1, seed=0):
+    rng = np.random.default_rng(seed)
+    file_paths = []
+
+    for day in pd.date_range(start, periods=days, freq='D'):
+        pieces, times = day_pieces(day, cadence, files_per_day)
+        opc = synthetic_counts(times, 24, 10000, rng)
+        neph = synthetic_counts(times, 6, 200, rng) / 100
+
+        df = pd.DataFrame({'timestamp': times.strftime(TIME_FORMAT),
+                           'timestamp_local': (times - pd.Timedelta(hours=7)).strftime(TIME_FORMAT)})
+        for product, counts in (('opc', opc), ('neph', neph)):
+            bins = [column for column in QUANT_PRODUCTS[product] if '_bin' in column]
+            df[bins] = counts
+
+            # mass concentrations loosely follow the total counts
+            total = counts.sum(axis=1)
+            for scale, column in zip((1e-4, 3e-4, 1e-3), (c for c in QUANT_PRODUCTS[product] if '_pm' in c)):
+                df[column] = np.round(total * scale, 2)
+
+        for number, piece in enumerate(pieces):
+            suffix = f'_{number}' if files_per_day > 1 else ''
+            text = df.iloc[piece].to_csv().encode()
+            file_paths.append(_write(root, os.path.join(str(day.year), 'raw'), f'{day:%Y-%m-%d}{suffix}.csv', text))
+
+    return file_paths
+
+
+# write bytes to <root>/<subdirectory>/<name>
+def _write(root, subdirectory, name, data):
+    directory = os.path.join(root, subdirectory)
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, name)
+    with open(file_path, 'wb') as csv_file:
+        csv_file.write(data)
+    return file_path
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+# shared helpers for the GRIMM and Quant quicklook scripts
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+
+# python -m quicklook <site> <instrument> [options] (see quicklook.cli)
+import sys
+
+from quicklook.cli import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# append-only binary archive of raw counts with time-range random access
+###############################################################################
+
+# import packages
+import os
+import numpy as np
+import pandas as pd
+
+from quicklook import timing
+from quicklook.atomic_json import read_json, write_json
+from quicklook.parsing import GRIMM_CHANNELS, MST_OFFSET, QUANT_PRODUCTS, QUANT_TIME_COLUMN
+
+
+# bump whenever the layout of the archive files changes
+ARCHIVE_VERSION = 1
+
+# time column and channel columns of the frames each instrument's parsers
+# return (read_grimm_file, read_quant_file), in the order they are stored
+LAYOUTS = {
+    'grimm': (0, list(range(1, GRIMM_CHANNELS + 1))),
+    'quant': (QUANT_TIME_COLUMN, QUANT_PRODUCTS['opc'] + QUANT_PRODUCTS['neph']),
+}
+
+# rows gathered from csv files before they are appended in one go
+BATCH_ROWS = 1_000_000
+
+# NaT as epoch nanoseconds
+NAT_NS = np.iinfo(np.int64).min
+
+
+# int64 epoch nanoseconds (UTC) of a column of naive UTC times, NaT as NAT_NS
+def epoch_ns(times):
+    return pd.Series(times).to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+# epoch nanoseconds of a time bound (datetime, date or string; None = open)
+def bound_ns(value):
+    if value is None:
+        return None
+    return pd.Timestamp(value).as_unit('ns').value
+
+
+# raw counts of one instrument as two flat files opened with np.memmap:
+# # <path>/<instrument>/times.i8 (int64 epoch ns, UTC) and values.f4 (float32,
+# # one row of LAYOUTS channels per time stamp), plus index.json holding the
+# # row count, the time-sorted segments [first row, end row, first ns, last ns]
+# # and the csv files ingested so far. Rows are only ever appended: a segment
+# # continues while appended rows stay in time order, so an archive filled in
+# # file order is one sorted run that a time range is cut out of by binary search
+class Archive:
+
+    def __init__(self, path, instrument):
+        if instrument not in LAYOUTS:
+            raise ValueError(f"Unknown instrument '{instrument}', expected one of {list(LAYOUTS)}")
+        self.directory = os.path.join(path, instrument)
+        self.instrument = instrument
+        self.time_column, self.columns = LAYOUTS[instrument]
+        self.rows = 0
+        self.segments = []
+        self.files = {}
+        self._maps = None
+
+        # an unreadable or outdated index means the archive is filled again
+        # (the data files are cut back to the rows the index knows about)
+        saved = read_json(self.index_path)
+        if saved.get('version') == ARCHIVE_VERSION and saved.get('columns') == [str(c) for c in self.columns]:
+            self.rows, self.segments, self.files = saved['rows'], saved['segments'], saved['files']
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, 'index.json')
+
+    @property
+    def times_path(self):
+        return os.path.join(self.directory, 'times.i8')
+
+    @property
+    def values_path(self):
+        return os.path.join(self.directory, 'values.f4')
+
+    # append the rows of csv files not ingested yet, and the rows added to
+    # files that grew since (rows after the last time stamp taken from them)
+    # # read_file parses one file into a frame laid out as in LAYOUTS; files are
+    # # taken in name order, so date-named files append as one sorted run
+    def ingest(self, file_paths, read_file):
+        batch, batch_rows, appended = [], 0, 0
+
+        for file_path in sorted(file_paths):
+            stat = os.stat(file_path)
+            known = self.files.get(file_path)
+            if known is not None and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime:
+                continue
+
+            df = read_file(file_path)
+            times = epoch_ns(df[self.time_column])
+            last = int(times.max(initial=NAT_NS))
+            if known is not None:
+                df = df[times > known['last']]
+                last = max(last, known['last'])
+            self.files[file_path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'last': last}
+
+            batch.append(df)
+            batch_rows += len(df)
+            if batch_rows >= BATCH_ROWS:
+                appended += self.append(pd.concat(batch, ignore_index=True))
+                batch, batch_rows = [], 0
+
+        if batch:
+            appended += self.append(pd.concat(batch, ignore_index=True))
+        self.save()
+        return appended
+
+    # append the rows of a parsed frame (rows without a time stamp are dropped)
+    def append(self, df):
+        times = epoch_ns(df[self.time_column])
+        valid = times != NAT_NS
+        times = times[valid]
+        values = df[self.columns].to_numpy(dtype=np.float32)[valid]
+        if not len(times):
+            return 0
+
+        with timing.stage('archive', self.instrument, rows=len(times)):
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], np.ascontiguousarray(values[order])
+
+            # cut off anything an interrupted append left behind, then append
+            os.makedirs(self.directory, exist_ok=True)
+            for path, array in ((self.times_path, times), (self.values_path, values)):
+                with open(path, 'ab') as f:
+                    f.truncate(self.rows * array[:1].nbytes)
+                    f.write(array.tobytes())
+
+            # extend the last segment while the rows stay in time order
+            first_row, end_row = self.rows, self.rows + len(times)
+            if self.segments and self.segments[-1][3] <= times[0]:
+                self.segments[-1][1] = end_row
+                self.segments[-1][3] = int(times[-1])
+            else:
+                self.segments.append([first_row, end_row, int(times[0]), int(times[-1])])
+            self.rows = end_row
+            self._maps = None
+
+        self.save()
+        return len(times)
+
+    # write the index (via a temporary file so a crash never corrupts it); rows
+    # appended before a crash without their index entry are simply cut off later
+    def save(self):
+        write_json(self.index_path, {'version': ARCHIVE_VERSION, 'instrument': self.instrument,
+                                     'columns': [str(c) for c in self.columns], 'rows': self.rows,
+                                     'segments': self.segments, 'files': self.files})
+
+    # read-only memmaps of the time stamps and the channel matrix
+    def arrays(self):
+        if self._maps is None:
+            if not self.rows:
+                return np.empty(0, dtype=np.int64), np.empty((0, len(self.columns)), dtype=np.float32)
+            self._maps = (np.memmap(self.times_path, dtype=np.int64, mode='r', shape=(self.rows,)),
+                          np.memmap(self.values_path, dtype=np.float32, mode='r',
+                                    shape=(self.rows, len(self.columns))))
+        return self._maps
+
+    # time stamps (int64 epoch ns) and channel rows within the UTC times
+    # start..end (end excluded, None = open), in time order
+    # # a range inside one segment comes back as views of the memmaps (nothing
+    # # is read until used); ranges spanning segments are gathered and sorted
+    def slice(self, start=None, end=None):
+        times, values = self.arrays()
+        lo, hi = bound_ns(start), bound_ns(end)
+
+        parts = []
+        for first_row, end_row, first, last in self.segments:
+            if (lo is not None and last < lo) or (hi is not None and first >= hi):
+                continue
+            segment = times[first_row:end_row]
+            i = np.searchsorted(segment, lo) if lo is not None else 0
+            j = np.searchsorted(segment, hi) if hi is not None else len(segment)
+            if j > i:
+                parts.append((first_row + i, first_row + j))
+
+        if len(parts) == 1:
+            (i, j), = parts
+            return times[i:j], values[i:j]
+        if not parts:
+            return times[:0], values[:0]
+
+        rows = np.concatenate([np.arange(i, j) for i, j in parts])
+        rows = rows[np.argsort(times[rows], kind='stable')]
+        return times[rows], values[rows]
+
+    # time stamps and channel rows of one MST day (a date or 'YYYY-MM-DD')
+    def day(self, date):
+        start = np.datetime64(str(date), 'D') + MST_OFFSET
+        return self.slice(start, start + np.timedelta64(1, 'D'))
+
+    # the rows within start..end as a frame shaped like the parsers' output
+    # (naive UTC time stamps in the time column, float32 channels), ready for
+    # format_grimm / format_quant
+    def frame(self, start=None, end=None):
+        times, values = self.slice(start, end)
+        df = pd.DataFrame(np.asarray(values), columns=self.columns)
+        df.insert(0, self.time_column, times.view('datetime64[ns]'))
+        return df
+
+    # rewrite the archive as one time-sorted segment (after files were ingested
+    # out of time order), gathering the channel matrix in blocks
+    def compact(self, block_rows=BATCH_ROWS):
+        if len(self.segments) <= 1:
+            return
+        times, values = self.arrays()
+        order = np.argsort(times, kind='stable')
+
+        with timing.stage('compact', self.instrument, rows=self.rows):
+            with open(self.times_path + '.tmp', 'wb') as f:
+                f.write(times[order].tobytes())
+            with open(self.values_path + '.tmp', 'wb') as f:
+                for i in range(0, len(order), block_rows):
+                    f.write(values[order[i:i + block_rows]].tobytes())
+            self._maps = None
+            os.replace(self.times_path + '.tmp', self.times_path)
+            os.replace(self.values_path + '.tmp', self.values_path)
+            self.segments = [[0, self.rows, int(times[order[0]]), int(times[order[-1]])]]
+        self.save()
+
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# json state files (manifests and indexes) read and written safely
+###############################################################################
+
+# import packages
+import json
+import os
+
+
+# read a saved json file into a dict
+# # a missing or unreadable file (e.g. one cut short by a killed run) reads as
+# # an empty dict, so the caller simply starts over
+def read_json(path):
+    if path is None or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return saved if isinstance(saved, dict) else {}
+
+
+# write a dict as json (via a temporary file so a crash never corrupts it)
+def write_json(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# size bin specifications and dN/dlogDp normalization
+###############################################################################
+
+# import packages
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+# per-sample totals added next to the dN/dlogDp columns: number (n/cm3),
+# surface (µm2/cm3) and volume (µm3/cm3) concentration
+MOMENT_COLUMNS = ['N_total', 'S_total', 'V_total']
+
+
+# read-only float array
+def _frozen(values):
+    array = np.array(values, dtype=float)
+    array.flags.writeable = False
+    return array
+
+
+# the size bins of one instrument, built once from a bins table ('Bin Number'
+# and 'Size (µm)' of every lower edge, plus a last row for the upper edge)
+# # columns are the data columns holding each bin's counts; edges, dp (mean
+# # diameters) and dlogdp are read-only arrays, so a spec can be shared freely
+@dataclass(frozen=True, eq=False)
+class BinSpec:
+    names: tuple
+    columns: tuple
+    edges: np.ndarray
+    dp: np.ndarray
+    dlogdp: np.ndarray
+
+    # spec of a bins table; prefix names the count columns '<prefix>_<Bin Number>'
+    # (e.g. 'opc' for 'opc_bin0'), without one the columns are the bin numbers
+    @classmethod
+    def from_table(cls, bins, prefix=None):
+        names = tuple(bins['Bin Number'].iloc[:-1])
+        edges = _frozen(bins['Size (µm)'])
+        return cls(
+            names=names,
+            columns=tuple(f'{prefix}_{name}' if prefix else name for name in names),
+            edges=edges,
+            dp=_frozen((edges[:-1] + edges[1:]) / 2),
+            dlogdp=_frozen(np.diff(np.log10(edges))),
+        )
+
+    # the bins table without the upper edge row, with Dp and dlogDp columns
+    def table(self):
+        return pd.DataFrame({
+            'Bin Number': list(self.names),
+            'Size (µm)': self.edges[:-1],
+            'Dp': self.dp,
+            'dlogDp': self.dlogdp,
+        })
+
+    # divide the count columns of df by dlogDp and name them by their Dp
+    # (other columns are kept as they are), adding the MOMENT_COLUMNS totals
+    # # the whole count matrix is normalized in one broadcast and the totals come
+    # # from one matrix product over the same counts; channels without a finite
+    # # count (e.g. zero inlet efficiency) are left out of the totals
+    def normalize(self, df, moments=True):
+        present = [i for i, column in enumerate(self.columns) if column in df.columns]
+        columns = [self.columns[i] for i in present]
+        dp = self.dp[present]
+
+        # work in the dtype of the counts (float32 as parsed) to avoid a float64 copy
+        counts = df[columns].to_numpy()
+        dtype = counts.dtype if counts.dtype.kind == 'f' else np.dtype(float)
+        counts = counts.astype(dtype, copy=False)
+        parts = [df.drop(columns=columns), pd.DataFrame(counts / self.dlogdp[present].astype(dtype),
+                                                        index=df.index, columns=dp)]
+
+        if moments and columns:
+            weights = np.stack([np.ones_like(dp), np.pi * dp ** 2, np.pi / 6 * dp ** 3], axis=1).astype(dtype)
+            totals = counts @ weights
+            if not np.isfinite(totals).all():
+                finite = np.isfinite(counts)
+                whole = finite.all(axis=0)
+                totals = counts[:, whole] @ weights[whole]
+                totals += np.where(finite[:, ~whole], counts[:, ~whole], 0) @ weights[~whole]
+                totals[~finite.any(axis=1)] = np.nan
+            parts.append(pd.DataFrame(totals, index=df.index, columns=MOMENT_COLUMNS))
+
+        # keep the other columns where they were, with the bins in place of the counts
+        result = pd.concat(parts, axis=1)
+        order = [self.dp[self.columns.index(column)] if column in columns else column for column in df.columns]
+        if list(result.columns[:len(order)]) != order:
+            result = result[order + list(result.columns[len(order):])]
+
+        return result
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# on-disk cache of binned daily data
+###############################################################################
+
+# import packages
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from quicklook.file_index import day_in_window
+
+
+# bump whenever the layout of the cached .npz files changes
+CACHE_VERSION = 2
+
+# time columns stored as int64 epoch nanoseconds (plus their time zone)
+TIME_COLUMNS = ['Time_UTC', 'Time_MST']
+
+
+# fingerprint the processing settings (inlet efficiencies, bin table and
+# duplicate time stamp policy)
+def settings_key(eff, bins, duplicates='first'):
+    settings = {
+        'version': CACHE_VERSION,
+        'eff': [float(e) for e in eff],
+        'bins': [[str(b), float(s)] for b, s in zip(bins['Bin Number'], bins['Size (µm)'])],
+        'duplicates': duplicates,
+    }
+    return hashlib.sha1(json.dumps(settings).encode()).hexdigest()
+
+
+# fingerprint one MST day: the settings plus every source file feeding it
+def day_key(manifest, date, settings):
+    sources = sorted((file_path, manifest.files[file_path]['sha1']) for file_path in manifest.files_for_days([date]))
+    return hashlib.sha1(json.dumps([settings, sources]).encode()).hexdigest()
+
+
+# location of one cached day: <cache_dir>/<instrument>/<year>/<date>.npz
+def day_path(cache_dir, instrument, date):
+    return os.path.join(cache_dir, instrument, date[:4], f'{date}.npz')
+
+
+# store one day of binned data
+def write_day(cache_dir, instrument, date, day_data, key):
+    
+    # split the frame into time columns and one float matrix of everything else
+    columns = list(day_data.columns)
+    value_columns = [c for c in columns if c not in TIME_COLUMNS]
+    arrays = {
+        'key': np.array(key),
+        'columns': np.array([repr(c) if isinstance(c, float) else c for c in columns]),
+        'is_dp': np.array([isinstance(c, float) for c in columns]),
+        'values': day_data[value_columns].to_numpy(dtype=float),
+    }
+    for column in TIME_COLUMNS:
+        times = day_data[column]
+        arrays[column] = times.to_numpy(dtype='datetime64[ns]').view('int64')
+        arrays[column + '_tz'] = np.array(str(times.dt.tz) if times.dt.tz is not None else '')
+    
+    # write via a temporary file so readers never see a partial day
+    path = day_path(cache_dir, instrument, date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+# check if a day is cached under the given key (without loading its data)
+def is_cached(cache_dir, instrument, date, key):
+    path = day_path(cache_dir, instrument, date)
+    if not os.path.exists(path):
+        return False
+    
+    with np.load(path) as cached:
+        return str(cached['key']) == key
+
+
+# load one cached day, or None when it is missing or out of date
+def read_day(cache_dir, instrument, date, key):
+    path = day_path(cache_dir, instrument, date)
+    if not os.path.exists(path):
+        return None
+    
+    with np.load(path) as cached:
+        if str(cached['key']) != key:
+            return None
+        
+        # restore the original column labels (Dp midpoints are floats)
+        columns = [float(c) if is_dp else str(c) for c, is_dp in zip(cached['columns'], cached['is_dp'])]
+        value_columns = [c for c in columns if c not in TIME_COLUMNS]
+        day_data = pd.DataFrame(cached['values'], columns=value_columns)
+        
+        for column in TIME_COLUMNS:
+            tz = str(cached[column + '_tz'])
+            times = pd.Series(cached[column].view('datetime64[ns]'))
+            day_data[column] = times.dt.tz_localize('UTC').dt.tz_convert(tz) if tz else times
+    
+    return day_data[columns]
+
+
+# cache each (date, day_data) pair under its current key as it passes through
+def store_days(cache_dir, instrument, daily_data, manifest, settings):
+    for date, day_data in daily_data:
+        write_day(cache_dir, instrument, date, day_data, day_key(manifest, date, settings))
+        yield date, day_data
+
+
+# list the days known to the manifest (within start..end) that are cached
+# # days missing from the cache (or stale) are marked affected so the next
+# # manifest.read() re-parses their csv files instead
+def cached_days(cache_dir, instrument, manifest, settings, start=None, end=None):
+    dates = []
+    known_days = sorted(set(day for entry in manifest.files.values() for day in entry['days']
+                            if day_in_window(day, start, end)))
+    
+    for date in known_days:
+        if is_cached(cache_dir, instrument, date, day_key(manifest, date, settings)):
+            dates.append(date)
+        else:
+            manifest.affected_days.add(date)
+    
+    return dates
+
+
+# lazily load cached days, skipping the ones re-parsed on this run
+def read_days(cache_dir, instrument, dates, manifest, settings):
+    for date in dates:
+        if date in manifest.affected_days:
+            continue
+        day_data = read_day(cache_dir, instrument, date, day_key(manifest, date, settings))
+        if day_data is not None:
+            yield date, day_data
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# command line interface
+###############################################################################
+
+# usage (from the repository root):
+#   python -m quicklook wbb grimm --start 2024-06-01 --end 2024-06-30
+#   python -m quicklook alta quant --config alta.json --output-dir /scratch/alta
+#   python -m quicklook wbb grimm --watch --interval 30
+# # the reading and plotting modules (pandas, matplotlib) are only imported once
+# # the arguments and settings check out, so --help and --dry-run return at once
+
+# import packages
+import argparse
+import json
+import sys
+
+from quicklook.config import INSTRUMENTS, load_settings
+from quicklook.file_index import parse_day
+
+
+# command line options
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m quicklook',
+                                     description='Plot daily GRIMM and Quant OPC size distributions.')
+    parser.add_argument('site', help="site name, e.g. 'wbb' or 'alta' (or one defined in --config)")
+    parser.add_argument('instrument', choices=INSTRUMENTS, help='instrument to plot')
+    parser.add_argument('--start', help="first MST day to plot: YYYY-MM-DD, 'today' or 'yesterday'")
+    parser.add_argument('--end', help="last MST day to plot: YYYY-MM-DD, 'today' or 'yesterday'")
+    parser.add_argument('--output-dir', help="directory of the plots and run files (the site's save_dir)")
+    parser.add_argument('--data-dir', help="directory of the instrument's year folders (the site's data_dir)")
+    parser.add_argument('--config', help='json file of settings and sites (see quicklook.config.read_config)')
+    parser.add_argument('--watch', action='store_true', help="keep re-plotting today as the instrument's files grow")
+    parser.add_argument('--interval', type=float, default=60, help='seconds between polls in --watch mode')
+    parser.add_argument('--archive', action='store_true',
+                        help="append new csv rows to the binary archive (archive_dir) instead of plotting")
+    parser.add_argument('--dry-run', action='store_true', help='print the resolved settings and exit')
+    return parser
+
+
+# run the command line (argv defaults to sys.argv[1:]); returns the exit status,
+# 1 if any day failed to plot
+# # ignore_unknown skips options the parser does not know (e.g. from an IDE)
+def main(argv=None, ignore_unknown=False):
+    parser = build_parser()
+    if ignore_unknown:
+        args, _ = parser.parse_known_args(argv)
+    else:
+        args = parser.parse_args(argv)
+
+    try:
+        settings = load_settings(args.site, args.instrument, args.config, save_dir=args.output_dir,
+                                 data_dir=args.data_dir)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    # limit the run to these MST days (None = whole archive)
+    try:
+        start, end = parse_day(args.start), parse_day(args.end)
+    except ValueError as error:
+        parser.error(f'invalid --start/--end: {error}')
+
+    if args.dry_run:
+        window = {'start': start and start.isoformat(), 'end': end and end.isoformat()}
+        json.dump({**settings, **window}, sys.stdout, indent=1, ensure_ascii=False)
+        print()
+        return 0
+
+    # the heavy imports happen only now
+    from quicklook import pipeline
+
+    # fill the binary archive of raw counts instead of plotting
+    if args.archive:
+        archive = pipeline.update_archive(settings)
+        print(f"Archive {archive.directory} holds {archive.rows} rows in {len(archive.segments)} segment(s)")
+        return 0
+
+    # follow today's growing files and keep re-plotting today instead of a batch run
+    if args.watch:
+        pipeline.watch(settings, args.interval)
+        return 0
+
+    failures = pipeline.run(settings, start, end)
+    return 1 if failures else 0
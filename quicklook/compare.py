@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# time-aligned comparison of two instruments on common diameters
+###############################################################################
+
+# usage (from the repository root):
+#   python -m quicklook.compare wbb/grimm alta/quant --start 2024-06-01 --end 2024-06-30
+#   python -m quicklook.compare wbb/grimm alta/quant --tolerance 30s --rule 1min --plots difference
+# # the binned days of both instruments come from their day caches (so run
+# # each instrument first). Every sample of the sparser instrument is paired
+# # with the nearest sample of the other within the tolerance (a merge_asof on
+# # the sorted times, linear in the samples), both are rebinned onto common
+# # diameter bins by the overlap of their 'Size (µm)' edges in log(Dp), and
+# # every day gets overlay and difference plots plus a row of statistics
+
+# import packages
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from quicklook import cache, timing
+from quicklook.bins import BinSpec
+from quicklook.config import load_settings
+from quicklook.daily import resample_day
+from quicklook.file_index import parse_day
+from quicklook.manifest import Manifest
+from quicklook.pipeline import product_name
+from quicklook.plotting import hour_ticks, new_figure, resolve_profiles, save_figure
+
+# comparison plots (see PLOTS below)
+PLOT_KINDS = ('overlay', 'difference')
+
+# samples further apart than this are not paired
+TOLERANCE = '30s'
+
+# limits of the log10(a / b) colour scale of the difference plots
+LOG_RATIO_LIMIT = 1.0
+
+
+# common bin edges of two edge arrays: the edges of the coarser instrument
+# within the diameter range both cover, closed by the ends of that range
+def common_edges(edges_a, edges_b):
+    lo, hi = max(edges_a[0], edges_b[0]), min(edges_a[-1], edges_b[-1])
+    if lo >= hi:
+        raise ValueError(f"The size ranges {edges_a[0]}-{edges_a[-1]} and {edges_b[0]}-{edges_b[-1]} µm do not overlap")
+    inner = [edges[(edges > lo) & (edges < hi)] for edges in (edges_a, edges_b)]
+    return np.concatenate(([lo], min(inner, key=len), [hi]))
+
+
+# matrix taking dN/dlogDp on the source bins to dN/dlogDp on the target bins
+# (values @ matrix): each source bin's particles are spread evenly in log(Dp)
+# and shared out by how much of the bin every target bin overlaps
+def overlap_matrix(source, target):
+    log_source, log_target = np.log10(source), np.log10(target)
+    lo = np.maximum(log_source[:-1, None], log_target[None, :-1])
+    hi = np.minimum(log_source[1:, None], log_target[None, 1:])
+    overlap = np.clip(hi - lo, 0, None)
+    return overlap / np.diff(log_target)[None, :]
+
+
+# dN/dlogDp (samples x source bins) on the target bins; a target bin fed by a
+# non-finite value (e.g. a zero inlet efficiency) is NaN
+def rebin(values, matrix):
+    finite = np.isfinite(values)
+    result = np.where(finite, values, 0) @ matrix
+    result[(~finite).astype(float) @ (matrix > 0) > 0] = np.nan
+    return result
+
+
+# rows of a and b paired by nearest time within tolerance_ns (int64 epoch ns,
+# both sorted); every sample of the sparser series looks up the other one
+def align(times_a, times_b, tolerance_ns):
+    swap = len(times_a) > len(times_b)
+    left, right = (times_b, times_a) if swap else (times_a, times_b)
+    matched = pd.merge_asof(pd.DataFrame({'time': left}), pd.DataFrame({'time': right, 'row': np.arange(len(right))}),
+                            on='time', direction='nearest', tolerance=tolerance_ns)
+    rows_left = np.flatnonzero(matched['row'].notna())
+    rows_right = matched['row'].to_numpy()[rows_left].astype(np.int64)
+    return (rows_right, rows_left) if swap else (rows_left, rows_right)
+
+
+# sorted epoch ns (UTC), MST wall-clock times and dN/dlogDp on the common bins
+# of one day of binned data (see BinSpec for spec)
+# # bins of the spec missing from the day (e.g. the Quant neph product holds
+# # only some of the bins table's channels) are NaN, so the common bins they
+# # feed are NaN rather than undercounted
+def day_arrays(day_data, spec, matrix):
+    present = [i for i, dp in enumerate(spec.dp) if dp in day_data.columns]
+    if not present:
+        raise ValueError(f"The day holds none of the {len(spec.dp)} size bins of the settings")
+    utc = day_data['Time_UTC'].to_numpy(dtype='datetime64[ns]')
+    order = np.argsort(utc, kind='stable')
+    mst = day_data['Time_MST']
+    if mst.dt.tz is not None:
+        mst = mst.dt.tz_localize(None)
+    values = np.full((len(day_data), len(spec.dp)), np.nan)
+    values[:, present] = day_data[list(spec.dp[present])].to_numpy(dtype=float)
+    return utc.view('int64')[order], mst.to_numpy()[order], rebin(values[order], matrix)
+
+
+# one instrument of a comparison: its settings, size bins and cached days
+class Source:
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.title = settings['title']
+        self.name = product_name(settings)
+        self.spec = BinSpec.from_table(pd.DataFrame(settings['bins']))
+
+        # only days cached under the current settings and source files count
+        if not settings['manifest_path'] or not settings['cache_dir']:
+            raise ValueError(f"{self.title}: comparing needs the day cache (manifest_path and cache_dir)")
+        self.key = cache.settings_key(settings['efficiencies'], pd.DataFrame(settings['bins']),
+                                      settings['duplicate_policy'])
+        self.manifest = Manifest(settings['manifest_path'], self.key)
+
+    # cached MST days within start..end
+    def days(self, start=None, end=None):
+        return cache.cached_days(self.settings['cache_dir'], self.name, self.manifest, self.key, start, end)
+
+    # one cached day (None if it is missing)
+    def read_day(self, date):
+        return cache.read_day(self.settings['cache_dir'], self.name, date, cache.day_key(self.manifest, date, self.key))
+
+
+# per-day statistics of paired samples: samples, pairs, mean number over the
+# common bins (n/cm3) of both, their ratio and correlation, and the median
+# ratio a/b of every common bin
+def day_stats(date, n_a, n_b, a, b, dp, dlogdp):
+    number_a, number_b = np.nansum(a * dlogdp, axis=1), np.nansum(b * dlogdp, axis=1)
+    stats = {'date': date, 'samples_a': n_a, 'samples_b': n_b, 'pairs': len(a),
+             'N_a': np.nan, 'N_b': np.nan, 'N_ratio': np.nan, 'N_r': np.nan}
+    if len(a):
+        stats['N_a'], stats['N_b'] = number_a.mean(), number_b.mean()
+        stats['N_ratio'] = stats['N_a'] / stats['N_b'] if stats['N_b'] > 0 else np.nan
+        if len(a) > 1 and number_a.std() > 0 and number_b.std() > 0:
+            stats['N_r'] = np.corrcoef(number_a, number_b)[0, 1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where((a > 0) & (b > 0), a / b, np.nan)
+    medians = np.full(len(dp), np.nan)
+    usable = np.isfinite(ratio).any(axis=0)
+    medians[usable] = np.nanmedian(ratio[:, usable], axis=0)
+    stats.update({f'ratio_{d:.3g}': m for d, m in zip(dp, medians)})
+    return stats
+
+
+# compare the MST days start..end both instruments have cached (settings from
+# config.load_settings), writing plots to <path>/<kind>/<year>/<date>_<title>.png
+# and the statistics to <path>/<title>_comparison.csv (rows of days compared
+# again are replaced); returns {date: error} of the days that failed
+# # tolerance pairs samples at most that far apart (a pandas offset); rule
+# # first averages both onto a common time step (see daily.resample_day)
+def compare(settings_a, settings_b, path, start=None, end=None, tolerance=TOLERANCE, rule=None,
+            plots=PLOT_KINDS, profiles=('archival',)):
+    a, b = Source(settings_a), Source(settings_b)
+    title = f'{a.title}_vs_{b.title}'
+    profiles = resolve_profiles(profiles)
+    tolerance_ns = pd.Timedelta(tolerance).value
+
+    # the rebinning matrices are built once for the whole run
+    edges = common_edges(a.spec.edges, b.spec.edges)
+    dp, dlogdp = (edges[:-1] + edges[1:]) / 2, np.diff(np.log10(edges))
+    matrix_a, matrix_b = overlap_matrix(a.spec.edges, edges), overlap_matrix(b.spec.edges, edges)
+
+    dates = sorted(set(a.days(start, end)) & set(b.days(start, end)))
+    rows, failures = [], {}
+    for date in dates:
+        try:
+            with timing.stage('compare', date) as record:
+                day_a, day_b = a.read_day(date), b.read_day(date)
+                if day_a is None or day_b is None:
+                    continue
+                if rule is not None:
+                    day_a, day_b = resample_day(day_a, rule), resample_day(day_b, rule)
+                times_a, mst_a, values_a = day_arrays(day_a, a.spec, matrix_a)
+                times_b, _, values_b = day_arrays(day_b, b.spec, matrix_b)
+                rows_a, rows_b = align(times_a, times_b, tolerance_ns)
+                record['rows'] = len(rows_a)
+
+            paired_a, paired_b = values_a[rows_a], values_b[rows_b]
+            rows.append(day_stats(date, len(times_a), len(times_b), paired_a, paired_b, dp, dlogdp))
+            if len(rows_a):
+                for kind in plots:
+                    PLOTS[kind](mst_a[rows_a], edges, paired_a, paired_b, date, os.path.join(path, kind), title,
+                                a.title, b.title, profiles)
+        except Exception as exc:
+            failures[date] = exc
+            print(f"Failed to compare {date}: {exc!r}")
+
+    if rows:
+        write_table(pd.DataFrame(rows), os.path.join(path, f'{title}_comparison.csv'))
+    print(f"Compared {len(rows)} of {len(dates)} shared days of {a.title} and {b.title}")
+    return failures
+
+
+# replace the rows of the compared days in a statistics table
+def write_table(table, table_path):
+    if os.path.exists(table_path):
+        stored = pd.read_csv(table_path, dtype={'date': str})
+        stored = stored[~stored['date'].isin(table['date'])]
+        table = pd.concat([stored, table], ignore_index=True).sort_values('date', kind='stable')
+
+    # write via a temporary file so readers never see a partial table
+    os.makedirs(os.path.dirname(table_path) or '.', exist_ok=True)
+    tmp_path = table_path + '.tmp'
+    table.to_csv(tmp_path, index=False, float_format='%.6g')
+    os.replace(tmp_path, table_path)
+
+
+# day-mean size distributions of both instruments on the common bins (with
+# their edges), and their number concentrations over those bins through the day
+def render_overlay(time_mst, edges, a, b, date, path, title, label_a, label_b, profiles=('archival',)):
+    dp, dlogdp = (edges[:-1] + edges[1:]) / 2, np.diff(np.log10(edges))
+    fig = new_figure(figsize=(12, 8))
+    ax1, ax2 = fig.add_subplot(2, 1, 1), fig.add_subplot(2, 1, 2)
+
+    for values, label in ((a, label_a), (b, label_b)):
+        ax1.plot(dp, np.ma.masked_invalid(values).mean(axis=0), marker='o', label=label)
+        ax2.plot(np.arange(len(time_mst)), np.nansum(values * dlogdp, axis=1), linewidth=0.8, label=label)
+
+    ax1.set_xscale('log')
+    ax1.set_yscale('log')
+    ax1.set_xlabel('Diameter Midpoint (μm)', fontsize=12)
+    ax1.set_ylabel('Mean dN/dlogDp', fontsize=12)
+    ax1.set_title(f'{label_a} vs {label_b} (MST): {date}', fontsize=14, weight='bold')
+    ax1.legend()
+
+    ax2.set_yscale('log')
+    ax2.set_ylabel('N over common bins (n/cm3)', fontsize=12)
+    tick_positions, tick_labels = hour_ticks(time_mst)
+    ax2.set_xticks(tick_positions)
+    ax2.set_xticklabels(tick_labels, rotation=45, ha='right')
+
+    save_figure(fig, time_mst, date, path, title, profiles, 'tight')
+
+
+# log10 of the ratio a / b of every paired sample and common bin (with their edges)
+def render_difference(time_mst, edges, a, b, date, path, title, label_a, label_b, profiles=('archival',)):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_ratio = np.log10(np.where((a > 0) & (b > 0), a / b, np.nan))
+
+    fig = new_figure(figsize=(12, 6))
+    ax1 = fig.add_subplot()
+    mesh = ax1.pcolormesh(np.arange(len(time_mst) + 1) - 0.5, edges, np.ma.masked_invalid(log_ratio.T),
+                          cmap='RdBu_r', vmin=-LOG_RATIO_LIMIT, vmax=LOG_RATIO_LIMIT)
+    cbar = fig.colorbar(mesh, ax=ax1, pad=0.1)
+    cbar.ax.text(0.5, 1.05, f'log10({label_a} / {label_b})', ha='center', va='center', transform=cbar.ax.transAxes,
+                 weight='bold')
+
+    ax1.set_yscale('log')
+    ax1.set_ylabel('Diameter Midpoint (μm)', fontsize=14)
+    ax1.set_title(f'{label_a} / {label_b} (MST): {date}', fontsize=14, weight='bold')
+    tick_positions, tick_labels = hour_ticks(time_mst)
+    ax1.set_xticks(tick_positions)
+    ax1.set_xticklabels(tick_labels, rotation=45, ha='right')
+
+    save_figure(fig, time_mst, date, path, title, profiles, 'tight')
+
+
+# plots selectable in compare
+PLOTS = {
+    'overlay': render_overlay,
+    'difference': render_difference,
+}
+
+
+# command line: compare two 'site/instrument' jobs; exit status 1 if any day failed
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m quicklook.compare',
+                                     description='Compare the size distributions of two instruments day by day.')
+    parser.add_argument('a', help="first 'site/instrument', e.g. 'wbb/grimm'")
+    parser.add_argument('b', help="second 'site/instrument', e.g. 'alta/quant'")
+    parser.add_argument('--config', help='json file of settings and sites (see quicklook.config.read_config)')
+    parser.add_argument('--start', help="first MST day to compare: YYYY-MM-DD, 'today' or 'yesterday'")
+    parser.add_argument('--end', help="last MST day to compare: YYYY-MM-DD, 'today' or 'yesterday'")
+    parser.add_argument('--tolerance', default=TOLERANCE, help='furthest apart two paired samples may be, e.g. 30s')
+    parser.add_argument('--rule', help="average both onto this time step first, e.g. '1min'")
+    parser.add_argument('--plots', nargs='*', choices=PLOT_KINDS, default=list(PLOT_KINDS), help='plots to draw')
+    parser.add_argument('--output-dir', help="directory of the plots and table (default: <first save_dir>/compare)")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = []
+        for name in (args.a, args.b):
+            site, _, instrument = name.partition('/')
+            settings.append(load_settings(site, instrument, args.config))
+        start, end = parse_day(args.start), parse_day(args.end)
+        pd.Timedelta(args.tolerance)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    path = args.output_dir or os.path.join(settings[0]['save_dir'], 'compare')
+    timing.reset()
+    failures = compare(*settings, path, start, end, args.tolerance, args.rule, args.plots,
+                       settings[0]['plot_profiles'])
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
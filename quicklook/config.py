@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# sites, instruments and run settings
+###############################################################################
+
+# import packages
+import json
+import os
+
+
+# instruments the pipeline knows how to read
+INSTRUMENTS = ('grimm', 'quant')
+
+# settings of every run unless a site or config file says otherwise
+# # file and directory names are relative to save_dir ('{instrument}' is
+# # replaced by the instrument name; an absolute path is used as it is)
+DEFAULTS = {
+    # lowest dN/dlogDp of the color scale (the highest, max_count, is set per site)
+    'min_count': 0,
+
+    # manifest of ingested csv files so reruns only re-plot new or changed days
+    # # set to None to reprocess the whole archive
+    'manifest_path': '{instrument}_manifest.json',
+
+    # cache of binned daily data (needs the manifest to know each day's files)
+    # # replot_all redraws every known day, reading unchanged days from the cache
+    # # (a --start/--end window always redraws the days within it)
+    'cache_dir': 'cache',
+    'replot_all': False,
+
+    # index of each csv file's time span, used to find the files for --start/--end
+    'index_path': '{instrument}_file_index.json',
+
+    # csv parser backend ('pyarrow' is faster; falls back to 'c' if not installed)
+    'csv_engine': 'pyarrow',
+
+    # number of processes rendering daily plots (1 renders serially)
+    'render_workers': 1,
+
+    # stream the archive file by file, handing out each day once it is complete,
+    # so memory holds a few days instead of every year (False reads everything at once)
+    'streaming': False,
+
+    # rows sharing a time stamp (overlapping or re-downloaded files): keep the
+    # 'first' or 'last' file's row (by file name), their 'mean', or 'keep' them all
+    'duplicate_policy': 'first',
+
+    # plot renderer: 'contour' (original smooth contours) or 'raster' (flat cells, several times faster)
+    'plot_renderer': 'contour',
+
+    # png quality profiles to write: 'archival' (400 dpi), 'preview' (100 dpi, a
+    # fraction of the encoding work, in preview/) and/or 'thumbnail' (30 dpi,
+    # in thumbnails/)
+    'plot_profiles': ['archival'],
+
+    # fingerprints of the pngs written, so plots whose data and settings did not
+    # change are not drawn again (set to None to always redraw)
+    'outputs_path': '{instrument}_outputs.json',
+
+    # average each day onto a regular time step before plotting, e.g. '1min' or
+    # '5min', taking the 'mean' or 'median' of each step (None plots every sample)
+    'resample_rule': None,
+    'resample_how': 'mean',
+
+    # aggregate pyramid (1-min to daily means) behind the weekly, monthly and
+    # seasonal plots; it grows with every day processed (None, the default,
+    # skips both; e.g. 'pyramid' keeps it under save_dir)
+    'pyramid_dir': None,
+    'period_plots': ['week', 'month', 'season'],
+
+    # daily and hourly summary tables (coverage, total number, fine/coarse fractions,
+    # peak dN/dlogDp, PM stats) for screening dust events without browsing plots;
+    # written as 'csv' or 'parquet' (None, the default, skips them; e.g. 'summary')
+    'summary_dir': None,
+    'summary_format': 'csv',
+    'summary_hourly': True,
+
+    # binned days exported for collaborators as chunked, compressed arrays (time x
+    # diameter dN/dlogDp with Dp, dlogDp, UTC/MST times and inlet efficiencies),
+    # one file per day as 'netcdf', 'zarr' (both need xarray) or 'npz' (None skips it)
+    'export_dir': None,
+    'export_format': 'netcdf',
+
+    # binary archive of the raw counts, filled by --archive (see quicklook.archive)
+    'archive_dir': 'archive',
+
+    # data-quality report of each run (gaps, duplicate or out-of-order time stamps,
+    # negative or NaN counts, zero efficiencies, null bytes; see quicklook.qc),
+    # written as json (None, the default, skips it; e.g. '{instrument}_qc_report.json');
+    # qc_mask blanks out negative and non-finite dN/dlogDp values before the
+    # pyramid, summary tables and plots (with or without a report)
+    'qc_path': None,
+    'qc_mask': False,
+
+    # run report with wall time, rows and memory (resident size before and after,
+    # growth of the peak) per stage, file and day
+    # # written as json (or csv if the name ends in .csv); set to None to skip
+    'report_path': '{instrument}_run_report.json',
+
+    # Quant only: data version subdirectory and product ('opc' or 'neph') to plot
+    'ver': 'raw',
+    'product': 'opc',
+}
+
+# settings every site must give (see SITES)
+SITE_KEYS = ('data_dir', 'save_dir', 'title', 'years', 'efficiencies', 'bins', 'max_count')
+
+# settings naming a file or directory under save_dir (None switches them off)
+PATH_KEYS = ('manifest_path', 'cache_dir', 'index_path', 'outputs_path', 'pyramid_dir', 'summary_dir',
+             'export_dir', 'archive_dir', 'qc_path', 'report_path')
+
+# the deployed instruments, by site and instrument
+# # data_dir holds the year folders of csv files, plots and run files go to save_dir;
+# # bins lists the lower edge of every bin plus a last row for the upper edge
+SITES = {
+    'wbb': {
+        'grimm': {
+            'data_dir': '/uufs/chpc.utah.edu/common/home/hallar-group2/data/site/wbb',
+            'save_dir': '/uufs/chpc.utah.edu/common/home/hallar-group2/plots/site/wbb/GRIMM/',
+            'title': 'GRIMM_(WBB)',
+            'years': [2024, 2025],
+
+            # inlet efficiencies for GRIMM @ WBB
+            'efficiencies': [0.9984480257, 0.9981661124, 0.9979658865, 0.9974219954, 0.9968158814,
+                             0.9961473774, 0.9954165081, 0.9941177784, 0.992851444, 0.991873087,
+                             0.9897330241, 0.9847273933, 0.9754386725, 0.9640684329, 0.9457855443,
+                             0.9181626064, 0.8856016482, 0.8485313359, 0.8074187886, 0.7150943161,
+                             0.5595642092, 0.451205686, 0.3445254765, 0.1974961192, 0.0234574173,
+                             0, 0, 0, 0, 0, 0, 0],
+            'bins': {
+                'Bin Number': list(range(2, 32)) + ['XX'],
+                'Size (µm)': [0.25, 0.28, 0.30, 0.35, 0.40, 0.45, 0.50, 0.58, 0.65,
+                              0.70, 0.80, 1.00, 1.30, 1.60, 2.00, 2.50, 3.00, 3.50, 4.00, 5.00,
+                              6.50, 7.50, 8.50, 10.0, 12.5, 15.0, 17.5, 20.0, 25.0, 30.0, 32.0],
+            },
+            'max_count': 60000,
+        },
+    },
+    'alta': {
+        'quant': {
+            'data_dir': '/uufs/chpc.utah.edu/common/home/hallar-group2/data/quant_pm/site/alta',
+            'save_dir': '/uufs/chpc.utah.edu/common/home/hallar-group2/plots/site/alta',
+            'title': 'QUANT_OPC_Alta',
+            'years': [2024, 2025],
+
+            # no inlet efficiency correction for the Quant
+            'efficiencies': [],
+            'bins': {
+                'Bin Number': ['bin0', 'bin1', 'bin2', 'bin3', 'bin4', 'bin5', 'bin6', 'bin7', 'bin8',
+                               'bin9', 'bin10', 'bin11', 'bin12', 'bin13', 'bin14', 'bin15', 'bin16', 'bin17',
+                               'bin18', 'bin19', 'bin20', 'bin21', 'bin22', 'bin23', 'binXX'],
+                'Size (µm)': [0.35, 0.46, 0.66, 1.00, 1.30, 1.70, 2.30, 3.00, 4.00,
+                              5.20, 6.50, 8.00, 10.0, 12.0, 14.0, 16.0, 18.0, 20.0,
+                              22.0, 25.0, 28.0, 31.0, 34.0, 37.0, 40.0],
+            },
+            'max_count': 10000,
+        },
+    },
+}
+
+
+# read a json config file: any setting (applied to every site) plus an
+# optional "sites" section adding sites or overriding the built-in ones, e.g.
+#   {"render_workers": 4, "sites": {"wbb": {"grimm": {"save_dir": "/scratch/wbb"}}}}
+def read_config(config_path):
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"Config file {config_path} must hold a json object")
+
+    for site, instruments in config.get('sites', {}).items():
+        for instrument, site_settings in instruments.items():
+            check_keys(site_settings, f"{config_path} (sites.{site}.{instrument})")
+    check_keys({key: value for key, value in config.items() if key != 'sites'}, config_path)
+    return config
+
+
+# reject misspelled or unknown settings
+def check_keys(settings, source):
+    unknown = sorted(set(settings) - set(DEFAULTS) - set(SITE_KEYS))
+    if unknown:
+        raise ValueError(f"Unknown setting(s) {unknown} in {source}")
+
+
+# the built-in sites merged with the ones of a config file, as
+# {site: {instrument: site settings}}
+def site_table(config=None):
+    sites = {site: {instrument: dict(values) for instrument, values in instruments.items()}
+             for site, instruments in SITES.items()}
+    for site, instruments in (config or {}).get('sites', {}).items():
+        for instrument, values in instruments.items():
+            sites.setdefault(site, {}).setdefault(instrument, {}).update(values)
+    return sites
+
+
+# resolved settings of one site's instrument: DEFAULTS, then the config file
+# (its global settings, then its site section), then overrides (e.g. from the
+# command line; None values are ignored); paths end up absolute or under save_dir
+def load_settings(site, instrument, config_path=None, **overrides):
+    if instrument not in INSTRUMENTS:
+        raise ValueError(f"Unknown instrument '{instrument}', expected one of {INSTRUMENTS}")
+    check_keys(overrides, 'overrides')
+
+    config = read_config(config_path) if config_path else {}
+    sites = site_table(config)
+    if instrument not in sites.get(site, {}):
+        known = [f'{name} {kind}' for name, kinds in sites.items() for kind in kinds]
+        raise ValueError(f"Unknown site/instrument '{site} {instrument}', expected one of {known}")
+
+    settings = dict(DEFAULTS)
+    settings.update({key: value for key, value in config.items() if key != 'sites'})
+    settings.update(sites[site][instrument])
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+
+    missing = [key for key in SITE_KEYS if key not in settings]
+    if missing:
+        raise ValueError(f"Site '{site} {instrument}' is missing the setting(s) {missing}")
+
+    settings['site'], settings['instrument'] = site, instrument
+    return resolve_paths(settings)
+
+
+# place the PATH_KEYS settings under save_dir, filling in the instrument name
+def resolve_paths(settings):
+    settings = dict(settings)
+    for key in PATH_KEYS:
+        if settings[key]:
+            name = settings[key].format(instrument=settings['instrument'])
+            settings[key] = os.path.join(settings['save_dir'], name)
+    return settings
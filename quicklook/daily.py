@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# split binned data into days, at once or streamed file by file
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+
+from quicklook import timing
+from quicklook.file_index import MST_OFFSET, mst_day, span_days
+from quicklook.merge import merge_runs, report_overlaps
+
+
+# organize dust data by date collected
+# # yields (date, day_data) pairs lazily; each day is a slice of the frame
+# # sorted once by time, found by binary search on the day boundaries
+def split(df):
+    
+    with timing.stage('split', rows=len(df)):
+        
+        # sort once by MST time (already sorted data is left untouched)
+        mst = df['Time_MST']
+        if not mst.is_monotonic_increasing:
+            df = df.sort_values(by='Time_MST', kind='stable')
+            mst = df['Time_MST']
+        
+        # calendar day of every row in MST (rows without a time sort last and are skipped)
+        if mst.dt.tz is not None:
+            mst = mst.dt.tz_localize(None)
+        days = mst.to_numpy().astype('datetime64[D]')[:mst.notna().sum()]
+        if len(days) == 0:
+            return
+        
+        # first row of every day from the first to the day after the last
+        day_range = np.arange(days[0], days[-1] + 2)
+        bounds = np.searchsorted(days, day_range)
+    
+    # hand out one day at a time (days without data are skipped)
+    for date, first, last in zip(day_range[:-1], bounds[:-1], bounds[1:]):
+        if last > first:
+            yield str(date), df.iloc[first:last]
+
+
+# read files one at a time in time order and yield (date, day_data) pairs as
+# soon as each MST day is complete, so at most a few days sit in memory
+# # read_file(path) -> raw dataframe, process(raw) -> binned data with Time_MST
+# # spans maps every file to its (first, last) UTC epoch span; files are read in
+# # order of their first time stamp, so a day is complete once the next file
+# # starts on a later day (files with an unknown span are read first)
+# # a file whose rows are not in time order can start earlier than its first
+# # line says: a day it turns out to feed after that day was handed out is
+# # joined again from all of its files and handed out once more
+# # duplicates is the policy for rows sharing a time stamp (see merge.DUPLICATE_POLICIES)
+def stream_days(file_paths, read_file, process, spans, duplicates='first'):
+    order = sorted(file_paths, key=lambda file_path: (spans[file_path] is not None, spans[file_path] or ()))
+    buckets = {}
+    done = {}
+    
+    for position, file_path in enumerate(order):
+        df = read_file(file_path)
+        with timing.stage('process', file_path, rows=len(df)):
+            df = process(df)
+        for date, day_data in split(df):
+            buckets.setdefault(date, {})[file_path] = day_data
+        
+        # every day before the one the next file starts on is done
+        following = order[position + 1] if position + 1 < len(order) else None
+        if following is not None and spans[following] is None:
+            continue
+        first_day = mst_day(spans[following][0]) if following is not None else None
+        for date in sorted(buckets):
+            if first_day is not None and date >= first_day:
+                break
+            pieces = buckets.pop(date)
+            if date in done:
+                print(f"{date}: {', '.join(map(str, pieces))} not in time order, joining the day again")
+                pieces = {**reread_day(done[date], read_file, process, date), **pieces}
+            done[date] = list(pieces)
+            yield date, join_day(pieces, duplicates, date)
+
+
+# the pieces of one day ({file path: day_data}) read again from its files
+def reread_day(file_paths, read_file, process, date):
+    pieces = {}
+    for file_path in file_paths:
+        df = read_file(file_path)
+        with timing.stage('process', file_path, rows=len(df)):
+            df = process(df)
+        pieces.update({file_path: day_data for day, day_data in split(df) if day == date})
+    return pieces
+
+
+# stream the days of an archive, or with a manifest only the days touched by
+# new or changed files (see Manifest.stream_files)
+# # file_days(raw) lists a raw frame's MST days, index is a FileIndex for spans
+# # complete=False when file_paths is only part of the archive (a date window)
+def stream_archive(file_paths, read_file, file_days, process, index, manifest=None, complete=True,
+                   duplicates='first'):
+    spans = index.spans(file_paths)
+    if manifest is None:
+        return stream_days(file_paths, read_file, process, spans, duplicates)
+    
+    # files without a span have to be parsed to learn their days
+    days_of = lambda file_path: (span_days(spans[file_path]) if spans[file_path] is not None
+                                 else file_days(read_file(file_path)))
+    changed, file_paths = manifest.stream_files(file_paths, days_of, complete)
+    changed = set(changed)
+    
+    # record the days of every changed file as it is read
+    def read_recorded(file_path):
+        df = read_file(file_path)
+        if file_path in changed:
+            manifest.record(file_path, file_days(df))
+        return df
+    
+    return stream_days(file_paths, read_recorded, process, index.spans(file_paths), duplicates)
+
+
+# join the pieces of one day ({file path: day_data}) in time order, resolving
+# duplicate time stamps and reporting files that overlap on that day
+def join_day(pieces, duplicates='first', date=None):
+    day_data, overlaps = merge_runs(list(pieces.values()), 'Time_MST', duplicates, names=list(pieces))
+    report_overlaps(overlaps, date)
+    return day_data
+
+
+# average every day of (date, day_data) pairs onto a regular time step
+# # rule is a pandas offset such as '1min' or '5min' (None keeps the raw
+# # resolution); see resample_day
+def resample_days(daily_data, rule, how='mean'):
+    items = daily_data.items() if isinstance(daily_data, dict) else daily_data
+    for date, day_data in items:
+        if rule is None:
+            yield date, day_data
+            continue
+        with timing.stage('resample', date, rows=len(day_data)):
+            day_data = resample_day(day_data, rule, how)
+        yield date, day_data
+
+
+# average one day of binned data onto a regular rule-long MST time step
+# # how is 'mean' (keeps the dN/dlogDp of every step faithful to the samples
+# # in it) or 'median' (robust to spikes); steps without samples are left out,
+# # as gaps are in the raw data, and n_samples counts the valid samples per step
+def resample_day(day_data, rule, how='mean'):
+    if how not in ('mean', 'median'):
+        raise ValueError(f"Unknown resampling '{how}', expected 'mean' or 'median'")
+    
+    # group positionally on the start of each step (day slices may repeat index labels)
+    mst = day_data['Time_MST']
+    steps = pd.DatetimeIndex(mst.dt.floor(rule).array, name='Time_MST')
+    values = day_data.drop(columns=['Time_UTC', 'Time_MST'], errors='ignore').select_dtypes('number')
+    grouped = values.groupby(steps, sort=True)
+    result = grouped.mean() if how == 'mean' else grouped.median()
+    result['n_samples'] = values.notna().any(axis=1).groupby(steps, sort=True).sum().astype(np.int32)
+    
+    # time stamps of the step starts, in the time zones of the input
+    result['Time_MST'] = result.index
+    if 'Time_UTC' in day_data.columns:
+        result['Time_UTC'] = result.index.tz_convert('UTC') if result.index.tz is not None else result.index + MST_OFFSET
+    
+    columns = [column for column in day_data.columns if column in result.columns] + ['n_samples']
+    return result[columns].reset_index(drop=True)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# chunked, compressed export of binned dN/dlogDp days for collaborators
+###############################################################################
+
+# import packages
+import datetime as dt
+import json
+import os
+import shutil
+import numpy as np
+
+from quicklook import timing
+from quicklook.atomic_json import read_json, write_json
+from quicklook.bins import MOMENT_COLUMNS, BinSpec
+from quicklook.file_index import day_in_window, parse_day
+
+
+# bump whenever the layout of the exported days changes
+EXPORT_VERSION = 1
+
+# export formats: netCDF-4 and zarr need xarray (with netCDF4 or h5netcdf, or
+# zarr); npz (numpy's compressed archives) needs nothing else
+FORMATS = ('netcdf', 'zarr', 'npz')
+EXTENSIONS = {'netcdf': '.nc', 'zarr': '.zarr', 'npz': '.npz'}
+
+# chunk of the dN/dlogDp matrix of a day: samples x diameters (about an hour
+# of GRIMM samples and a handful of bins, so a reader picking a time or a
+# diameter range only decompresses the chunks holding it)
+TIME_CHUNK = 600
+DP_CHUNK = 8
+
+# compression level of the netCDF-4 (zlib) variables
+COMPLEVEL = 4
+
+
+# the netCDF engine available (None when xarray cannot write netCDF-4)
+def netcdf_engine():
+    for engine in ('netCDF4', 'h5netcdf'):
+        try:
+            __import__(engine)
+        except ImportError:
+            continue
+        return engine.lower()
+    return None
+
+
+# fall back to npz days when the libraries of the requested format are missing
+def resolve_format(file_format):
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format '{file_format}', expected one of {FORMATS}")
+
+    if file_format != 'npz':
+        try:
+            import xarray  # noqa: F401
+            if file_format == 'zarr':
+                import zarr  # noqa: F401
+            elif netcdf_engine() is None:
+                raise ImportError('netCDF4 or h5netcdf')
+        except ImportError as error:
+            print(f"{error.name or error} is not installed, exporting {file_format} days as npz")
+            return 'npz'
+
+    return file_format
+
+
+# coordinates and variables of one day of binned data: UTC and MST times,
+# Dp midpoints with their edges, dlogDp and inlet efficiency, the dN/dlogDp
+# matrix (samples x bins, float32) and the N/S/V totals
+# # only the bins present in day_data are exported (e.g. the few neph bins);
+# # efficiencies maps bin numbers to their inlet efficiency (bins without one
+# # get NaN)
+def day_arrays(day_data, spec, efficiencies=None):
+    mst = day_data['Time_MST']
+    if mst.dt.tz is not None:
+        mst = mst.dt.tz_localize(None)
+    present = np.array([i for i, dp in enumerate(spec.dp) if dp in day_data.columns], dtype=int)
+    efficiencies = efficiencies or {}
+    arrays = {
+        'time': day_data['Time_UTC'].to_numpy(dtype='datetime64[ns]'),
+        'time_mst': mst.to_numpy(dtype='datetime64[ns]'),
+        'diameter': spec.dp[present],
+        'diameter_lower': spec.edges[:-1][present],
+        'diameter_upper': spec.edges[1:][present],
+        'dlogDp': spec.dlogdp[present],
+        'inlet_efficiency': np.array([efficiencies.get(spec.names[i], np.nan) for i in present], dtype=float),
+        'dNdlogDp': day_data[list(spec.dp[present])].to_numpy(dtype=np.float32),
+    }
+    for column in MOMENT_COLUMNS:
+        if column in day_data.columns:
+            arrays[column] = day_data[column].to_numpy(dtype=np.float32)
+    return arrays
+
+
+# the arrays of one day as an xarray Dataset with CF-style attributes
+def day_dataset(arrays, attrs):
+    import xarray as xr
+
+    coords = {
+        'time': ('time', arrays['time'], {'long_name': 'sample time', 'standard_name': 'time'}),
+        'time_mst': ('time', arrays['time_mst'], {'long_name': 'sample time, MST wall clock (UTC-7)'}),
+        'diameter': ('diameter', arrays['diameter'], {'long_name': 'bin midpoint diameter', 'units': 'um'}),
+        'diameter_lower': ('diameter', arrays['diameter_lower'], {'long_name': 'bin lower edge', 'units': 'um'}),
+        'diameter_upper': ('diameter', arrays['diameter_upper'], {'long_name': 'bin upper edge', 'units': 'um'}),
+        'dlogDp': ('diameter', arrays['dlogDp'], {'long_name': 'bin width in log10(Dp)'}),
+        'inlet_efficiency': ('diameter', arrays['inlet_efficiency'],
+                             {'long_name': 'inlet efficiency the counts were divided by'}),
+    }
+    data_vars = {'dNdlogDp': (('time', 'diameter'), arrays['dNdlogDp'],
+                              {'long_name': 'number size distribution dN/dlogDp', 'units': 'cm-3'})}
+    units = {'N_total': 'cm-3', 'S_total': 'um2 cm-3', 'V_total': 'um3 cm-3'}
+    for column in MOMENT_COLUMNS:
+        if column in arrays:
+            data_vars[column] = ('time', arrays[column], {'long_name': f'total {column[0]} concentration',
+                                                          'units': units[column]})
+    return xr.Dataset(data_vars, coords=coords, attrs=attrs)
+
+
+# chunk sizes of a day's time x diameter variables
+def chunks(samples, bins):
+    return max(1, min(samples, TIME_CHUNK)), max(1, min(bins, DP_CHUNK))
+
+
+# write one day in a format (via a temporary path so readers never see a partial day)
+def write_day(path, arrays, attrs, file_format):
+    tmp_path = path + '.tmp' + EXTENSIONS[file_format]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    samples, bins = arrays['dNdlogDp'].shape
+    matrix_chunks, time_chunk = chunks(samples, bins), chunks(samples, bins)[:1]
+
+    if file_format == 'npz':
+        np.savez_compressed(tmp_path, attrs=np.array(json.dumps(attrs)), **arrays)
+    else:
+        ds = day_dataset(arrays, attrs)
+        variables = [name for name in ds.data_vars]
+        if file_format == 'netcdf':
+            encoding = {name: {'zlib': True, 'complevel': COMPLEVEL,
+                               'chunksizes': matrix_chunks if ds[name].ndim == 2 else time_chunk}
+                        for name in variables}
+            ds.to_netcdf(tmp_path, engine=netcdf_engine(), encoding=encoding)
+        else:
+            encoding = {name: {'chunks': matrix_chunks if ds[name].ndim == 2 else time_chunk} for name in variables}
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            ds.to_zarr(tmp_path, mode='w', encoding=encoding)
+
+    # a zarr day is a directory, which os.replace cannot put over an old one
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+# binned days of one instrument exported for use outside quicklook
+# # <path>/<instrument>/<year>/<date>.<nc|zarr|npz>, one file per MST day (the
+# # time chunking of the export: a day is read without touching any other),
+# # each chunked by TIME_CHUNK samples x DP_CHUNK bins, plus index.json
+# # listing every day with its samples and UTC span. Days passing through
+# # store_days are written as they come (new days are added, days processed
+# # again are replaced), so the export grows with every run
+# # bins is the bins table, efficiencies maps bin numbers to their inlet
+# # efficiency and attrs (title, site, ...) is stored with every day
+class Export:
+
+    def __init__(self, path, instrument, bins, efficiencies=None, attrs=None, file_format='netcdf'):
+        self.path = path
+        self.directory = os.path.join(path, instrument)
+        self.instrument = instrument
+        self.spec = BinSpec.from_table(bins)
+        self.efficiencies = efficiencies
+        self.attrs = {'instrument': instrument, 'source': 'quicklook', 'export_version': EXPORT_VERSION,
+                      **(attrs or {})}
+        self.file_format = resolve_format(file_format)
+        self.days = self.read_index()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, 'index.json')
+
+    # exported days {date: {path, format, samples, first, last}} (empty if none
+    # yet, or if the index is unreadable; the days are then exported again)
+    def read_index(self):
+        saved = read_json(self.index_path)
+        return saved['days'] if saved.get('version') == EXPORT_VERSION else {}
+
+    # location of one day, relative to the instrument's directory
+    def day_path(self, date):
+        return os.path.join(date[:4], date + EXTENSIONS[self.file_format])
+
+    # export each (date, day_data) pair as it passes through, then save the index
+    def store_days(self, daily_data):
+        items = daily_data.items() if isinstance(daily_data, dict) else daily_data
+        for date, day_data in items:
+            with timing.stage('export', date, rows=len(day_data)):
+                self.add_day(date, day_data)
+            yield date, day_data
+        self.save()
+
+    # write one day (an empty day is not exported)
+    def add_day(self, date, day_data):
+        if not len(day_data):
+            return
+        arrays = day_arrays(day_data, self.spec, self.efficiencies)
+        attrs = {**self.attrs, 'date': date, 'created': dt.datetime.now().isoformat(timespec='seconds')}
+        relative = self.day_path(date)
+        write_day(os.path.join(self.directory, relative), arrays, attrs, self.file_format)
+
+        # a day exported before in another format is replaced by this one
+        old = self.days.get(date)
+        if old is not None and old['path'] != relative:
+            old_path = os.path.join(self.directory, old['path'])
+            if os.path.isdir(old_path):
+                shutil.rmtree(old_path)
+            elif os.path.exists(old_path):
+                os.remove(old_path)
+
+        times = arrays['time']
+        self.days[date] = {'path': relative, 'format': self.file_format, 'samples': len(times),
+                           'first': str(times.min()), 'last': str(times.max())}
+
+    # write the index (via a temporary file so a crash never corrupts it)
+    def save(self):
+        write_json(self.index_path, {'version': EXPORT_VERSION, 'instrument': self.instrument, 'attrs': self.attrs,
+                                     'diameter': self.spec.dp.tolist(), 'days': dict(sorted(self.days.items()))})
+
+
+# (date, entry, path) of the exported days of an instrument within the MST
+# days start..end (dates or 'YYYY-MM-DD', None = open), in date order
+def exported_days(path, instrument, start=None, end=None):
+    start, end = [parse_day(day) if isinstance(day, str) else day for day in (start, end)]
+    export = os.path.join(path, instrument)
+    with open(os.path.join(export, 'index.json'), 'r') as f:
+        days = json.load(f)['days']
+    return [(date, day, os.path.join(export, day['path'])) for date, day in sorted(days.items())
+            if day_in_window(date, start, end)]
+
+
+# the exported days of an instrument within the MST days start..end as one
+# xarray Dataset, optionally cut to the diameters dp_min..dp_max (µm)
+# # days are opened lazily, so only the chunks of the selection are read
+def open_days(path, instrument, start=None, end=None, dp_min=None, dp_max=None):
+    import xarray as xr
+
+    parts = []
+    for date, day, day_path in exported_days(path, instrument, start, end):
+        if day['format'] == 'npz':
+            with np.load(day_path) as stored:
+                arrays = {name: stored[name] for name in stored.files if name != 'attrs'}
+                ds = day_dataset(arrays, json.loads(str(stored['attrs'])))
+        elif day['format'] == 'zarr':
+            ds = xr.open_zarr(day_path)
+        else:
+            ds = xr.open_dataset(day_path, engine=netcdf_engine())
+        parts.append(ds.sel(diameter=slice(dp_min, dp_max)))
+
+    if not parts:
+        return None
+    return xr.concat(parts, dim='time', data_vars='minimal', coords='minimal', compat='override',
+                     combine_attrs='drop_conflicts')
+
+
+# the exported npz days of an instrument within start..end as (UTC times, MST
+# times, Dp, dN/dlogDp), optionally cut to dp_min..dp_max, for readers without xarray
+def read_npz_days(path, instrument, start=None, end=None, dp_min=None, dp_max=None):
+    times, times_mst, values, dp = [], [], [], None
+    for date, day, day_path in exported_days(path, instrument, start, end):
+        if day['format'] != 'npz':
+            continue
+        with np.load(day_path) as stored:
+            dp = stored['diameter']
+            keep = np.ones(len(dp), dtype=bool)
+            if dp_min is not None:
+                keep &= dp >= dp_min
+            if dp_max is not None:
+                keep &= dp <= dp_max
+            times.append(stored['time'])
+            times_mst.append(stored['time_mst'])
+            values.append(stored['dNdlogDp'][:, keep])
+        dp = dp[keep]
+
+    if not times:
+        return None
+    return np.concatenate(times), np.concatenate(times_mst), dp, np.concatenate(values)
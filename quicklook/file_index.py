@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# index of the UTC time span covered by each csv file
+###############################################################################
+
+# import packages
+import datetime as dt
+import os
+import re
+
+from quicklook.atomic_json import read_json, write_json
+
+
+# bump whenever the layout of the saved index changes
+INDEX_VERSION = 1
+
+# MST is UTC-7 all year (no daylight saving)
+MST_OFFSET = dt.timedelta(hours=7)
+
+# dates embedded in file names, e.g. 2024-06-01.csv or GRIMM_20240601.csv
+FILENAME_DATE = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})')
+
+
+# parse a --start/--end value: 'YYYY-MM-DD', 'today' or 'yesterday' (MST)
+def parse_day(value):
+    if value is None:
+        return None
+    
+    today = (dt.datetime.now(dt.timezone.utc) - MST_OFFSET).date()
+    if value == 'today':
+        return today
+    if value == 'yesterday':
+        return today - dt.timedelta(days=1)
+    return dt.date.fromisoformat(value)
+
+
+# UTC epoch seconds [lo, hi) covering the MST days start..end (None = open)
+def mst_window(start, end):
+    lo = hi = None
+    if start is not None:
+        lo = (dt.datetime.combine(start, dt.time(), dt.timezone.utc) + MST_OFFSET).timestamp()
+    if end is not None:
+        hi = (dt.datetime.combine(end + dt.timedelta(days=1), dt.time(), dt.timezone.utc) + MST_OFFSET).timestamp()
+    return lo, hi
+
+
+# check if an MST day string falls within start..end
+def day_in_window(date, start, end):
+    return (start is None or date >= start.isoformat()) and (end is None or date <= end.isoformat())
+
+
+# year subdirectories that can hold data for the MST days start..end
+def window_years(start, end, years):
+    if start is None and end is None:
+        return years
+    
+    # the last MST day of a year ends at 07:00 UTC on January 1st
+    first = start.year if start is not None else min(years)
+    last = (end + dt.timedelta(days=1)).year if end is not None else dt.date.today().year
+    return list(range(first, last + 1))
+
+
+# MST day ('YYYY-MM-DD') of a UTC epoch time
+def mst_day(epoch):
+    return (dt.datetime.fromtimestamp(epoch, dt.timezone.utc) - MST_OFFSET).date().isoformat()
+
+
+# every MST day touched by a (first, last) UTC epoch span
+def span_days(span):
+    first, last = (dt.date.fromisoformat(mst_day(epoch)) for epoch in span)
+    return [(first + dt.timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+
+# convert a time stamp string to UTC epoch seconds (None if unparsable)
+# # pandas is imported here so parse_day stays light enough for --dry-run
+def _epoch(text):
+    import pandas as pd
+    try:
+        stamp = pd.Timestamp(text.strip().strip('"'))
+    except (ValueError, TypeError):
+        return None
+    if stamp is pd.NaT:
+        return None
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize('UTC')
+    return stamp.timestamp()
+
+
+# first parsable time stamp among raw csv lines
+def _first_time(lines, column):
+    for line in lines:
+        fields = line.decode('utf-8', 'replace').split(',')
+        if len(fields) > column:
+            epoch = _epoch(fields[column])
+            if epoch is not None:
+                return epoch
+    return None
+
+
+# read the first and last UTC time stamps of a csv file from its head and tail
+# # time_column is a column index, or a column name when header=True
+def file_span(file_path, time_column=0, header=False, read_bytes=1 << 16):
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(read_bytes)
+        f.seek(max(0, size - read_bytes))
+        tail = f.read()
+    
+    # null padding and a partially written last line are skipped
+    head_lines = head.replace(b'\x00', b'').splitlines()
+    tail_lines = tail.replace(b'\x00', b'').splitlines()
+    
+    column = time_column
+    if header and head_lines:
+        column = head_lines[0].decode('utf-8', 'replace').split(',').index(time_column)
+        head_lines = head_lines[1:]
+    
+    first = _first_time(head_lines, column)
+    last = _first_time(reversed(tail_lines), column)
+    if first is not None and last is not None:
+        return first, last
+    
+    # fall back to a date in the file name (assumed to cover that UTC day)
+    match = FILENAME_DATE.search(os.path.basename(file_path))
+    if match:
+        day = dt.datetime(*map(int, match.groups()), tzinfo=dt.timezone.utc)
+        return day.timestamp(), (day + dt.timedelta(days=1)).timestamp()
+    
+    return None
+
+
+# map every csv file to the UTC span it covers, cached between runs by size/mtime
+# # path=None keeps the index in memory only
+class FileIndex:
+
+    def __init__(self, path=None, time_column=0, header=False):
+        self.path = path
+        self.time_column = time_column
+        self.header = header
+        self.files = {}
+        
+        # an unreadable or outdated index (e.g. one cut short by a killed run)
+        # simply means the spans are looked up again
+        saved = read_json(path)
+        if saved.get('version') == INDEX_VERSION:
+            self.files = saved['files']
+
+    # map every file to its (first, last) UTC epoch span (None if unknown)
+    # # spans read back from the saved index are json lists; they are returned
+    # # as tuples like fresh ones, so a mix of both still sorts
+    def spans(self, file_paths):
+        spans = {}
+        updated = False
+        
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            entry = self.files.get(file_path)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                span = file_span(file_path, self.time_column, self.header)
+                entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'span': span}
+                self.files[file_path] = entry
+                updated = True
+            spans[file_path] = tuple(entry['span']) if entry['span'] is not None else None
+        
+        if updated:
+            self.save()
+        
+        return spans
+
+    # return the files whose span overlaps the MST days start..end
+    # # files with an unknown span are always kept
+    def select(self, file_paths, start, end):
+        lo, hi = mst_window(start, end)
+        return [file_path for file_path, span in self.spans(file_paths).items()
+                if span is None or ((lo is None or span[1] >= lo) and (hi is None or span[0] < hi))]
+
+    # write the index (via a temporary file so a crash never corrupts it)
+    def save(self):
+        if self.path is None:
+            return
+        write_json(self.path, {'version': INDEX_VERSION, 'files': self.files})
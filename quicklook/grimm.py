@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# read, format and bin GRIMM data
+###############################################################################
+
+# import packages
+import os
+import numpy as np
+import pandas as pd
+
+from quicklook import timing
+from quicklook.archive import Archive
+from quicklook.bins import BinSpec
+from quicklook.daily import resample_days, stream_archive
+from quicklook.file_index import FileIndex, window_years
+from quicklook.merge import merge_runs, report_overlaps
+from quicklook.parsing import GRIMM_CHANNELS, GRIMM_DTYPES, mst_days, parse_times, resolve_engine
+from quicklook.plotting import process_daily_data
+from quicklook.sanitize import open_clean
+from quicklook.tail import FileTail, watch
+
+
+# record a csv file whose time signatures contained null \x00 bytes
+# # the report is named by the date and the csv file, so several corrupted
+# # files of one day each keep their own report
+def report_x00_issue(df, file_path, nul_bytes, nul_lines, save_dir, title):
+    
+    # date of the first readable time stamp (already parsed by read_grimm_file)
+    timestamps = parse_times(df.iloc[:,0], errors='coerce').dropna()
+    date_str = str(timestamps.iloc[0].date()) if len(timestamps) else 'unknown-date'
+
+    
+    # Create the error message text file
+    error_message = (
+        "Error occurred in this csv file. One of the UTC time signatures contained "
+        "extraneous null values of x00\\x00...\n"
+        f"File: {file_path}\n"
+        f"Removed {nul_bytes} null bytes from {nul_lines} lines."
+    )
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    error_filename = f"{date_str}_{title}_{file_name}_error.txt"
+    error_file_path = os.path.join(save_dir, error_filename)
+    os.makedirs(save_dir, exist_ok=True)
+    
+    with open(error_file_path, 'w') as error_file:
+        error_file.write(error_message)
+    
+
+# list every csv file in the year subdirectories of data_dir
+def find_csv_files(data_dir, years):
+    
+    # get a list of all subdirectories in the data_dir
+    subdirectories = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
+    
+    # initialize an empty list to store file paths
+    file_paths = []
+
+    # iterate through each subdirectory
+    for subdirectory in subdirectories:
+        # check if the subdirectory label contains a year from the input years
+        if any(str(year) in subdirectory for year in years):
+            # collect every csv file in the subdirectory
+            csv_files = [f for f in os.listdir(os.path.join(data_dir, subdirectory)) if f.endswith('.csv')]
+            file_paths.extend(os.path.join(data_dir, subdirectory, csv_file) for csv_file in csv_files)
+    
+    return file_paths
+
+
+# read a single grimm csv file
+def read_grimm_file(file_path, save_dir, title, engine='c'):
+    
+    with timing.stage('read', file_path) as record:
+        
+        # read the csv file (grimm files have no header row), dropping any null
+        # \x00 bytes while it is parsed; counts are parsed straight to float32
+        with open_clean(file_path) as stream:
+            df = pd.read_csv(stream, header=None, engine=engine, dtype=GRIMM_DTYPES)
+        
+        # parse the time stamps once; every later stage reuses them
+        df[0] = parse_times(df[0])
+        
+        nul_bytes, nul_lines = stream.raw.nul_bytes, stream.raw.nul_lines
+        if nul_bytes:
+            report_x00_issue(df, file_path, nul_bytes, nul_lines, save_dir, title)
+        
+        # keep the counts with the frame for the data-quality scan (see qc.QCReport)
+        df.attrs['nul_bytes'], df.attrs['nul_lines'] = nul_bytes, nul_lines
+        
+        record['rows'], record['nul_bytes'] = len(df), nul_bytes
+    
+    return df
+
+
+# list the MST days covered by a raw grimm dataframe
+def grimm_days(df):
+    return mst_days(parse_times(df.iloc[:, 0]))
+
+
+# grimm_dir, grimm_efficiencies, save_dir, project_title, [2024, 2025]
+# # pass a Manifest to only read new/changed files and the days they touch
+# # engine selects the pandas csv parser ('c' or 'pyarrow')
+# # start/end (dates) only read files overlapping those MST days, looked up
+# # through a FileIndex of each file's time span
+# # duplicates is the policy for rows sharing a time stamp (see merge.DUPLICATE_POLICIES)
+# # qc is a qc.QCReport that scans every file as it is parsed
+def read_grimm(data_dir, eff, save_dir, title, years, manifest=None, engine='c', start=None, end=None, index=None,
+               duplicates='first', qc=None):
+    
+    # find every csv file for the requested years
+    with timing.stage('list') as record:
+        file_paths = find_csv_files(data_dir, window_years(start, end, years))
+        record['files'] = len(file_paths)
+    
+    # keep only files overlapping the requested MST days
+    windowed = start is not None or end is not None
+    if windowed:
+        index = index if index is not None else FileIndex()
+        with timing.stage('index') as record:
+            file_paths = index.select(file_paths, start, end)
+            record['files'] = len(file_paths)
+    
+    # read the csv files into a list of dataframes
+    engine = resolve_engine(engine)
+    read_file = lambda file_path: read_grimm_file(file_path, save_dir, title, engine)
+    if qc is not None:
+        read_file = qc.scanning(read_file)
+    if manifest is None:
+        frames = {file_path: read_file(file_path) for file_path in file_paths}
+    else:
+        frames = manifest.read(file_paths, read_file, grimm_days, complete=not windowed)
+    
+    # nothing new to ingest (time column + 32 channels)
+    if not frames:
+        frames = {None: pd.DataFrame(columns=range(GRIMM_CHANNELS + 1))}
+    
+    # merge the files into one time-ordered dataframe, resolving duplicate stamps
+    combined_df, overlaps = merge_runs(list(frames.values()), 0, duplicates, names=list(frames))
+    report_overlaps(overlaps, title)
+    
+    # return formatted file
+    with timing.stage('format', rows=len(combined_df)):
+        return format_grimm(combined_df, eff)
+
+
+# read grimm csv data file by file, yielding (date, day_data) for every MST day
+# as soon as it is complete (binned, with Time_UTC/Time_MST)
+# # peak memory stays at a few days of data instead of the whole archive;
+# # the other arguments are as for read_grimm
+def stream_grimm(data_dir, eff, bins, save_dir, title, years, manifest=None, engine='c', start=None, end=None,
+                 index=None, duplicates='first', qc=None):
+    
+    # find every csv file for the requested years
+    with timing.stage('list') as record:
+        file_paths = find_csv_files(data_dir, window_years(start, end, years))
+        record['files'] = len(file_paths)
+    
+    # keep only files overlapping the requested MST days (the index also gives
+    # the time span that decides the order files are read in)
+    index = index if index is not None else FileIndex()
+    windowed = start is not None or end is not None
+    if windowed:
+        with timing.stage('index') as record:
+            file_paths = index.select(file_paths, start, end)
+            record['files'] = len(file_paths)
+    
+    engine = resolve_engine(engine)
+    read_file = lambda file_path: read_grimm_file(file_path, save_dir, title, engine)
+    if qc is not None:
+        read_file = qc.scanning(read_file)
+    spec = bin_spec(bins)
+    process = lambda df: process_grimm(df, eff, spec)
+    return stream_archive(file_paths, read_file, grimm_days, process, index, manifest, complete=not windowed,
+                          duplicates=duplicates)
+
+
+# format, bin and time-stamp raw grimm rows (bins is a table or a BinSpec)
+def process_grimm(df, eff, bins):
+    utc, data = format_grimm(df, eff)
+    return combine(utc, bin_spec(bins).normalize(data))
+
+
+# inlet efficiency of each raw channel, as format_grimm applies them (the
+# efficiencies start at channel 2, the first one kept)
+def efficiency_channels(eff):
+    return dict(zip(range(2, GRIMM_CHANNELS), eff))
+
+
+# format the raw grimm data
+def format_grimm(df, eff):
+    
+    # grab time (UTC, parsed when the file was read)
+    utc = parse_times(df.iloc[:,0], utc=True)
+
+    # drop time columns from df
+    df = df.iloc[:, 1:]
+    
+    # trim away smallest and largest bin (inaccurate measurements)
+    df = df.iloc[:, 1:-1]
+    
+    # convert dust concentrations to n/cm3 (originally n/100ml)
+    df = df / 100
+            
+    
+    if eff != []:
+        # adjust dust concentrations based on inlet efficiencies
+        num_columns = df.shape[1]
+        df = df / np.asarray(eff[0:num_columns], dtype=np.float32)
+    
+    # return formatted grimm data
+    return utc, df
+
+ 
+    
+  
+# bin aerosol data: dN/dlogDp columns named by Dp, plus N/S/V totals
+# # bins is a bins table or a BinSpec (see bin_spec); the table is not modified
+def bin(df, bins):
+    spec = bin_spec(bins)
+    return spec.normalize(df), spec.table()
+
+
+# the bin spec of a grimm bins table (count columns are the bin numbers)
+def bin_spec(bins):
+    return bins if isinstance(bins, BinSpec) else BinSpec.from_table(bins)
+
+
+# the bins table as bin() returns it (with Dp/dlogDp, without the last edge)
+def bin_table(bins):
+    return bin_spec(bins).table()
+
+
+# normalize bin collections by log differences
+def sizing(data, bins):
+    
+    # grab indicies of neighboring elements
+    x1_indices = np.arange(0, len(bins) - 1, dtype=int)
+    x2_indices = x1_indices + 1
+    
+    # calculate log differences
+    dlogDp = np.log10(bins[x2_indices]) - np.log10(bins[x1_indices])
+    
+    # normalize particle #s by bin size
+    result_df = data.divide(dlogDp, axis ='columns')
+    
+    # return the normalized data
+    return result_df
+ 
+    
+# assemble time and aerosol date
+def combine(date, data):
+    
+    # combine date with data    
+    result_df = pd.concat([date, data], axis=1)
+    
+    # add a column title over the dates
+    result_df.columns = ['Time_UTC'] + list(result_df.columns[1:])
+    
+    # Convert Time_UTC to timezone-aware datetime in UTC
+    result_df['Time_UTC'] = parse_times(result_df['Time_UTC'], utc=True)
+    
+    # Add Time_MST column (UTC-7, without daylight saving)
+    result_df['Time_MST'] = result_df['Time_UTC'].dt.tz_convert('Etc/GMT+7')
+    
+    # returned combined dataframe
+    return result_df
+
+
+# follow today's growing grimm files, re-plotting today every interval seconds
+# # only appended rows are parsed (see quicklook.tail); null bytes are dropped
+# # silently here, the next batch run still reports them
+def watch_grimm(data_dir, eff, bins, save_dir, title, min_count=0, max_count=60000, engine='c',
+                renderer='contour', interval=60, resample_rule=None, resample_how='mean',
+                profiles=('archival',), polls=None):
+    engine = resolve_engine(engine)
+    
+    spec = bin_spec(bins)
+    plot_bins = spec.table()
+    process = lambda df: process_grimm(df, eff, spec)
+    read_rows = lambda stream: pd.read_csv(stream, header=None, engine=engine, dtype=GRIMM_DTYPES)
+    find_files = lambda years: find_csv_files(data_dir, years)
+    render = lambda daily_data: process_daily_data(resample_days(daily_data, resample_rule, resample_how), plot_bins,
+                                                   min_count, max_count, save_dir, title, renderer=renderer,
+                                                   profiles=profiles)
+    
+    return watch(find_files, FileTail(), read_rows, process, render, interval, polls)
+
+
+# append the rows of new (or grown) grimm csv files to the binary archive at
+# <archive_dir>/grimm (see quicklook.archive), parsed as read_grimm parses them
+def archive_grimm(archive_dir, data_dir, save_dir, title, years, engine='c'):
+    engine = resolve_engine(engine)
+    archive = Archive(archive_dir, 'grimm')
+    
+    with timing.stage('list') as record:
+        file_paths = find_csv_files(data_dir, years)
+        record['files'] = len(file_paths)
+    
+    archive.ingest(file_paths, lambda file_path: read_grimm_file(file_path, save_dir, title, engine))
+    return archive
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# incremental ingest manifest
+###############################################################################
+
+# import packages
+import hashlib
+import os
+
+from quicklook.atomic_json import read_json, write_json
+from quicklook.file_index import day_in_window
+
+
+# bump whenever the layout of the saved manifest changes
+MANIFEST_VERSION = 1
+
+
+# hash a file in chunks so large csv files never sit in memory
+def file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# remember every ingested csv file (size, mtime, content hash) and the MST days
+# it contributed to, so later runs only re-parse and re-plot what changed
+# # settings fingerprints the processing options (see cache.settings_key);
+# # changing them invalidates every file recorded so far
+class Manifest:
+
+    def __init__(self, path, settings=None):
+        self.path = path
+        self.settings = settings
+        self.files = {}
+
+        # MST days ('YYYY-MM-DD') that need to be re-plotted on this run
+        self.affected_days = set()
+
+        # affected days left out of this run's date window, kept for later runs
+        self.pending_days = set()
+
+        # an unreadable or outdated manifest (e.g. one cut short by a killed
+        # run) simply means a full rebuild
+        saved = read_json(path)
+        if saved.get('version') == MANIFEST_VERSION and saved.get('settings') == settings:
+            self.files = saved['files']
+            self.affected_days.update(saved.get('pending', []))
+
+    # return the files that are new or whose contents changed since last run
+    # # complete=False when file_paths is only part of the archive, so files
+    # # missing from the list are not mistaken for deleted ones
+    def changed(self, file_paths, complete=True):
+        changed = []
+
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            entry = self.files.get(file_path)
+
+            # same size and mtime: trust it without hashing the whole file
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                continue
+
+            # touched but identical contents: refresh the stat info only
+            sha1 = file_hash(file_path)
+            if entry is not None and entry['sha1'] == sha1:
+                entry['size'] = stat.st_size
+                entry['mtime'] = stat.st_mtime
+                continue
+
+            # days the old version covered must be redrawn as well
+            if entry is not None:
+                self.affected_days.update(entry['days'])
+
+            self.files[file_path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha1': sha1, 'days': []}
+            changed.append(file_path)
+
+        # files removed from disk take their data out of the days they fed
+        if complete:
+            for file_path in set(self.files) - set(file_paths):
+                self.affected_days.update(self.files.pop(file_path)['days'])
+
+        return changed
+
+    # store the MST days a freshly parsed file contributed to
+    def record(self, file_path, days):
+        self.files[file_path]['days'] = sorted(days)
+        self.affected_days.update(days)
+
+    # list the known files holding data for any of the given days
+    def files_for_days(self, days):
+        days = set(days)
+        return [file_path for file_path, entry in self.files.items() if not days.isdisjoint(entry['days'])]
+
+    # parse the changed files plus every unchanged file sharing a day with them
+    # # read_file(path) -> dataframe, file_days(dataframe) -> MST day strings;
+    # # returns {path: dataframe}
+    def read(self, file_paths, read_file, file_days, complete=True):
+        frames = {}
+
+        for file_path in self.changed(file_paths, complete):
+            frames[file_path] = read_file(file_path)
+            self.record(file_path, file_days(frames[file_path]))
+
+        # affected days are only complete once all of their files are loaded
+        for file_path in self.files_for_days(self.affected_days):
+            if file_path not in frames:
+                frames[file_path] = read_file(file_path)
+
+        return frames
+
+    # split the files to stream into (changed files, all files to read): the
+    # changed ones plus every known file sharing a day with them
+    # # days_of(path) estimates a changed file's days before it is parsed (e.g.
+    # # from its time span); record() stores the real days once it is read
+    def stream_files(self, file_paths, days_of, complete=True):
+        changed = self.changed(file_paths, complete)
+        days = set(self.affected_days)
+        for file_path in changed:
+            days.update(days_of(file_path))
+        return changed, sorted(set(changed) | set(self.files_for_days(days)))
+
+    # keep only the daily data that needs to be re-plotted (within start..end)
+    # # takes a dict or (date, day_data) pairs and yields the selected pairs;
+    # # pending days are updated again at the end, since streamed files only
+    # # add their days while they are read
+    def select_days(self, daily_data, start=None, end=None):
+        self.pending_days = {day for day in self.affected_days if not day_in_window(day, start, end)}
+        items = daily_data.items() if isinstance(daily_data, dict) else daily_data
+        return self._select_days(items, start, end)
+
+    def _select_days(self, items, start, end):
+        for date, day_data in items:
+            if date in self.affected_days and day_in_window(date, start, end):
+                yield date, day_data
+        self.pending_days = {day for day in self.affected_days if not day_in_window(day, start, end)}
+
+    # keep days that could not be plotted pending, so the next run redoes them
+    def keep_pending(self, days):
+        self.pending_days.update(days)
+
+    # write the manifest (via a temporary file so a crash never corrupts it)
+    def save(self):
+        write_json(self.path, {'version': MANIFEST_VERSION, 'settings': self.settings, 'files': self.files,
+                               'pending': sorted(self.pending_days)})
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# merge time-sorted files into one frame, handling duplicate time stamps
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+
+from quicklook import timing
+
+
+# what to do with rows sharing a time stamp (overlapping or re-downloaded files,
+# or rows repeated within a file): keep the 'first' or 'last' of them (in file
+# name order), average them ('mean'), or 'keep' every row as before
+DUPLICATE_POLICIES = ('first', 'last', 'mean', 'keep')
+
+
+# sort one file's rows by time (already sorted files are left untouched)
+def sort_run(df, time_column):
+    if df[time_column].is_monotonic_increasing:
+        return df
+    return df.sort_values(by=time_column, kind='stable', na_position='last')
+
+
+# merge the frames of several files into one frame in time order
+# # each frame is sorted once, then the sorted runs are merged with a stable
+# # sort (timsort merges k presorted runs in O(N log k)); rows without a time
+# # stamp go last. names labels the frames (file paths) in the overlap report
+# # returns (merged frame, overlaps): one dict per pair of files whose time
+# # spans overlap, with the overlapping span and the number of shared stamps
+def merge_runs(runs, time_column, duplicates='first', names=None):
+    if duplicates not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy '{duplicates}', expected one of {DUPLICATE_POLICIES}")
+
+    names = list(names) if names is not None else list(range(len(runs)))
+    order = sorted(range(len(runs)), key=lambda i: str(names[i]))
+    runs, names = [sort_run(runs[i], time_column) for i in order], [names[i] for i in order]
+
+    with timing.stage('merge', rows=sum(len(df) for df in runs)) as record:
+        merged = pd.concat(runs, ignore_index=True) if len(runs) > 1 else runs[0].reset_index(drop=True)
+        record['files'] = len(runs)
+        if len(merged) == 0:
+            return merged, []
+
+        # nanosecond stamps and source file of every row with a time stamp
+        times = pd.DatetimeIndex(merged[time_column])
+        valid = np.flatnonzero(times.notna())
+        stamps = times.asi8[valid]
+        source = np.repeat(np.arange(len(runs)), [len(df) for df in runs])[valid]
+
+        # first and last stamp of every file (each run is sorted, missing stamps last)
+        ends = np.cumsum(np.bincount(source, minlength=len(runs)))
+        spans = {s: (times[valid[end - count]], times[valid[end - 1]])
+                 for s, (end, count) in enumerate(zip(ends, np.diff(np.r_[0, ends]))) if count}
+
+        # merge the sorted runs (nothing to do when the files follow each other)
+        if np.any(stamps[1:] < stamps[:-1]):
+            merge_order = np.argsort(stamps, kind='stable')
+            valid, stamps, source = valid[merge_order], stamps[merge_order], source[merge_order]
+
+        repeated = stamps[1:] == stamps[:-1]
+        overlaps = find_overlaps(spans, source, repeated, names)
+        record['duplicates'], record['overlaps'] = int(repeated.sum()), overlaps
+
+        # resolve duplicate time stamps
+        if duplicates == 'keep' or not repeated.any():
+            result = merged.take(valid)
+        elif duplicates == 'first':
+            result = merged.take(valid[np.r_[True, ~repeated]])
+        elif duplicates == 'last':
+            result = merged.take(valid[np.r_[~repeated, True]])
+        else:
+            result = mean_duplicates(merged.take(valid), repeated)
+
+        # rows without a time stamp are kept at the end, as sorting left them
+        missing = np.setdiff1d(np.arange(len(merged)), valid, assume_unique=True)
+        if len(missing):
+            result = pd.concat([result, merged.take(missing)])
+
+    return result.reset_index(drop=True), overlaps
+
+
+# average the numeric columns of rows sharing a time stamp (other columns
+# keep the first row's value); repeated flags rows equal to the one before
+def mean_duplicates(df, repeated):
+    first = np.r_[True, ~repeated]
+    groups = np.cumsum(first) - 1
+    result = df[first].copy()
+    numeric = df.select_dtypes('number').columns
+    means = df[numeric].groupby(groups).mean()
+    for column in numeric:
+        result[column] = means[column].to_numpy().astype(df[column].dtype)
+    return result
+
+
+# pairs of files with overlapping time spans, with the number of time stamps
+# they share; spans maps file numbers to their (first, last) Timestamps, source
+# gives the file number of every row in merged order
+def find_overlaps(spans, source, repeated, names):
+    
+    # stamps shared by neighbouring rows from different files
+    across = np.flatnonzero(repeated & (source[1:] != source[:-1]))
+    pairs = np.sort(np.stack([source[across], source[across + 1]], axis=1), axis=1)
+    shared = {(a, b): int(count) for (a, b), count in zip(*np.unique(pairs, axis=0, return_counts=True))}
+    
+    # sweep the files in order of their first stamp
+    overlaps = []
+    by_start = sorted(spans, key=lambda s: spans[s])
+    for i, a in enumerate(by_start):
+        for b in by_start[i + 1:]:
+            if spans[b][0] > spans[a][1]:
+                break
+            overlaps.append({
+                'file': names[min(a, b)],
+                'other': names[max(a, b)],
+                'first': spans[b][0],
+                'last': pd.Timestamp(min(spans[a][1], spans[b][1])),
+                'shared': shared.get((min(a, b), max(a, b)), 0),
+            })
+    return overlaps
+
+
+# print one line per pair of overlapping files
+def report_overlaps(overlaps, label=None):
+    prefix = f"{label}: " if label else ''
+    for overlap in overlaps:
+        print(f"{prefix}{overlap['file']} overlaps {overlap['other']} from {overlap['first']} to "
+              f"{overlap['last']} ({overlap['shared']} shared time stamps)")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# fingerprints of rendered plots, so unchanged outputs are not redrawn
+###############################################################################
+
+# import packages
+import hashlib
+import os
+import numpy as np
+
+from quicklook.atomic_json import read_json, write_json
+
+
+# bump whenever the layout of the saved index changes
+OUTPUTS_VERSION = 1
+
+
+# fingerprint the inputs of one render: arrays by dtype, shape and contents,
+# everything else (dates, count limits, titles, settings) by repr
+def render_key(*parts):
+    digest = hashlib.sha1()
+    _update(digest, parts)
+    return digest.hexdigest()
+
+
+def _update(digest, value):
+    if isinstance(value, np.ma.MaskedArray):
+        _update(digest, (value.data, np.ma.getmaskarray(value)))
+    elif isinstance(value, np.ndarray):
+        digest.update(f'{value.dtype.str}{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (tuple, list)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _update(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+# remember the render key of every png written, so a later run can skip a plot
+# whose inputs and settings are unchanged and whose files are still there
+class OutputIndex:
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = {}
+
+        # an unreadable or outdated index (e.g. one cut short by a killed run)
+        # simply means everything is redrawn
+        saved = read_json(path)
+        if saved.get('version') == OUTPUTS_VERSION:
+            self.keys = saved['outputs']
+
+    # check if every file of a plot exists and was written from this key
+    def is_current(self, file_paths, key):
+        return all(self.keys.get(file_path) == key and os.path.exists(file_path) for file_path in file_paths)
+
+    # store the key the files of a plot were written from
+    def record(self, file_paths, key):
+        for file_path in file_paths:
+            self.keys[file_path] = key
+
+    # write the index (via a temporary file so a crash never corrupts it)
+    def save(self):
+        write_json(self.path, {'version': OUTPUTS_VERSION, 'outputs': self.keys})
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# typed csv parsing for GRIMM and Quant files
+###############################################################################
+
+# import packages
+import re
+import numpy as np
+import pandas as pd
+
+
+# parser backends accepted by pd.read_csv ('pyarrow' is multi-threaded but optional)
+ENGINES = ('c', 'pyarrow')
+
+# exact time stamp layouts tried (in order) on a sample of each file; the one
+# that fits is cached by the digit/separator pattern of the sample
+TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f',
+                '%Y-%m-%dT%H:%M:%SZ', '%Y/%m/%d %H:%M:%S', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M')
+
+# detected formats by time stamp pattern (e.g. '0000-00-00 00:00:00')
+_formats = {}
+
+# MST is UTC-7 all year (no daylight saving)
+MST_OFFSET = np.timedelta64(7, 'h')
+
+# headerless grimm files: time stamp followed by 32 count channels
+GRIMM_CHANNELS = 32
+GRIMM_DTYPES = {0: str, **{channel: np.float32 for channel in range(1, GRIMM_CHANNELS + 1)}}
+
+# quant columns needed by each product (format_quant keeps nothing else)
+QUANT_TIME_COLUMN = 'timestamp'
+QUANT_PRODUCTS = {
+    'opc': [f'opc_bin{i}' for i in range(24)] + ['opc_pm1', 'opc_pm25', 'opc_pm10'],
+    'neph': [f'neph_bin{i}' for i in range(6)] + ['neph_pm1', 'neph_pm25', 'neph_pm10'],
+}
+
+
+# quant columns to load for the requested products
+def quant_usecols(products):
+    return [QUANT_TIME_COLUMN] + [column for product in products for column in QUANT_PRODUCTS[product]]
+
+
+# explicit dtypes for the quant columns being loaded
+def quant_dtypes(products):
+    return {column: (str if column == QUANT_TIME_COLUMN else np.float32) for column in quant_usecols(products)}
+
+
+# fall back to pandas' own C parser when pyarrow is not installed
+def resolve_engine(engine):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown csv engine '{engine}', expected one of {ENGINES}")
+    
+    if engine == 'pyarrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("pyarrow is not installed, parsing csv files with the C engine")
+            return 'c'
+    
+    return engine
+
+
+# find the exact format of a column of time stamps from a small sample
+# # the answer is cached per pattern, so every later file with the same
+# # layout skips detection; None if no known format fits
+def detect_format(raw_time, sample_size=20):
+    sample = raw_time.dropna().astype(str).str.strip().iloc[:sample_size]
+    if sample.empty:
+        return None
+    
+    pattern = re.sub(r'\d', '0', sample.iloc[0])
+    if pattern not in _formats:
+        _formats[pattern] = None
+        for time_format in TIME_FORMATS:
+            if pd.to_datetime(sample, format=time_format, errors='coerce').notna().all():
+                _formats[pattern] = time_format
+                break
+    
+    return _formats[pattern]
+
+
+# parse UTC time stamps once with the detected exact format; only rows that do
+# not follow it (e.g. a different precision) go through per-element inference
+# # columns that are already datetimes are passed through (converted to UTC
+# # when utc=True), so later stages can call this without parsing again
+def parse_times(raw_time, utc=False, errors='raise'):
+    raw_time = pd.Series(raw_time) if not isinstance(raw_time, pd.Series) else raw_time
+    if pd.api.types.is_datetime64_any_dtype(raw_time):
+        if utc and raw_time.dt.tz is None:
+            return raw_time.dt.tz_localize('UTC')
+        return raw_time.dt.tz_convert('UTC') if utc else raw_time
+    
+    time_format = detect_format(raw_time)
+    if time_format is None:
+        return pd.to_datetime(raw_time, format='mixed', utc=utc, errors=errors)
+    
+    times = pd.to_datetime(raw_time, format=time_format, utc=utc, errors='coerce')
+    outliers = times.isna() & raw_time.notna()
+    if outliers.any():
+        times[outliers] = pd.to_datetime(raw_time[outliers], format='mixed', utc=utc, errors=errors)
+    return times
+
+
+# MST days ('YYYY-MM-DD') covered by a column of UTC times (naive or tz-aware)
+def mst_days(utc):
+    if utc.dt.tz is not None:
+        utc = utc.dt.tz_convert('UTC').dt.tz_localize(None)
+    days = (utc.dropna().to_numpy(dtype='datetime64[ns]') - MST_OFFSET).astype('datetime64[D]')
+    return set(np.unique(days).astype(str))
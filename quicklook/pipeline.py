@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# batch and watch runs of one site's instrument
+###############################################################################
+
+# import packages
+import itertools
+import pandas as pd
+
+from quicklook import cache, grimm, quant, timing
+from quicklook.daily import resample_days, split
+from quicklook.export import Export
+from quicklook.file_index import FileIndex, day_in_window
+from quicklook.manifest import Manifest
+from quicklook.outputs import OutputIndex
+from quicklook.plotting import process_daily_data
+from quicklook.pyramid import Pyramid
+from quicklook.qc import QCReport
+from quicklook.summary import SummaryTable
+
+
+# name of an instrument's cache, pyramid and summary tables ('grimm' or 'quant_<product>')
+def product_name(settings):
+    if settings['instrument'] == 'quant':
+        return f"quant_{settings['product']}"
+    return settings['instrument']
+
+
+# read, bin and plot the MST days start..end (None = whole archive) of one
+# site's instrument, with settings from config.load_settings
+# # only new or changed days are re-plotted when a manifest is kept; returns
+# # {date: error} of the days that failed to plot
+def run(settings, start=None, end=None):
+    timing.reset()
+    daily_data, plot_bins, manifest, pyramid = prepare(settings, start, end)
+
+    # process and plot dust concentrations
+    outputs = OutputIndex(settings['outputs_path']) if settings['outputs_path'] else None
+    failures = process_daily_data(daily_data, plot_bins, settings['min_count'], settings['max_count'],
+                                  settings['save_dir'], settings['title'], settings['render_workers'],
+                                  settings['plot_renderer'], settings['plot_profiles'], outputs)
+
+    # redraw the weekly, monthly and seasonal plots holding any updated day
+    if pyramid is not None:
+        plot_periods(settings, pyramid, outputs)
+
+    # remember the ingested files only once their days have been plotted (days
+    # that failed to plot stay pending for the next run)
+    if manifest is not None:
+        manifest.keep_pending(failures)
+        manifest.save()
+
+    # save and summarize the run report (slowest stages, files and days)
+    if settings['report_path']:
+        timing.REPORT.write(settings['report_path'])
+    timing.REPORT.summary()
+
+    return failures
+
+
+# the days to plot: lazy (date, day_data) pairs of the MST days start..end that
+# are new or changed (plus cached days asked for again), passed through the
+# cache, the data-quality check, pyramid, summary tables and export and
+# resampled; with the bins table of the plots, the manifest (save it once the
+# days are plotted) and the pyramid
+def prepare(settings, start=None, end=None):
+    name = product_name(settings)
+    windowed = start is not None or end is not None
+    bins = pd.DataFrame(settings['bins'])
+
+    # changing the efficiencies, bins or duplicate policy invalidates the manifest and the cache
+    key = cache.settings_key(settings['efficiencies'], bins, settings['duplicate_policy'])
+    manifest = Manifest(settings['manifest_path'], key) if settings['manifest_path'] else None
+
+    # find unchanged days to redraw from the cache (stale days get re-parsed below)
+    cached = []
+    if manifest is not None and (settings['replot_all'] or windowed):
+        cached = cache.cached_days(settings['cache_dir'], name, manifest, key, start, end)
+
+    # inlet efficiency of every raw grimm channel (quant counts are used as they are)
+    eff = grimm.efficiency_channels(settings['efficiencies']) if settings['instrument'] == 'grimm' else None
+
+    # scan every file for data-quality issues as it is parsed
+    qc = None
+    if settings['qc_path'] or settings['qc_mask']:
+        qc = QCReport(settings['qc_path'], settings['instrument'], eff, bins)
+
+    # read the csv data (only new or changed files when a manifest is kept)
+    read = read_grimm_days if settings['instrument'] == 'grimm' else read_quant_days
+    daily_data, plot_bins = read(settings, bins, manifest, start, end, qc)
+
+    # only re-plot days touched by new or changed files (caching them on the way),
+    # followed by the cached days that did not need re-parsing
+    if manifest is not None:
+        daily_data = manifest.select_days(daily_data, start, end)
+        daily_data = cache.store_days(settings['cache_dir'], name, daily_data, manifest, key)
+        daily_data = itertools.chain(daily_data, cache.read_days(settings['cache_dir'], name, cached, manifest, key))
+    elif windowed:
+        daily_data = ((date, day_data) for date, day_data in daily_data if day_in_window(date, start, end))
+
+    # count (and optionally mask) bad values of every day, writing the QC report
+    # once the days are done (the cache keeps the values as read)
+    if qc is not None:
+        daily_data = qc.check_days(daily_data, settings['qc_mask'])
+
+    # fold every processed day into the aggregate pyramid on its way to the plots
+    pyramid = Pyramid(settings['pyramid_dir'], name, key) if settings['pyramid_dir'] else None
+    if pyramid is not None:
+        daily_data = pyramid.store_days(daily_data)
+
+    # summarize every processed day into the daily/hourly tables
+    if settings['summary_dir']:
+        summary = SummaryTable(settings['summary_dir'], name, plot_bins, settings['summary_hourly'],
+                               settings['summary_format'])
+        daily_data = summary.store_days(daily_data)
+
+    # export every processed day as chunked, compressed arrays for use outside quicklook
+    if settings['export_dir']:
+        attrs = {'title': settings['title'], 'site': settings['site'], 'product': name, 'settings_key': key}
+        export = Export(settings['export_dir'], name, bins, eff, attrs, settings['export_format'])
+        daily_data = export.store_days(daily_data)
+
+    # optionally average each day onto a coarser time step (the cache keeps raw data)
+    daily_data = resample_days(daily_data, settings['resample_rule'], settings['resample_how'])
+
+    return daily_data, plot_bins, manifest, pyramid
+
+
+# redraw the weekly, monthly and seasonal plots holding a day the pyramid stored
+def plot_periods(settings, pyramid, outputs=None):
+    return pyramid.plot_periods(settings['period_plots'], settings['min_count'], settings['max_count'],
+                                settings['save_dir'], settings['title'], settings['plot_renderer'],
+                                profiles=settings['plot_profiles'], outputs=outputs)
+
+
+# (date, day_data) pairs of binned grimm data and the bins table of the plots
+def read_grimm_days(settings, bins, manifest, start, end, qc=None):
+    index = FileIndex(settings['index_path']) if settings['index_path'] else None
+    args = (settings['data_dir'], settings['efficiencies'])
+    kwargs = dict(manifest=manifest, engine=settings['csv_engine'], start=start, end=end, index=index,
+                  duplicates=settings['duplicate_policy'], qc=qc)
+
+    if settings['streaming']:
+        daily_data = grimm.stream_grimm(*args, bins, settings['save_dir'], settings['title'], settings['years'],
+                                        **kwargs)
+        return daily_data, grimm.bin_table(bins)
+
+    grimm_utc, data = grimm.read_grimm(*args, settings['save_dir'], settings['title'], settings['years'], **kwargs)
+
+    with timing.stage('bin', rows=len(data)):
+        data, plot_bins = grimm.bin(data, bins)
+
+    # combine all csv files into one
+    with timing.stage('combine', rows=len(data)):
+        data = grimm.combine(grimm_utc, data)
+
+    return split(data), plot_bins
+
+
+# (date, day_data) pairs of one binned quant product and the bins table of the plots
+def read_quant_days(settings, bins, manifest, start, end, qc=None):
+    product = settings['product']
+    index = FileIndex(settings['index_path'], time_column='timestamp', header=True) if settings['index_path'] else None
+    args = (settings['data_dir'], settings['efficiencies'])
+    kwargs = dict(ver=settings['ver'], manifest=manifest, engine=settings['csv_engine'], start=start, end=end,
+                  index=index, duplicates=settings['duplicate_policy'], qc=qc)
+
+    if settings['streaming']:
+        daily_data = quant.stream_quant(*args, bins, settings['years'], product=product, **kwargs)
+        return daily_data, quant.bin_table(bins, product)
+
+    opc, neph = quant.read_quant(*args, settings['years'], products=[product], **kwargs)
+    data = opc if product == 'opc' else neph
+
+    with timing.stage('bin', rows=len(data)):
+        data, plot_bins = quant.bin(data, bins, product)
+
+    # split the combined data set according to the day dust was collected
+    return split(data), plot_bins
+
+
+# append the rows of new or grown csv files to the instrument's binary archive
+def update_archive(settings):
+    timing.reset()
+    if settings['instrument'] == 'grimm':
+        archive = grimm.archive_grimm(settings['archive_dir'], settings['data_dir'], settings['save_dir'],
+                                      settings['title'], settings['years'], settings['csv_engine'])
+    else:
+        archive = quant.archive_quant(settings['archive_dir'], settings['data_dir'], settings['years'],
+                                      settings['ver'], settings['csv_engine'])
+    timing.REPORT.summary()
+    return archive
+
+
+# follow today's growing files and keep re-plotting today instead of a batch run
+# # polls limits the number of polls (None keeps watching until interrupted)
+def watch(settings, interval=60, polls=None):
+    bins = pd.DataFrame(settings['bins'])
+    args = (settings['data_dir'], settings['efficiencies'], bins, settings['save_dir'], settings['title'])
+    kwargs = dict(min_count=settings['min_count'], max_count=settings['max_count'], engine=settings['csv_engine'],
+                  renderer=settings['plot_renderer'], interval=interval, resample_rule=settings['resample_rule'],
+                  resample_how=settings['resample_how'], profiles=settings['plot_profiles'], polls=polls)
+
+    if settings['instrument'] == 'grimm':
+        return grimm.watch_grimm(*args, **kwargs)
+    return quant.watch_quant(*args, ver=settings['ver'], product=settings['product'], **kwargs)
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# daily size distribution plots
+###############################################################################
+
+# import packages
+import os
+import multiprocessing as mp
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+from quicklook import timing
+from quicklook.outputs import render_key
+
+
+# Define RGBA values for different shades of gray
+light_gray = (0.9, 0.9, 0.9, 1.0)  # RGBA values for light gray
+medium_gray = (0.7, 0.7, 0.7, 1.0)  # RGBA values for medium gray
+dark_gray = (0.5, 0.5, 0.5, 1.0)  # RGBA values for dark gray
+
+# Combine the colors into a list for a custom colormap
+COLORS = ["white", light_gray, medium_gray, dark_gray, "#0C2C84", "#225EA8", "#1D91C0", "#41B6C4",
+          "#7FCDBB", "#C7E9B4", "#FED976", "#FEB24C", "#FD8D3C", "#FC4E2A", "#E31A1C", "#B10026",
+          "red", "black"]
+
+# nanoseconds per hour, for tick arithmetic on int64 times
+HOUR_NS = 3600 * 10**9
+
+# Specify sensible diameter tick labels
+Y_TICKS = [0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 2, 3, 4, 5, 6, 7, 8, 9, 10, 20, 30, 40]
+
+# bump whenever the look of the plots changes, so unchanged days are redrawn anyway
+PLOT_VERSION = 1
+
+# png quality profiles: resolution and the subdirectory of the plot directory
+# the files go to ('' is the usual <year>/<date>_<title>.png); every profile
+# asked for is written from the same drawn figure
+QUALITY_PROFILES = {
+    'archival': {'dpi': 400, 'directory': ''},
+    'preview': {'dpi': 100, 'directory': 'preview'},
+    'thumbnail': {'dpi': 30, 'directory': 'thumbnails'},
+}
+
+
+# pull the arrays plot_size_dist needs out of one day of binned data
+def size_dist_arrays(day_data, bins):
+    
+    # MST wall-clock times (tz-naive) for the x-axis
+    mst = day_data['Time_MST']
+    if mst.dt.tz is not None:
+        mst = mst.dt.tz_localize(None)
+
+    # Use only bin columns that match the provided bins DataFrame
+    bin_columns = [dp for dp in bins['Dp'] if dp in day_data.columns]
+    count = day_data[bin_columns].values.T
+    
+    return mst.to_numpy(), np.asarray(bin_columns, dtype=float), count
+
+
+# iterate through each date for plotting
+# # daily_data is a dict or (date, day_data) pairs, e.g. straight from split()
+# # workers > 1 renders days in parallel; a failing day is reported and skipped
+# # renderer is 'contour' (contourf, the original look) or 'raster' (flat cells, faster)
+# # profiles names the QUALITY_PROFILES to write; with an OutputIndex, days
+# # whose pngs were written from identical inputs are skipped
+def process_daily_data(daily_data, bins, min_count, max_count, path, title, workers=1, renderer='contour',
+                       profiles=('archival',), outputs=None):
+    
+    tasks = day_tasks(daily_data, bins, min_count, max_count, path, title)
+    failures = render_days(tasks, workers, RENDERERS[renderer], profiles, outputs)
+    for date, error in failures.items():
+        print(f"Failed to plot {date} for {title}: {error}")
+    
+    return failures
+
+
+# lazy (date, args) render tasks of daily data (a dict or (date, day_data) pairs)
+# # every render is handed only that day's arrays, never the whole dataframe
+def day_tasks(daily_data, bins, min_count, max_count, path, title):
+    items = daily_data.items() if isinstance(daily_data, dict) else daily_data
+    return ((date, size_dist_arrays(day_data, bins) + (date, min_count, max_count, path, title))
+            for date, day_data in items)
+
+
+# render each (date, args) task with render (e.g. render_size_dist), serially or on a process pool
+# # every day is timed as a 'plot' stage in the run report; args follow the
+# # renderers' signature (time_mst, dp, count, date, min, max, path, title, ...)
+# # with an OutputIndex, tasks whose pngs are current are skipped and the keys
+# # of the plots written are saved at the end
+def render_days(tasks, workers=1, render=None, profiles=('archival',), outputs=None):
+    render = render if render is not None else render_size_dist
+    profiles = resolve_profiles(profiles)
+    failures = {}
+    written = {}
+    
+    if outputs is not None:
+        tasks = changed_tasks(tasks, render, profiles, outputs, written)
+    
+    # workers are forked so they inherit the loaded modules and settings (spawned
+    # workers would re-import the caller, which may be a script without a main guard)
+    if workers <= 1 or 'fork' not in mp.get_all_start_methods():
+        for date, args in tasks:
+            error = render_timed(render, date, args, profiles)[1]
+            if error is not None:
+                failures[date] = error
+    
+    # keep only a couple of days per worker in flight so memory stays flat
+    else:
+        context = mp.get_context('fork')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = {}
+            for date, args in tasks:
+                if len(pending) >= 2 * workers:
+                    _collect(wait(pending, return_when=FIRST_COMPLETED).done, pending, failures)
+                pending[pool.submit(render_timed, render, date, args, profiles)] = date
+            _collect(wait(pending).done, pending, failures)
+    
+    # remember what the successful plots were drawn from
+    if outputs is not None:
+        for date, (file_paths, key) in written.items():
+            if date not in failures:
+                outputs.record(file_paths, key)
+        outputs.save()
+    
+    return failures
+
+
+# pass on the tasks whose pngs are missing or were drawn from other inputs,
+# noting the files and key of each one in written
+def changed_tasks(tasks, render, profiles, outputs, written):
+    skipped = 0
+    for date, args in tasks:
+        with timing.stage('hash', date, rows=len(args[0])) as record:
+            file_paths = output_paths(args[0], args[3], args[6], args[7], profiles)
+            key = render_key(PLOT_VERSION, render.__name__, [QUALITY_PROFILES[name] for name in profiles], args)
+            record['skipped'] = outputs.is_current(file_paths, key)
+        if record['skipped']:
+            skipped += 1
+            continue
+        written[date] = (file_paths, key)
+        yield date, args
+    
+    if skipped:
+        print(f"Skipped {skipped} unchanged plots")
+
+
+# render one day, returning the timing records it made and its error (if any)
+# # records made in a worker process only reach the run report this way
+def render_timed(render, date, args, profiles=('archival',)):
+    first = len(timing.REPORT.records)
+    error = None
+    try:
+        with timing.stage('plot', date, rows=len(args[0])):
+            render(*args, profiles=profiles)
+    except Exception as exc:
+        error = exc
+    return timing.REPORT.records[first:], error
+
+
+# record the outcome of finished render futures
+def _collect(done, pending, failures):
+    for future in done:
+        date = pending.pop(future)
+        try:
+            records, error = future.result()
+        except Exception as exc:
+            failures[date] = exc
+            continue
+        timing.REPORT.extend(records)
+        if error is not None:
+            failures[date] = error
+
+
+# create a daily plot from one day of binned data
+def plot_size_dist(day_data, date, bins, min_count, max_count, path, title, renderer='contour',
+                   profiles=('archival',)):
+    time_mst, dp, count = size_dist_arrays(day_data, bins)
+    RENDERERS[renderer](time_mst, dp, count, date, min_count, max_count, path, title,
+                        profiles=resolve_profiles(profiles))
+
+
+# create daily contour plots
+# # ticks = (positions, labels) for the x-axis, hourly ticks by default
+# # one png is written per quality profile (see QUALITY_PROFILES)
+def render_size_dist(time_mst, dp, count, date, min_count, max_count, path, title, ticks=None,
+                     profiles=('archival',)):
+
+    # Create a meshgrid for the contour plot
+    X, Y = np.meshgrid(range(len(time_mst)), dp)
+
+    # Colormap, contour levels and norm (built once per count range)
+    custom_cmap, count_range, norm = size_dist_style(min_count, max_count)
+
+    # Create a contour plot
+    fig = new_figure(figsize=(12, 6))
+    ax1 = fig.add_subplot()
+    contour = ax1.contourf(X, Y, count, levels=count_range, cmap=custom_cmap, norm=norm)
+
+    # Add colorbar
+    cbar = fig.colorbar(contour, ax=ax1, ticks=count_range, pad=0.1)
+
+    # Set colorbar title above the colorbar
+    cbar.ax.text(0.5, 1.05, 'dN/dlogDp', ha='center', va='center', transform=cbar.ax.transAxes, weight='bold')
+
+    # Set labels and title
+    ax1.set_ylabel('Diameter Midpoint (μm)', fontsize=14)
+
+    # Set the title with formatted date
+    ax1.set_title(f'{title} Aerosol Distributions (MST): {date}', fontsize=14, weight='bold')
+
+    # Set x-axis ticks and labels
+    tick_positions, tick_labels = ticks if ticks is not None else hour_ticks(time_mst)
+    ax1.set_xticks(tick_positions)
+    ax1.set_xticklabels(tick_labels, rotation=45, ha='right')
+
+    # Set y-axis to log scale
+    ax1.set_yscale('log')
+
+    # Specify sensible tick labels
+    ax1.set_yticks(Y_TICKS)
+    ax1.set_yticklabels(Y_TICKS, fontsize=8)
+    
+
+    # Save plot
+    save_figure(fig, time_mst, date, path, title, profiles, 'tight')
+
+
+# create daily plots as a raster image on a figure reused from day to day
+# # much faster than contourf + a fresh figure and tight-bbox pass per day;
+# # each cell is drawn flat instead of interpolated between samples. The
+# # y-axis is linear in log10(Dp) (labelled in µm) so pcolorfast can draw the
+# # non-uniform cells as one image instead of hundreds of thousands of quads
+def render_size_dist_raster(time_mst, dp, count, date, min_count, max_count, path, title, ticks=None,
+                            profiles=('archival',)):
+    template = _raster_template(min_count, max_count, title)
+    ax1 = template['ax']
+
+    # replace the previous day's image with this day's cells
+    if template['mesh'] is not None:
+        template['mesh'].remove()
+    x_edges = np.arange(len(time_mst) + 1) - 0.5
+    template['mesh'] = ax1.pcolorfast(x_edges, np.log10(log_edges(dp)), count,
+                                      cmap=template['cmap'], norm=template['norm'])
+
+    # match the extent contourf would give (sample 0..N-1, first..last midpoint)
+    ax1.set_xlim(0, len(time_mst) - 1)
+    ax1.set_ylim(np.log10(dp[0]), np.log10(dp[-1]))
+
+    # Set the title with formatted date
+    ax1.set_title(f'{title} Aerosol Distributions (MST): {date}', fontsize=14, weight='bold')
+
+    # Set x-axis ticks and labels
+    tick_positions, tick_labels = ticks if ticks is not None else hour_ticks(time_mst)
+    ax1.set_xticks(tick_positions)
+    ax1.set_xticklabels(tick_labels, rotation=45, ha='right')
+
+    # the tight bounding box is measured once and reused for every later day
+    fig = template['fig']
+    if template['bbox'] is None:
+        template['bbox'] = fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.1)
+    save_figure(fig, time_mst, date, path, title, profiles, template['bbox'])
+
+
+# a bare Figure (not pyplot) on an Agg canvas: never shown, drawn headless
+# whatever the backend, and it is freed with its last reference
+# # matplotlib is imported here, on the first plot, so reading and binning
+# # (and the command line) never pay for it
+def new_figure(figsize):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+# write a drawn figure once per quality profile
+def save_figure(fig, time_mst, date, path, title, profiles, bbox_inches='tight'):
+    for name, file_path in zip(profiles, output_paths(time_mst, date, path, title, profiles)):
+        with timing.stage('savefig', date) as record:
+            record['profile'] = name
+            fig.savefig(file_path, dpi=QUALITY_PROFILES[name]['dpi'], bbox_inches=bbox_inches)
+
+
+# check the names of the quality profiles to write (a name or a list of them)
+def resolve_profiles(profiles):
+    profiles = (profiles,) if isinstance(profiles, str) else tuple(profiles)
+    unknown = [name for name in profiles if name not in QUALITY_PROFILES]
+    if unknown:
+        raise ValueError(f"Unknown quality profile(s) {unknown}, expected any of {list(QUALITY_PROFILES)}")
+    
+    # two profiles writing the same file would overwrite each other
+    directories = [QUALITY_PROFILES[name]['directory'] for name in profiles]
+    if not profiles or len(set(directories)) < len(directories):
+        raise ValueError(f"Quality profiles {list(profiles)} must write to different directories")
+    return profiles
+
+
+# renderers selectable in process_daily_data
+RENDERERS = {
+    'contour': render_size_dist,
+    'raster': render_size_dist_raster,
+}
+
+# figure templates for the raster renderer, one per process and plot setup
+_templates = {}
+
+
+# build (or reuse) the figure, axes and colorbar shared by every raster day
+def _raster_template(min_count, max_count, title):
+    key = (os.getpid(), min_count, max_count, title)
+    if key in _templates:
+        return _templates[key]
+
+    custom_cmap, count_range, norm = size_dist_style(min_count, max_count)
+
+    # values outside the levels stay blank, as they do with contourf
+    custom_cmap = custom_cmap.with_extremes(under=(0, 0, 0, 0), over=(0, 0, 0, 0))
+
+    fig = new_figure(figsize=(12, 6))
+    ax1 = fig.add_subplot()
+
+    # Add colorbar
+    from matplotlib.cm import ScalarMappable
+    cbar = fig.colorbar(ScalarMappable(norm=norm, cmap=custom_cmap), ax=ax1, ticks=count_range, pad=0.1)
+
+    # Set colorbar title above the colorbar
+    cbar.ax.text(0.5, 1.05, 'dN/dlogDp', ha='center', va='center', transform=cbar.ax.transAxes, weight='bold')
+
+    # Set labels
+    ax1.set_ylabel('Diameter Midpoint (μm)', fontsize=14)
+
+    # log10(Dp) axis with sensible tick labels in µm
+    ax1.set_yticks(np.log10(Y_TICKS))
+    ax1.set_yticklabels(Y_TICKS, fontsize=8)
+
+    _templates[key] = {'fig': fig, 'ax': ax1, 'cmap': custom_cmap, 'norm': norm, 'mesh': None, 'bbox': None}
+    return _templates[key]
+
+
+# colormap, contour levels and norm for a count range (cached, they never change)
+@lru_cache(maxsize=None)
+def size_dist_style(min_count, max_count):
+    from matplotlib.colors import BoundaryNorm, ListedColormap
+    custom_cmap = ListedColormap(COLORS)
+
+    # Initialize count_range for colorbar
+    count_range = []
+    n = 50
+    bonus = []
+
+    # Develop the range for contour levels
+    while len(count_range) < len(COLORS):
+        count_range = np.linspace(min_count, max_count, 10)
+        count_range = np.ceil(count_range / 500) * 500
+        count_range = np.concatenate(([1, 2, 3, 4, 5, 10, 25, 50], count_range))
+
+        count_range = np.concatenate((count_range, bonus))
+
+        count_range = np.sort(count_range)
+
+
+        count_range = list(np.unique(count_range.astype(int)))
+
+        n = n + 50
+        bonus.append(n)
+
+    # Create a norm for boundary values in the colormap
+    norm = BoundaryNorm(count_range, custom_cmap.N)
+    
+    return custom_cmap, count_range, norm
+
+
+# cell edges on a log-diameter grid around the Dp midpoints
+def log_edges(dp):
+    log_dp = np.log10(dp)
+    inner = (log_dp[1:] + log_dp[:-1]) / 2
+    edges = np.concatenate(([2 * log_dp[0] - inner[0]], inner, [2 * log_dp[-1] - inner[-1]]))
+    return 10 ** edges
+
+
+# x-axis ticks at roughly 1-hour intervals, labelled with the nearest hour
+# # works on the int64 nanoseconds of the wall-clock times (no string round trip)
+def hour_ticks(time_mst):
+    ns = np.asarray(time_mst, dtype='datetime64[ns]').view('int64')
+    hour, rest = np.divmod(ns % (24 * HOUR_NS), HOUR_NS)
+
+    # Generate evenly spaced ticks from the earliest to the latest hour of the day
+    num_ticks = hour.max() - hour.min() + 2
+    tick_positions = np.linspace(0, len(ns) - 1, num_ticks, dtype=int)
+
+    # round to the nearest hour (half to even, as pandas does) and wrap past midnight
+    half = HOUR_NS // 2
+    up = (rest[tick_positions] > half) | ((rest[tick_positions] == half) & (hour[tick_positions] % 2 == 1))
+    rounded_hours = (hour[tick_positions] + up) % 24
+
+    return tick_positions, [f'{h:02d}:00' for h in rounded_hours]
+
+
+# png paths of one day, one per quality profile
+def output_paths(time_mst, date, path, title, profiles):
+    return [output_path(time_mst, date, os.path.join(path, QUALITY_PROFILES[name]['directory']), title)
+            for name in profiles]
+
+
+# png path for one day: <path>/<year>/<date>_<title>.png
+def output_path(time_mst, date, path, title):
+    year = pd.Timestamp(time_mst[0]).year
+    year_directory = os.path.join(path, str(year))
+    os.makedirs(year_directory, exist_ok=True)
+    return os.path.join(year_directory, f"{date}_{title}.png")
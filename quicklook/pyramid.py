@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# multi-resolution aggregates for weekly, monthly and seasonal plots
+###############################################################################
+
+# import packages
+import datetime as dt
+import os
+import numpy as np
+import pandas as pd
+
+from quicklook.daily import resample_day
+from quicklook.plotting import RENDERERS, render_days
+
+
+# bump whenever the layout of the stored .npz files changes
+PYRAMID_VERSION = 1
+
+# aggregation levels from finest to coarsest (pandas offsets on MST time)
+LEVELS = ('1min', '10min', '1h', '1D')
+
+# longest x-axis (in time steps) a period plot is drawn with; the finest level
+# that stays below it is used, e.g. 10-min means for a week, hourly for a season
+MAX_COLUMNS = 2500
+
+# meteorological seasons, labelled by the year of their last month
+SEASONS = {12: 'DJF', 1: 'DJF', 2: 'DJF', 3: 'MAM', 4: 'MAM', 5: 'MAM',
+           6: 'JJA', 7: 'JJA', 8: 'JJA', 9: 'SON', 10: 'SON', 11: 'SON'}
+
+# period plot products
+PERIODS = ('week', 'month', 'season')
+
+
+# dN/dlogDp means of one day at one level: MST times (datetime64, wall clock),
+# Dp midpoints, values (steps x bins) and valid samples per step
+def aggregate_day(day_data, level):
+    steps = resample_day(day_data, level, 'mean')
+    mst = steps['Time_MST']
+    if mst.dt.tz is not None:
+        mst = mst.dt.tz_localize(None)
+    dp = [column for column in steps.columns if isinstance(column, float)]
+    return {
+        'time': mst.to_numpy(dtype='datetime64[ns]'),
+        'dp': np.asarray(dp, dtype=float),
+        'values': steps[dp].to_numpy(dtype=np.float32),
+        'n_samples': steps['n_samples'].to_numpy(dtype=np.int32),
+    }
+
+
+# first day, last day and label of the period ('week', 'month' or 'season') holding a date
+def period_of(kind, date):
+    day = dt.date.fromisoformat(date) if isinstance(date, str) else date
+
+    if kind == 'week':
+        first = day - dt.timedelta(days=day.weekday())
+        year, week, _ = first.isocalendar()
+        return first, first + dt.timedelta(days=6), f'{year}-W{week:02d}'
+
+    if kind == 'month':
+        first = day.replace(day=1)
+        following = (first + dt.timedelta(days=32)).replace(day=1)
+        return first, following - dt.timedelta(days=1), f'{day:%Y-%m}'
+
+    if kind == 'season':
+        # seasons start in March, June, September and December
+        start_month = (day.month - 3) % 12 // 3 * 3 + 3
+        start_year = day.year - 1 if day.month < 3 else day.year
+        first = dt.date(start_year, (start_month - 1) % 12 + 1, 1)
+        last = (first + dt.timedelta(days=95)).replace(day=1) - dt.timedelta(days=1)
+        return first, last, f'{last.year}-{SEASONS[first.month]}'
+
+    raise ValueError(f"Unknown period '{kind}', expected one of {PERIODS}")
+
+
+# x-axis ticks at day boundaries, at most max_labels of them
+def period_ticks(time_mst, max_labels=12):
+    days = np.asarray(time_mst, dtype='datetime64[ns]').astype('datetime64[D]')
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    starts = starts[::-(-len(starts) // max_labels)]
+    return starts, [pd.Timestamp(days[i]).strftime('%b %d') for i in starts]
+
+
+# aggregates of binned dN/dlogDp per instrument and level, one .npz per month
+# # <path>/<instrument>/<level>/<YYYY-MM>.npz; days passing through
+# # store_days replace their rows, so the pyramid grows incrementally
+# # settings fingerprints the processing options (see cache.settings_key);
+# # months stored under other settings are treated as empty
+class Pyramid:
+
+    def __init__(self, path, instrument, settings=None, levels=LEVELS):
+        self.directory = os.path.join(path, instrument)
+        self.settings = settings
+        self.levels = levels
+
+        # days aggregated on this run (their periods get re-plotted)
+        self.updated_days = set()
+
+        # aggregated days not written yet: (level, month) -> {date: aggregate}
+        self._pending = {}
+
+    # aggregate each (date, day_data) pair as it passes through
+    def store_days(self, daily_data):
+        items = daily_data.items() if isinstance(daily_data, dict) else daily_data
+        for date, day_data in items:
+            self.add_day(date, day_data)
+            yield date, day_data
+        self.flush()
+
+    # aggregate one day at every level
+    def add_day(self, date, day_data):
+        month = date[:7]
+        for level in self.levels:
+            self._pending.setdefault((level, month), {})[date] = aggregate_day(day_data, level)
+        self.updated_days.add(date)
+
+        # days mostly arrive in order, so only the latest two months stay in memory
+        for old_month in sorted({month for _, month in self._pending})[:-2]:
+            self.flush(old_month)
+
+    # write the pending days of one month (or of all months)
+    def flush(self, month=None):
+        for level, pending_month in [key for key in self._pending if month is None or key[1] == month]:
+            self._write_month(level, pending_month, self._pending.pop((level, pending_month)))
+
+    # location of one month of one level
+    def month_path(self, level, month):
+        return os.path.join(self.directory, level, f'{month}.npz')
+
+    # load one month of one level, or None when missing or built with other settings
+    def read_month(self, level, month):
+        path = self.month_path(level, month)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as stored:
+            if int(stored['version']) != PYRAMID_VERSION or str(stored['settings']) != str(self.settings):
+                return None
+            return {name: stored[name] for name in ('time', 'dp', 'values', 'n_samples')}
+
+    # replace the given days in one month file
+    def _write_month(self, level, month, days):
+        parts = list(days.values())
+        stored = self.read_month(level, month)
+        if stored is not None and np.array_equal(stored['dp'], parts[0]['dp']):
+            keep = ~np.isin(stored['time'].astype('datetime64[D]').astype(str), list(days))
+            parts.insert(0, {name: (array[keep] if name != 'dp' else array) for name, array in stored.items()})
+
+        time = np.concatenate([part['time'] for part in parts])
+        order = np.argsort(time, kind='stable')
+        arrays = {
+            'version': np.array(PYRAMID_VERSION),
+            'settings': np.array(str(self.settings)),
+            'time': time[order],
+            'dp': parts[0]['dp'],
+            'values': np.concatenate([part['values'] for part in parts])[order],
+            'n_samples': np.concatenate([part['n_samples'] for part in parts])[order],
+        }
+
+        # write via a temporary file so readers never see a partial month
+        path = self.month_path(level, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    # the finest level drawing first..last in at most max_columns time steps
+    def choose_level(self, first, last, max_columns=MAX_COLUMNS):
+        span = pd.Timedelta(days=(last - first).days + 1)
+        for level in self.levels:
+            if span / pd.Timedelta(level) <= max_columns:
+                return level
+        return self.levels[-1]
+
+    # one level over the MST days first..last on a regular time grid (steps
+    # without data are NaN so gaps show up as gaps); None if there is no data
+    def read(self, level, first, last):
+        months = pd.period_range(first, last, freq='M').strftime('%Y-%m')
+        parts = [part for part in (self.read_month(level, month) for month in months) if part is not None]
+        if not parts:
+            return None
+
+        grid = pd.date_range(first, last + dt.timedelta(days=1), freq=level, inclusive='left').to_numpy()
+        dp = parts[0]['dp']
+        values = np.full((len(grid), len(dp)), np.nan, dtype=np.float32)
+        n_samples = np.zeros(len(grid), dtype=np.int32)
+        for part in parts:
+            if not np.array_equal(part['dp'], dp):
+                continue
+            slots = np.searchsorted(grid, part['time'])
+            inside = (slots < len(grid)) & (grid[np.minimum(slots, len(grid) - 1)] == part['time'])
+            values[slots[inside]] = part['values'][inside]
+            n_samples[slots[inside]] = part['n_samples'][inside]
+
+        if not n_samples.any():
+            return None
+        return grid, dp, values, n_samples
+
+    # re-plot every period product (see PERIODS) holding a day updated on this run
+    # # plots go to <path>/<kind>/<year>/<label>_<title>.png; profiles and
+    # # outputs are as for plotting.process_daily_data
+    def plot_periods(self, kinds, min_count, max_count, path, title, renderer='contour', max_columns=MAX_COLUMNS,
+                     profiles=('archival',), outputs=None):
+        periods = sorted({(kind,) + period_of(kind, date) for kind in kinds for date in self.updated_days})
+
+        tasks = []
+        for kind, first, last, label in periods:
+            level = self.choose_level(first, last, max_columns)
+            data = self.read(level, first, last)
+            if data is None:
+                continue
+            time_mst, dp, values, _ = data
+            count = np.ma.masked_invalid(values.T)
+            tasks.append((label, (time_mst, dp, count, label, min_count, max_count, os.path.join(path, kind),
+                                  title, period_ticks(time_mst))))
+
+        failures = render_days(tasks, 1, RENDERERS[renderer], profiles, outputs)
+        for label, error in failures.items():
+            print(f"Failed to plot {label} for {title}: {error}")
+        return failures
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# data-quality scan of parsed files and masking of bad values
+###############################################################################
+
+# import packages
+import datetime as dt
+import os
+import numpy as np
+
+from quicklook import timing
+from quicklook.atomic_json import read_json, write_json
+from quicklook.archive import LAYOUTS, NAT_NS, epoch_ns
+from quicklook.bins import BinSpec
+
+
+# bump whenever the layout of the saved report changes
+QC_VERSION = 2
+
+# a gap is a step between samples longer than GAP_FACTOR times the file's cadence
+GAP_FACTOR = 5
+
+# longest gaps listed per file
+MAX_GAPS = 5
+
+
+# findings of one parsed file, from its time stamps (int64 epoch ns, NaT as
+# NAT_NS) and raw count matrix (samples x channels), in one pass
+# # zero_efficiency marks the channels divided by a zero inlet efficiency,
+# # where a count becomes inf (or NaN when it is 0)
+def scan_arrays(times, counts, channels, zero_efficiency=None):
+    nat = times == NAT_NS
+    stamped = times[~nat]
+    steps = np.diff(stamped)
+
+    # time stamps: repeats, steps backwards and gaps beyond GAP_FACTOR x the cadence
+    forward = steps[steps > 0]
+    cadence = np.median(forward) if len(forward) else 0
+    gap = np.flatnonzero(steps > GAP_FACTOR * cadence) if cadence else np.empty(0, dtype=int)
+    longest = gap[np.argsort(steps[gap])[::-1][:MAX_GAPS]]
+
+    findings = {
+        'rows': int(len(times)),
+        'nat_times': int(nat.sum()),
+        'duplicate_times': int(len(stamped) - len(np.unique(stamped))),
+        'non_monotonic': int((steps < 0).sum()),
+        'cadence_seconds': float(cadence) / 1e9,
+        'gaps': int(len(gap)),
+        'longest_gaps': [[str(stamped[i].astype('datetime64[ns]').astype('datetime64[s]')),
+                          str(stamped[i + 1].astype('datetime64[ns]').astype('datetime64[s]')), float(steps[i]) / 1e9]
+                         for i in longest],
+    }
+
+    # counts: negative and NaN values per channel
+    with np.errstate(invalid='ignore'):
+        negative = (counts < 0).sum(axis=0)
+    missing = np.isnan(counts).sum(axis=0)
+    findings['negative_counts'] = {str(c): int(n) for c, n in zip(channels, negative) if n}
+    findings['nan_counts'] = {str(c): int(n) for c, n in zip(channels, missing) if n}
+
+    # zero inlet efficiency: every count there turns inf (0 / 0 turns NaN)
+    if zero_efficiency is not None and zero_efficiency.any():
+        zero = counts[:, zero_efficiency]
+        findings['zero_efficiency_inf'] = int(((zero != 0) & np.isfinite(zero)).sum())
+        findings['zero_efficiency_nan'] = int((zero == 0).sum())
+
+    return findings
+
+
+# check if the findings of a file point at any problem
+def has_issues(findings):
+    return any(findings.get(key) for key in ('nat_times', 'duplicate_times', 'non_monotonic', 'gaps',
+                                               'negative_counts', 'nan_counts', 'nul_bytes'))
+
+
+# data-quality report of one run: files are scanned as they are parsed (see
+# scanning) and days are checked, and optionally masked, on their way to the
+# plots (see check_days); the report is written once the days are done
+# # efficiencies maps raw channels to their inlet efficiency (channels with
+# # a zero one are reported); with the bins table (whose bin numbers are the
+# # channels), the inf/NaN those channels always give is left out of the days'
+# # non-finite counts; path is a json file (None only prints the totals), which
+# # keeps the findings of earlier runs for the files and days not scanned again
+class QCReport:
+
+    def __init__(self, path, instrument, efficiencies=None, bins=None):
+        self.path = path
+        self.instrument = instrument
+        self.time_column, self.channels = LAYOUTS[instrument]
+        self.zero_channels = [channel for channel, e in (efficiencies or {}).items() if e == 0]
+        self.zero_dp = set()
+        if bins is not None:
+            spec = BinSpec.from_table(bins)
+            self.zero_dp = {dp for name, dp in zip(spec.names, spec.dp) if name in self.zero_channels}
+        self.started = dt.datetime.now()
+        self.files = {}
+        self.days = {}
+
+        # findings of earlier runs (files since deleted are dropped)
+        self.earlier_files, self.earlier_days = {}, {}
+        saved = read_json(path)
+        if saved.get('version') == QC_VERSION and saved.get('instrument') == instrument:
+            self.earlier_files = {file_path: findings for file_path, findings in saved['files'].items()
+                                  if os.path.exists(file_path)}
+            self.earlier_days = saved['days']
+
+    # wrap a read_file function so every frame it parses is scanned on the way out
+    def scanning(self, read_file):
+        def read_and_scan(file_path):
+            df = read_file(file_path)
+            self.scan_file(file_path, df)
+            return df
+        return read_and_scan
+
+    # scan one parsed file (time column and raw channels as the parsers return them)
+    def scan_file(self, file_path, df):
+        with timing.stage('qc', file_path, rows=len(df)):
+            channels = [channel for channel in self.channels if channel in df.columns]
+            times = epoch_ns(df[self.time_column])
+            counts = df[channels].to_numpy(dtype=np.float32)
+            zero = np.isin(channels, self.zero_channels) if self.zero_channels else None
+            findings = scan_arrays(times, counts, channels, zero)
+
+            # null bytes stripped while the file was read (see grimm.read_grimm_file)
+            if df.attrs.get('nul_bytes'):
+                findings['nul_bytes'] = df.attrs['nul_bytes']
+                findings['nul_lines'] = df.attrs['nul_lines']
+        self.files[file_path] = findings
+
+    # count (and with mask=True, blank out as NaN) the non-finite and negative
+    # dN/dlogDp values of each (date, day_data) pair as it passes through, then
+    # write the report (the bins of zero-efficiency channels are counted apart)
+    def check_days(self, daily_data, mask=False):
+        items = daily_data.items() if isinstance(daily_data, dict) else daily_data
+        for date, day_data in items:
+            with timing.stage('mask' if mask else 'qc', date, rows=len(day_data)):
+                dp = [column for column in day_data.columns if isinstance(column, float)]
+                values = day_data[dp].to_numpy()
+                with np.errstate(invalid='ignore'):
+                    bad = ~np.isfinite(values) | (values < 0)
+                nonfinite = ~np.isfinite(values)
+                expected = np.isin(dp, list(self.zero_dp))
+                self.days[date] = {'nonfinite': int(nonfinite[:, ~expected].sum()),
+                                   'zero_efficiency': int(nonfinite[:, expected].sum()),
+                                   'negative': int((bad & ~nonfinite).sum()),
+                                   'masked': int(bad.sum()) if mask else 0}
+                if mask and bad.any():
+                    day_data = day_data.copy()
+                    day_data[dp] = np.where(bad, np.nan, values)
+            yield date, day_data
+        self.write()
+
+    # totals over the files and days checked this run (or over the given
+    # {file: findings} and {date: counts}, e.g. the whole report)
+    def totals(self, files=None, days=None):
+        files = (self.files if files is None else files).values()
+        days = (self.days if days is None else days).values()
+        totals = {
+            'files': len(files),
+            'files_with_issues': sum(has_issues(findings) for findings in files),
+            'rows': sum(findings['rows'] for findings in files),
+            'days': len(days),
+            'zero_efficiency_channels': [str(channel) for channel in self.zero_channels],
+        }
+        for key in ('nat_times', 'duplicate_times', 'non_monotonic', 'gaps', 'nul_bytes', 'zero_efficiency_inf',
+                    'zero_efficiency_nan'):
+            totals[key] = sum(findings.get(key, 0) for findings in files)
+        for key in ('negative_counts', 'nan_counts'):
+            totals[key] = sum(sum(findings[key].values()) for findings in files)
+        for key in ('nonfinite', 'zero_efficiency', 'negative', 'masked'):
+            totals[f'day_{key}_values'] = sum(day[key] for day in days)
+        return totals
+
+    # write the report (via a temporary file), this run's findings replacing
+    # those of earlier runs, and print the totals of this run
+    def write(self):
+        totals = self.totals()
+        if self.path:
+            files = {**self.earlier_files, **self.files}
+            days = dict(sorted({**self.earlier_days, **self.days}.items()))
+            write_json(self.path, {'version': QC_VERSION, 'instrument': self.instrument,
+                                   'started': self.started.isoformat(timespec='seconds'), 'gap_factor': GAP_FACTOR,
+                                   'totals': self.totals(files, days), 'files': files, 'days': days})
+
+        if totals['files_with_issues'] or totals['day_nonfinite_values'] or totals['day_negative_values']:
+            issues = ', '.join(f'{key} {value}' for key, value in totals.items()
+                               if key not in ('files', 'files_with_issues', 'rows', 'days',
+                                              'zero_efficiency_channels') and value)
+            print(f"QC ({self.instrument}): {totals['files_with_issues']} of {totals['files']} files with issues; "
+                  f"{issues}")
+
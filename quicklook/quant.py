@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# read, format and bin Quant data
+###############################################################################
+
+# import packages
+import os
+import pandas as pd
+
+from quicklook import timing
+from quicklook.archive import Archive
+from quicklook.bins import BinSpec
+from quicklook.daily import resample_days, stream_archive
+from quicklook.file_index import FileIndex, window_years
+from quicklook.merge import merge_runs, report_overlaps
+from quicklook.parsing import (MST_OFFSET, QUANT_TIME_COLUMN, mst_days, parse_times, quant_dtypes, quant_usecols,
+                               resolve_engine)
+from quicklook.plotting import process_daily_data
+from quicklook.tail import FileTail, watch
+
+
+# list every csv file in the year subdirectories of data_dir
+def find_csv_files(data_dir, years, ver='raw'):
+    # get a list of all subdirectories in the data_dir
+    subdirectories = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
+    
+    # initialize an empty list to store file paths
+    file_paths = []
+    
+    # iterate through each subdirectory
+    for subdirectory in subdirectories:
+        # check if the subdirectory label contains a year from the input years
+        if any(str(year) in subdirectory for year in years):
+            # collect every csv file in the subdirectory
+            csv_files = [f for f in os.listdir(os.path.join(data_dir, subdirectory, ver)) if f.endswith('.csv')]
+            file_paths.extend(os.path.join(data_dir, subdirectory, ver, csv_file) for csv_file in csv_files)
+    
+    return file_paths
+
+
+# read a single quant csv file (only the usecols columns, parsed as dtypes)
+def read_quant_file(file_path, engine='c', usecols=None, dtypes=None):
+    with timing.stage('read', file_path) as record:
+        df = pd.read_csv(file_path, engine=engine, usecols=usecols, dtype=dtypes)
+        
+        # parse the time stamps once; every later stage reuses them
+        df[QUANT_TIME_COLUMN] = parse_times(df[QUANT_TIME_COLUMN])
+        record['rows'] = len(df)
+    return df
+
+
+# list the MST days covered by a raw quant dataframe
+def quant_days(df):
+    return mst_days(parse_times(df[QUANT_TIME_COLUMN]))
+
+
+# read quant csv file(s)
+# # pass a Manifest to only read new/changed files and the days they touch
+# # engine selects the pandas csv parser ('c' or 'pyarrow'); only the columns
+# # of the requested products ('opc', 'neph') are loaded, as float32
+# # start/end (dates) only read files overlapping those MST days, looked up
+# # through a FileIndex of each file's time span
+# # duplicates is the policy for rows sharing a time stamp (see merge.DUPLICATE_POLICIES)
+# # qc is a qc.QCReport that scans every file as it is parsed
+def read_quant(data_dir, eff, years, ver='raw', manifest=None, engine='c', products=('opc', 'neph'),
+               start=None, end=None, index=None, duplicates='first', qc=None):
+    # find every csv file for the requested years
+    with timing.stage('list') as record:
+        file_paths = find_csv_files(data_dir, window_years(start, end, years), ver)
+        record['files'] = len(file_paths)
+    
+    # keep only files overlapping the requested MST days
+    windowed = start is not None or end is not None
+    if windowed:
+        index = index if index is not None else FileIndex(time_column='timestamp', header=True)
+        with timing.stage('index') as record:
+            file_paths = index.select(file_paths, start, end)
+            record['files'] = len(file_paths)
+    
+    # read the csv files (keeping the header row) into a list of dataframes
+    engine = resolve_engine(engine)
+    usecols, dtypes = quant_usecols(products), quant_dtypes(products)
+    read_file = lambda file_path: read_quant_file(file_path, engine, usecols, dtypes)
+    if qc is not None:
+        read_file = qc.scanning(read_file)
+    if manifest is None:
+        frames = {file_path: read_file(file_path) for file_path in file_paths}
+    else:
+        frames = manifest.read(file_paths, read_file, quant_days, complete=not windowed)
+    
+    # nothing new to ingest
+    if not frames:
+        frames = {None: pd.DataFrame(columns=usecols)}
+    
+    # merge the files into one time-ordered dataframe, resolving duplicate stamps
+    combined_df, overlaps = merge_runs(list(frames.values()), QUANT_TIME_COLUMN, duplicates, names=list(frames))
+    report_overlaps(overlaps, 'quant')
+    
+    # return all formatted and combined data
+    with timing.stage('format', rows=len(combined_df)):
+        return format_quant(combined_df, eff, ver, products)
+
+
+
+# read quant csv data file by file, yielding (date, day_data) of one product
+# ('opc' or 'neph') for every MST day as soon as it is complete (binned)
+# # peak memory stays at a few days of data instead of the whole archive;
+# # the other arguments are as for read_quant
+def stream_quant(data_dir, eff, bins, years, ver='raw', manifest=None, engine='c', product='opc',
+                 start=None, end=None, index=None, duplicates='first', qc=None):
+    
+    # find every csv file for the requested years
+    with timing.stage('list') as record:
+        file_paths = find_csv_files(data_dir, window_years(start, end, years), ver)
+        record['files'] = len(file_paths)
+    
+    # keep only files overlapping the requested MST days (the index also gives
+    # the time span that decides the order files are read in)
+    index = index if index is not None else FileIndex(time_column='timestamp', header=True)
+    windowed = start is not None or end is not None
+    if windowed:
+        with timing.stage('index') as record:
+            file_paths = index.select(file_paths, start, end)
+            record['files'] = len(file_paths)
+    
+    engine = resolve_engine(engine)
+    usecols, dtypes = quant_usecols([product]), quant_dtypes([product])
+    read_file = lambda file_path: read_quant_file(file_path, engine, usecols, dtypes)
+    if qc is not None:
+        read_file = qc.scanning(read_file)
+    spec = bin_spec(bins, product)
+    process = lambda df: process_quant(df, eff, spec, ver, product)
+    return stream_archive(file_paths, read_file, quant_days, process, index, manifest, complete=not windowed,
+                          duplicates=duplicates)
+
+
+# format and bin the raw rows of one product (bins is a table or a BinSpec)
+def process_quant(df, eff, bins, ver='raw', product='opc'):
+    opc_df, neph_df = format_quant(df, eff, ver, [product])
+    return bin_spec(bins, product).normalize(opc_df if product == 'opc' else neph_df)
+
+
+# format the raw quant data
+# # products that were not loaded are returned as None
+def format_quant(df, eff, ver, products=('opc', 'neph')):
+    
+    # check if efficiency was specified for quant
+    if eff == []:
+         
+        # Drop unnecessary columns (if they were loaded at all)
+        df.drop(columns=['Unnamed: 0', 'timestamp_local'], inplace=True, errors='ignore')
+
+        # Rename 'timestamp' to 'Time_UTC'
+        df.rename(columns={'timestamp': 'Time_UTC'}, inplace=True)
+
+        # Convert 'Time_UTC' to datetime and create 'Time_MST'
+        # (already parsed when the file was read; MST is a fixed UTC-7)
+        df['Time_UTC'] = parse_times(df['Time_UTC'])
+        df['Time_MST'] = df['Time_UTC'] - MST_OFFSET
+        
+
+        if ver == 'raw':
+            # define opc columns 
+            opc_columns = [
+                'Time_UTC', 'Time_MST',  # Time-related columns
+                'opc_bin0', 'opc_bin1', 'opc_bin2', 'opc_bin3', 'opc_bin4', 'opc_bin5', 'opc_bin6',
+                'opc_bin7', 'opc_bin8', 'opc_bin9', 'opc_bin10', 'opc_bin11', 'opc_bin12', 'opc_bin13',
+                'opc_bin14', 'opc_bin15', 'opc_bin16', 'opc_bin17', 'opc_bin18', 'opc_bin19', 'opc_bin20',
+                'opc_bin21', 'opc_bin22', 'opc_bin23', 
+                'opc_pm1', 'opc_pm25', 'opc_pm10'
+            ]
+    
+            # define neph columns
+            neph_columns = [
+                'Time_UTC', 'Time_MST',  # Time-related columns
+                'neph_bin0', 'neph_bin1', 'neph_bin2', 'neph_bin3', 'neph_bin4', 'neph_bin5',
+                'neph_pm1', 'neph_pm25', 'neph_pm10'
+            ]
+        else:
+            print("VERSION OF RESULTS SET TO FINAL. THIS SECTION OF CODE NOT READY YET.")
+
+        # Extract OPC and NEPH DataFrames
+        opc_df = df[opc_columns].copy() if 'opc' in products else None
+        neph_df = df[neph_columns].copy() if 'neph' in products else None
+        
+        # rows are already in time order (see read_quant and daily.join_day)
+        
+      
+        # return formatted quant data
+        return opc_df, neph_df
+    
+    else:
+        print("Need to define efficiency for quant")
+        return
+
+
+# bin aerosol data: dN/dlogDp columns named by Dp, plus N/S/V totals
+# # bins is a bins table or a BinSpec (see bin_spec); the table is not modified
+def bin(df, bins, instrument):
+    spec = bin_spec(bins, instrument)
+    return spec.normalize(df), spec.table()
+
+
+# the bin spec of a quant bins table for one instrument ('opc' or 'neph'),
+# whose count columns are named '<instrument>_<Bin Number>'
+def bin_spec(bins, instrument):
+    return bins if isinstance(bins, BinSpec) else BinSpec.from_table(bins, prefix=instrument)
+
+
+# the bins table as bin() returns it (with Dp/dlogDp, without the last edge)
+def bin_table(bins, instrument):
+    return bin_spec(bins, instrument).table()
+
+
+# follow today's growing quant files, re-plotting today's product ('opc' or
+# 'neph') every interval seconds; only appended rows are parsed (see quicklook.tail)
+def watch_quant(data_dir, eff, bins, save_dir, title, ver='raw', product='opc', min_count=0, max_count=10000,
+                engine='c', renderer='contour', interval=60, resample_rule=None, resample_how='mean',
+                profiles=('archival',), polls=None):
+    engine = resolve_engine(engine)
+    usecols, dtypes = quant_usecols([product]), quant_dtypes([product])
+    
+    spec = bin_spec(bins, product)
+    plot_bins = spec.table()
+    process = lambda df: process_quant(df, eff, spec, ver, product)
+    read_rows = lambda stream: pd.read_csv(stream, engine=engine, usecols=usecols, dtype=dtypes)
+    find_files = lambda years: find_csv_files(data_dir, years, ver)
+    render = lambda daily_data: process_daily_data(resample_days(daily_data, resample_rule, resample_how), plot_bins,
+                                                   min_count, max_count, save_dir, title, renderer=renderer,
+                                                   profiles=profiles)
+    tail = FileTail(header=True, time_column=QUANT_TIME_COLUMN)
+    
+    return watch(find_files, tail, read_rows, process, render, interval, polls)
+
+
+# append the rows of new (or grown) quant csv files to the binary archive at
+# <archive_dir>/quant (see quicklook.archive): opc and neph columns, parsed as
+# read_quant parses them
+def archive_quant(archive_dir, data_dir, years, ver='raw', engine='c'):
+    engine = resolve_engine(engine)
+    archive = Archive(archive_dir, 'quant')
+    usecols, dtypes = quant_usecols(['opc', 'neph']), quant_dtypes(['opc', 'neph'])
+    
+    with timing.stage('list') as record:
+        file_paths = find_csv_files(data_dir, years, ver)
+        record['files'] = len(file_paths)
+    
+    archive.ingest(file_paths, lambda file_path: read_quant_file(file_path, engine, usecols, dtypes))
+    return archive
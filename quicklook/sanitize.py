@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# strip null bytes from instrument files while they are read
+###############################################################################
+
+# import packages
+import io
+
+
+# binary stream wrapper that drops \x00 bytes on the fly
+# # the GRIMM logger occasionally pads its time stamps with null bytes; wrapping
+# # the file in io.BufferedReader(NulStripper(f)) lets pandas parse it in one
+# # read, with no cleaned copy or temporary file
+class NulStripper(io.RawIOBase):
+
+    def __init__(self, raw):
+        self.raw = raw
+
+        # number of null bytes removed and of lines that contained any
+        self.nul_bytes = 0
+        self.nul_lines = 0
+
+        # whether the line currently being read was already counted
+        self._line_counted = False
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+    def readinto(self, buffer):
+        while True:
+            chunk = self.raw.read(len(buffer))
+            if not chunk:
+                return 0
+
+            if b'\x00' in chunk:
+                self._count(chunk)
+                chunk = chunk.replace(b'\x00', b'')
+            elif b'\n' in chunk:
+                self._line_counted = False
+
+            # a chunk made only of null bytes must not look like end of file
+            if chunk:
+                buffer[:len(chunk)] = chunk
+                return len(chunk)
+
+    # tally null bytes and the lines they appear on
+    def _count(self, chunk):
+        self.nul_bytes += chunk.count(b'\x00')
+
+        segments = chunk.split(b'\n')
+        for i, segment in enumerate(segments):
+            if b'\x00' in segment and not self._line_counted:
+                self.nul_lines += 1
+                self._line_counted = True
+
+            # every segment but the last is terminated by a newline
+            if i < len(segments) - 1:
+                self._line_counted = False
+
+
+# open a file for parsing with its null bytes stripped
+# # the counts are available afterwards as stream.raw.nul_bytes / nul_lines
+def open_clean(file_path, buffer_size=1 << 20):
+    return io.BufferedReader(NulStripper(open(file_path, 'rb')), buffer_size)
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# batch runs of several sites and instruments on one shared process pool
+###############################################################################
+
+# usage (from the repository root):
+#   python -m quicklook.scheduler --workers 8
+#   python -m quicklook.scheduler --config sites.json --jobs wbb/grimm alta/quant --start yesterday
+# # a job is one site's instrument (its settings from quicklook.config: data
+# # dir, efficiencies, bins, output dir, count range, ...). Every job is parsed
+# # in one task that hands out its days as they are binned (as soon as each
+# # is complete with streaming=True); the days of all jobs are then rendered
+# # on the same pool, most recent first, so fresh plots appear before a backlog
+# # is worked off. A failing job is reported and the other jobs carry on.
+
+# import packages
+import argparse
+import datetime as dt
+import heapq
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from quicklook import pipeline, timing
+from quicklook.config import load_settings, read_config, site_table
+from quicklook.file_index import parse_day
+from quicklook.outputs import OutputIndex
+from quicklook.plotting import RENDERERS, changed_tasks, day_tasks, render_timed, resolve_profiles
+
+
+# seconds between checks for days announced by the parse tasks
+POLL_SECONDS = 0.2
+
+
+# settings of every job: the given 'site/instrument' names, or every site and
+# instrument known to the built-in sites and the config file
+def load_jobs(config_path=None, names=None):
+    if names is None:
+        config = read_config(config_path) if config_path else None
+        names = [f'{site}/{instrument}' for site, instruments in site_table(config).items()
+                 for instrument in instruments]
+
+    jobs = []
+    for name in names:
+        site, _, instrument = name.partition('/')
+        jobs.append(load_settings(site, instrument, config_path))
+    return jobs
+
+
+# progress and results of one job, kept in the scheduling process
+class Job:
+
+    def __init__(self, index, settings):
+        self.index = index
+        self.settings = settings
+        self.label = f"{settings['site']} {settings['instrument']}"
+        self.report = timing.RunReport()
+        self.started = time.perf_counter()
+        self.outputs = OutputIndex(settings['outputs_path']) if settings['outputs_path'] else None
+
+        # 'parsing', 'plotting' (days), 'periods' (period plots) and 'finished'
+        self.state = 'parsing'
+
+        # filled in as the parse task announces days and finishes
+        self.error = None
+        self.manifest = None
+        self.pyramid = None
+        self.written = {}
+
+        # days announced, days rendered and the ones that failed
+        self.queued = 0
+        self.plotted = 0
+        self.failures = {}
+
+    # days announced but not rendered yet
+    def pending(self):
+        return self.queued - self.plotted - len(self.failures)
+
+    def log(self, message):
+        print(f"[{self.label}] {message}", flush=True)
+
+
+# run every job (settings from load_jobs) for the MST days start..end on one
+# pool of workers processes; returns {label: Job} with each job's outcome
+# # at most max_parsing jobs are parsed at once while days wait to be rendered,
+# # so parsing never holds up every worker; days are spooled to spool_dir (a
+# # temporary directory under the system's by default) between the two
+def run_jobs(jobs, workers=None, start=None, end=None, max_parsing=None, spool_dir=None):
+    workers = workers or os.cpu_count() or 1
+    max_parsing = max_parsing or max(1, workers // 2)
+    jobs = [Job(index, settings) for index, settings in enumerate(jobs)]
+
+    # forked workers start at once; elsewhere spawned ones import the package afresh
+    methods = mp.get_all_start_methods()
+    context = mp.get_context('fork' if 'fork' in methods else None)
+
+    with tempfile.TemporaryDirectory(prefix='quicklook-spool-', dir=spool_dir) as spool, \
+            context.Manager() as manager, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        announced = manager.Queue()
+        waiting = list(jobs)
+        ready = []
+        running = {}
+        order = 0
+
+        while waiting or ready or running:
+
+            # fill free workers: a new parse while few are running (or nothing
+            # else is ready), otherwise the most recent day of any job
+            while len(running) < workers and (waiting or ready):
+                parsing = sum(kind == 'parse' for _, kind, _ in running.values())
+                if waiting and (parsing < max_parsing or not ready):
+                    job = waiting.pop(0)
+                    job.log('parsing')
+                    future = pool.submit(parse_job, job.index, job.settings, start, end, spool, announced)
+                    running[future] = (job, 'parse', None)
+                else:
+                    _, _, job_index, kind, payload = heapq.heappop(ready)
+                    job = jobs[job_index]
+                    if kind == 'periods':
+                        future = pool.submit(plot_periods, job.settings, job.pyramid)
+                    else:
+                        future = pool.submit(render_spooled, job.settings, *payload)
+                    running[future] = (job, kind, payload)
+
+            done, _ = wait(running, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+
+            # queue the days announced so far (a finished parse has announced all of its days)
+            while True:
+                try:
+                    job_index, date, spool_path, written = announced.get_nowait()
+                except queue.Empty:
+                    break
+                job = jobs[job_index]
+                job.queued += 1
+                if written is not None:
+                    job.written[date] = written
+                order += 1
+                heapq.heappush(ready, (-dt.date.fromisoformat(date).toordinal(), order, job_index, 'day',
+                                       (date, spool_path)))
+
+            for future in done:
+                job, kind, payload = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    result = ([], exc) if kind != 'parse' else ([], None, None, exc)
+
+                if kind == 'parse':
+                    records, job.manifest, job.pyramid, job.error = result
+                    job.state = 'plotting'
+                    job.report.extend(records)
+                    if job.error is not None:
+                        job.log(f"failed to parse: {job.error!r}")
+                    else:
+                        job.log(f"parsed, {job.queued} days to plot")
+                elif kind == 'periods':
+                    records, error = result
+                    job.report.extend(records)
+                    if error is not None:
+                        job.log(f"failed to plot periods: {error!r}")
+                    finish(job)
+                else:
+                    date = payload[0]
+                    records, error = result
+                    job.report.extend(records)
+                    if error is not None:
+                        job.failures[date] = error
+                        job.log(f"failed to plot {date}: {error!r}")
+                    else:
+                        job.plotted += 1
+                        if job.outputs is not None and date in job.written:
+                            job.outputs.record(*job.written[date])
+                        job.log(f"plotted {date} ({job.plotted} done, {job.pending()} to go)")
+
+                # move the job on once its days are all rendered (period plots go first)
+                if job.state == 'plotting' and not job.pending():
+                    order += 1
+                    if wrap_up(job):
+                        heapq.heappush(ready, (float('-inf'), order, job.index, 'periods', None))
+
+    for job in jobs:
+        status = f"failed ({job.error!r})" if job.error is not None else 'done'
+        print(f"{job.label}: {status}, {job.plotted} days plotted, {len(job.failures)} failed")
+    return {job.label: job for job in jobs}
+
+
+# save the output index of a job whose days are all rendered, then finish it
+# unless its period plots are still to draw (returns True to queue them)
+def wrap_up(job):
+    if job.outputs is not None:
+        job.outputs.save()
+    if job.pyramid is not None and job.error is None:
+        job.state = 'periods'
+        return True
+    finish(job)
+    return False
+
+
+# save a finished job's manifest (unless its parse failed) and run report
+def finish(job):
+
+    # remember the ingested files only once their days have been plotted (days
+    # that failed to plot stay pending for the next run)
+    job.state = 'finished'
+    try:
+        if job.manifest is not None and job.error is None:
+            job.manifest.keep_pending(job.failures)
+            job.manifest.save()
+        if job.settings['report_path']:
+            job.report.write(job.settings['report_path'])
+    except OSError as exc:
+        job.error = exc
+        job.log(f"failed to save: {exc!r}")
+    job.log(f"finished in {time.perf_counter() - job.started:.1f} s")
+
+
+# parse one job (in a worker): spool each day whose plots are out of date and
+# announce it as (job index, date, spool path, (file paths, render key))
+# # returns the timing records, the manifest and pyramid to finish the job
+# # with, and the error that stopped the parse (if any)
+def parse_job(index, settings, start, end, spool, announced):
+    report = timing.reset()
+    manifest = pyramid = error = None
+    try:
+        daily_data, plot_bins, manifest, pyramid = pipeline.prepare(settings, start, end)
+        tasks = day_tasks(daily_data, plot_bins, settings['min_count'], settings['max_count'], settings['save_dir'],
+                          settings['title'])
+
+        written = {}
+        if settings['outputs_path']:
+            render = RENDERERS[settings['plot_renderer']]
+            profiles = resolve_profiles(settings['plot_profiles'])
+            tasks = changed_tasks(tasks, render, profiles, OutputIndex(settings['outputs_path']), written)
+
+        for date, args in tasks:
+            spool_path = os.path.join(spool, f'{index}_{date}.pickle')
+            with open(spool_path, 'wb') as f:
+                pickle.dump(args, f, protocol=pickle.HIGHEST_PROTOCOL)
+            announced.put((index, date, spool_path, written.get(date)))
+    except Exception as exc:
+        error = exc
+    return report.records, manifest, pyramid, error
+
+
+# render one spooled day (in a worker) and drop it from the spool
+def render_spooled(settings, date, spool_path):
+    timing.reset()
+    with open(spool_path, 'rb') as f:
+        args = pickle.load(f)
+    os.remove(spool_path)
+    return render_timed(RENDERERS[settings['plot_renderer']], date, args, resolve_profiles(settings['plot_profiles']))
+
+
+# redraw a job's weekly, monthly and seasonal plots (in a worker)
+def plot_periods(settings, pyramid):
+    report = timing.reset()
+    outputs = OutputIndex(settings['outputs_path']) if settings['outputs_path'] else None
+    error = None
+    try:
+        pipeline.plot_periods(settings, pyramid, outputs)
+    except Exception as exc:
+        error = exc
+    return report.records, error
+
+
+# command line: run the chosen (or all) jobs; exit status 1 if any job or day failed
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m quicklook.scheduler',
+                                     description='Plot several sites and instruments on one shared process pool.')
+    parser.add_argument('--jobs', nargs='+', help="'site/instrument' jobs to run (default: every known one)")
+    parser.add_argument('--config', help='json file of settings and sites (see quicklook.config.read_config)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per cpu)')
+    parser.add_argument('--start', help="first MST day to plot: YYYY-MM-DD, 'today' or 'yesterday'")
+    parser.add_argument('--end', help="last MST day to plot: YYYY-MM-DD, 'today' or 'yesterday'")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_jobs(args.config, args.jobs)
+        start, end = parse_day(args.start), parse_day(args.end)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    results = run_jobs(jobs, args.workers, start, end)
+    return 1 if any(job.error is not None or job.failures for job in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
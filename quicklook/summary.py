@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# daily and hourly summary tables for screening dust events
+###############################################################################
+
+# import packages
+import os
+import numpy as np
+import pandas as pd
+
+from quicklook import timing
+
+
+# table formats ('parquet' needs pyarrow)
+FORMATS = ('csv', 'parquet')
+
+# diameter (µm) splitting fine from coarse particles in the number fractions
+COARSE_DP = 1.0
+
+# mass concentrations summarized when present (Quant opc)
+PM_COLUMNS = ['opc_pm1', 'opc_pm25', 'opc_pm10']
+
+# summary products: table name and the time step its rows cover
+PRODUCTS = {'daily': 'D', 'hourly': 'h'}
+
+
+# fall back to csv tables when pyarrow is not installed
+def resolve_format(file_format):
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown table format '{file_format}', expected one of {FORMATS}")
+
+    if file_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("pyarrow is not installed, writing summary tables as csv")
+            return 'csv'
+
+    return file_format
+
+
+# hourly partial sums, counts and maxima of binned data (any number of days)
+# # one grouped pass over the samples; every summary row, hourly or daily, is
+# # rolled up from these (see rollup). dlogdp maps Dp columns to their dlogDp;
+# # channels without a finite value (e.g. zero inlet efficiency) are left out
+def hourly_partials(data, dlogdp, coarse_dp=COARSE_DP):
+    mst = data['Time_MST']
+    if mst.dt.tz is not None:
+        mst = mst.dt.tz_localize(None)
+
+    # dN/dlogDp matrix and the number concentration dN of every bin
+    dp = np.array([column for column in data.columns if isinstance(column, float) and column in dlogdp])
+    values = data[list(dp)].to_numpy(dtype=float)
+    finite = np.isfinite(values)
+    values = np.where(finite, values, np.nan)
+    counts = np.where(finite, values * np.array([dlogdp[d] for d in dp]), 0)
+
+    # per-sample reductions, then one groupby over the hours
+    valid = finite.any(axis=1)
+    peak = np.where(finite, values, -np.inf)
+    slim = pd.DataFrame({
+        'time': mst.dt.floor('h').to_numpy(),
+        'n_samples': valid,
+        'n_sum': np.where(valid, counts.sum(axis=1), np.nan),
+        'fine_sum': counts[:, dp < coarse_dp].sum(axis=1),
+        'coarse_sum': counts[:, dp >= coarse_dp].sum(axis=1),
+        'max_dNdlogDp': np.where(valid, peak.max(axis=1), np.nan) if len(dp) else np.nan,
+        'Dp_at_max': dp[peak.argmax(axis=1)] if len(dp) else np.nan,
+    })
+    for column in ['S_total', 'V_total'] + PM_COLUMNS:
+        if column in data.columns:
+            slim[column] = data[column].to_numpy(dtype=float)
+
+    # covered time: samples times the typical step between them
+    steps = np.diff(mst.to_numpy(dtype='datetime64[ns]')).astype('timedelta64[ns]').astype(np.int64) / 1e9
+    cadence = np.median(steps[steps > 0]) if (steps > 0).any() else 0.0
+    slim['covered_seconds'] = valid * cadence
+
+    sums = [column for column in slim.columns if column not in ('time', 'max_dNdlogDp', 'Dp_at_max')]
+    extra = [column for column in ['S_total', 'V_total'] + PM_COLUMNS if column in slim.columns]
+    grouped = slim.groupby('time', sort=True)
+    partials = grouped[sums].sum(min_count=0)
+    partials['n_max'] = grouped['n_sum'].max()
+    for column in extra:
+        partials[column + '_n'] = grouped[column].count()
+    for column in PM_COLUMNS:
+        if column in slim.columns:
+            partials[column + '_max'] = grouped[column].max()
+    return partials.join(peak_of(slim, 'time')).reset_index()
+
+
+# the largest max_dNdlogDp of every group and the Dp it occurred at
+def peak_of(df, key):
+    peak = df['max_dNdlogDp'] == df.groupby(key)['max_dNdlogDp'].transform('max')
+    return df[peak].groupby(key)[['max_dNdlogDp', 'Dp_at_max']].first()
+
+
+# summary rows per freq ('h' or 'D') from hourly partials: sample count and
+# time coverage, mean and max total number, fine/coarse number fractions, mean
+# surface and volume, peak dN/dlogDp (and its Dp) and PM mean/max
+def rollup(partials, freq):
+    key = partials['time'].dt.floor(freq)
+    grouped = partials.groupby(key, sort=True)
+    sums = grouped[[column for column in partials.columns
+                    if column not in ('time', 'max_dNdlogDp', 'Dp_at_max') and not column.endswith('_max')]].sum()
+
+    table = pd.DataFrame(index=sums.index)
+    table['date'] = sums.index.strftime('%Y-%m-%d')
+    table['n_samples'] = sums['n_samples'].astype(np.int64)
+    table['coverage'] = (sums['covered_seconds'] / pd.Timedelta(1, freq).total_seconds()).clip(upper=1)
+    samples = sums['n_samples'].where(sums['n_samples'] > 0)
+    table['N_mean'] = sums['n_sum'] / samples
+    table['N_max'] = grouped['n_max'].max()
+    table['fine_fraction'] = sums['fine_sum'] / sums['n_sum'].where(sums['n_sum'] > 0)
+    table['coarse_fraction'] = sums['coarse_sum'] / sums['n_sum'].where(sums['n_sum'] > 0)
+    for column, name in (('S_total', 'S_mean'), ('V_total', 'V_mean')):
+        if column in sums.columns:
+            table[name] = sums[column] / sums[column + '_n'].where(sums[column + '_n'] > 0)
+    table = table.join(peak_of(partials.assign(period=key), 'period'))
+    for column in PM_COLUMNS:
+        if column in sums.columns:
+            table[column + '_mean'] = sums[column] / sums[column + '_n'].where(sums[column + '_n'] > 0)
+            table[column + '_max'] = grouped[column + '_max'].max()
+
+    return table.rename_axis('time').reset_index()
+
+
+# daily (and optionally hourly) summary tables of one instrument, kept up to
+# date with every day passing through store_days
+# # <path>/<instrument>_daily.<csv|parquet> and <instrument>_hourly.<...>; rows
+# # of days processed again are replaced, the others are kept
+# # bins is the bins table of the plots (Dp and dlogDp of every bin)
+class SummaryTable:
+
+    def __init__(self, path, instrument, bins, hourly=True, file_format='csv', coarse_dp=COARSE_DP):
+        self.path = path
+        self.instrument = instrument
+        self.dlogdp = dict(zip(bins['Dp'], bins['dlogDp']))
+        self.products = [name for name in PRODUCTS if hourly or name == 'daily']
+        self.file_format = resolve_format(file_format)
+        self.coarse_dp = coarse_dp
+
+        # hourly partials of the days seen on this run, by date
+        self._partials = {}
+
+    # summarize each (date, day_data) pair as it passes through
+    def store_days(self, daily_data):
+        items = daily_data.items() if isinstance(daily_data, dict) else daily_data
+        for date, day_data in items:
+            with timing.stage('summary', date, rows=len(day_data)):
+                self.add_day(date, day_data)
+            yield date, day_data
+        self.write()
+
+    # hourly partials of one day
+    def add_day(self, date, day_data):
+        self._partials[date] = hourly_partials(day_data, self.dlogdp, self.coarse_dp)
+
+    # location of one summary table ('daily' or 'hourly')
+    def table_path(self, product):
+        return os.path.join(self.path, f'{self.instrument}_{product}.{self.file_format}')
+
+    # load one summary table (None if there is none yet)
+    def read(self, product):
+        path = self.table_path(product)
+        if not os.path.exists(path):
+            return None
+        if self.file_format == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_csv(path, parse_dates=['time'], dtype={'date': str})
+
+    # replace the rows of this run's days in every table
+    def write(self):
+        if not self._partials:
+            return
+        partials = pd.concat(self._partials.values(), ignore_index=True)
+
+        for product in self.products:
+            table = rollup(partials, PRODUCTS[product])
+
+            stored = self.read(product)
+            if stored is not None:
+                stored = stored[~stored['date'].isin(list(self._partials))]
+                table = pd.concat([stored, table], ignore_index=True).sort_values('time', kind='stable')
+
+            # write via a temporary file so readers never see a partial table
+            path = self.table_path(product)
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = path + '.tmp'
+            if self.file_format == 'parquet':
+                table.to_parquet(tmp_path, index=False)
+            else:
+                table.to_csv(tmp_path, index=False, float_format='%.6g')
+            os.replace(tmp_path, path)
+
+        self._partials = {}
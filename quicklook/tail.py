@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# follow growing csv files and re-plot today as rows arrive
+###############################################################################
+
+# import packages
+import io
+import os
+import time
+import pandas as pd
+
+from quicklook.daily import split
+from quicklook.file_index import mst_window, parse_day, window_years
+from quicklook.parsing import parse_times
+
+
+# byte offset, header line and last time stamp of every file being followed
+# # read_new only returns complete lines appended since the previous call, so
+# # a line the logger is still writing is picked up on the next poll
+class FileTail:
+
+    def __init__(self, header=False, time_column=0):
+        self.header = header
+        self.time_column = time_column
+        self.files = {}
+
+    # complete lines appended to file_path since the last call, without null
+    # bytes and with the header line in front (None if nothing new)
+    def read_new(self, file_path):
+        state = self.files.setdefault(file_path, {'offset': 0, 'header': b'', 'last_time': None})
+
+        # a file that shrank was truncated or replaced, so read it again from the
+        # start (rows up to the last time stamp seen are still skipped)
+        size = os.path.getsize(file_path)
+        if size < state['offset']:
+            state.update(offset=0, header=b'')
+        if size == state['offset']:
+            return None
+
+        with open(file_path, 'rb') as csv_file:
+            csv_file.seek(state['offset'])
+            data = csv_file.read(size - state['offset'])
+
+        # leave a partial trailing line for the next read
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return None
+        state['offset'] += end
+        data = data[:end].replace(b'\x00', b'')
+
+        # remember the header line and put it in front of every later read
+        if self.header:
+            if not state['header']:
+                first = data.index(b'\n') + 1
+                state['header'], data = data[:first], data[first:]
+
+        # only blank lines (or just the header) appended: nothing to parse yet
+        if not data.strip():
+            return None
+        return state['header'] + data
+
+    # new rows of file_path parsed by read_rows(stream), keeping only rows
+    # stamped after the last time seen in that file (None if nothing new)
+    def read_frame(self, file_path, read_rows):
+        data = self.read_new(file_path)
+        if data is None:
+            return None
+
+        df = read_rows(io.BytesIO(data))
+        state = self.files[file_path]
+        raw_time = df.iloc[:, self.time_column] if isinstance(self.time_column, int) else df[self.time_column]
+        times = parse_times(raw_time, errors='coerce')
+        df[raw_time.name] = times
+        if state['last_time'] is not None:
+            df, times = df[times > state['last_time']], times[times > state['last_time']]
+        if times.notna().any():
+            state['last_time'] = times.max()
+
+        return df if len(df) else None
+
+
+# files modified at or after since (epoch seconds); only these can still grow
+def recent_files(file_paths, since):
+    return [file_path for file_path in file_paths if os.path.getmtime(file_path) >= since]
+
+
+# follow the files from find_files() and re-render every MST day that gets new rows
+# # find_files(years) lists the csv files of those year directories
+# # read_rows(stream) parses new raw rows, process(df) turns them into binned
+# # data with a Time_MST column and render(daily_data) plots (date, day) pairs
+# # only days from the day the watch started are drawn (rows from earlier days
+# # in the same files would give incomplete plots); today and yesterday stay in
+# # memory so late rows from just before midnight still land on their day
+def watch(find_files, tail, read_rows, process, render, interval=60, polls=None):
+    first_day = parse_day('today')
+    since = mst_window(first_day, None)[0]
+    days = {}
+    poll = 0
+
+    while polls is None or poll < polls:
+        years = window_years(first_day, parse_day('today'), [])
+        frames = [tail.read_frame(file_path, read_rows) for file_path in recent_files(find_files(years), since)]
+        frames = [df for df in frames if df is not None]
+
+        if frames:
+            touched = []
+            for date, day_data in split(process(pd.concat(frames, ignore_index=True))):
+                if date < first_day.isoformat():
+                    continue
+                if date in days:
+                    day_data = pd.concat([days[date], day_data])
+                    if not day_data['Time_MST'].is_monotonic_increasing:
+                        day_data = day_data.sort_values(by='Time_MST', kind='stable')
+                days[date] = day_data
+                touched.append(date)
+                print(f"{date}: {len(day_data)} rows")
+
+            render([(date, days[date]) for date in touched])
+
+            # older days can no longer receive rows
+            for date in sorted(days)[:-2]:
+                del days[date]
+
+        poll += 1
+        if polls is None or poll < polls:
+            time.sleep(interval)
+
+    return days
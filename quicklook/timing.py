@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# wall time, row counts and memory per pipeline stage
+###############################################################################
+
+# import packages
+import csv
+import datetime as dt
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# peak memory comes from getrusage, which does not exist on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# columns written first in csv reports (extra fields follow)
+REPORT_FIELDS = ['stage', 'item', 'seconds', 'rows', 'rss_start_mb', 'rss_end_mb', 'peak_growth_mb', 'pid', 'error']
+
+
+# resident memory of this process right now, in MB (None where /proc is missing)
+def rss_mb():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2, 1)
+
+
+# peak resident memory of this process so far, in MB (None if unknown)
+def peak_rss_mb():
+    if resource is None:
+        return None
+
+    # linux reports kilobytes, macOS bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return round(peak / scale, 1)
+
+
+# records of every timed stage in a run
+# # one record per stage call: a whole-run stage (item None), a file or a day
+class RunReport:
+
+    def __init__(self):
+        self.records = []
+        self.started = dt.datetime.now()
+        self._clock = time.perf_counter()
+
+    # time the body of a with block as stage (e.g. 'read') for item (e.g. a file)
+    # # the yielded dict can be filled in while the stage runs (rows, extra fields);
+    # # a failing stage is recorded with its error and the exception re-raised
+    # # memory is the resident size at the start and end of the stage and how far
+    # # the stage raised the process's peak (0 unless it set a new high)
+    @contextmanager
+    def stage(self, name, item=None, rows=None):
+        record = {'stage': name, 'item': item, 'rows': rows, 'rss_start_mb': rss_mb()}
+        peak = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as error:
+            record['error'] = repr(error)
+            raise
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 4)
+            record['rss_end_mb'] = rss_mb()
+            record['peak_growth_mb'] = round(peak_rss_mb() - peak, 1) if peak is not None else None
+            record['pid'] = os.getpid()
+            self.records.append(record)
+
+    # add records made elsewhere (e.g. returned by a render worker process)
+    def extend(self, records):
+        self.records.extend(records)
+
+    # total time, rows and calls per stage and the most any one call raised
+    # the peak memory, in the order the stages first ran
+    def totals(self):
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(record['stage'], {'calls': 0, 'seconds': 0.0, 'rows': 0, 'peak_growth_mb': 0.0})
+            total['calls'] += 1
+            total['seconds'] += record['seconds']
+            total['rows'] += record['rows'] or 0
+            total['peak_growth_mb'] = max(total['peak_growth_mb'], record.get('peak_growth_mb') or 0.0)
+        for total in totals.values():
+            total['seconds'] = round(total['seconds'], 4)
+        return totals
+
+    # the n slowest records of one stage
+    def slowest(self, name, n=5):
+        records = [record for record in self.records if record['stage'] == name]
+        return sorted(records, key=lambda record: record['seconds'], reverse=True)[:n]
+
+    # write the report as json (summary + records) or csv (one row per record)
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if path.endswith('.csv'):
+            extra = sorted({key for record in self.records for key in record} - set(REPORT_FIELDS))
+            with open(path, 'w', newline='') as report_file:
+                writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS + extra)
+                writer.writeheader()
+                writer.writerows(self.records)
+            return
+
+        report = {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._clock, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': self.totals(),
+            'records': self.records,
+        }
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=1, default=str)
+
+    # print the time per stage and the slowest files and days
+    def summary(self, n=5, file_stage='read', day_stage='plot'):
+        print(f"Run took {time.perf_counter() - self._clock:.1f} s (peak memory {peak_rss_mb()} MB)")
+        for name, total in self.totals().items():
+            print(f"  {name:<10} {total['seconds']:9.2f} s  {total['calls']:6d} calls  {total['rows']:12d} rows"
+                  f"  peak +{total['peak_growth_mb']:.1f} MB")
+
+        for name, label in ((file_stage, 'files'), (day_stage, 'days')):
+            slowest = self.slowest(name, n)
+            if slowest:
+                print(f"Slowest {label}:")
+            for record in slowest:
+                rows = record['rows'] if record['rows'] is not None else '?'
+                failed = ' (failed)' if record.get('error') else ''
+                growth = record.get('peak_growth_mb')
+                memory = f"  peak +{growth:.1f} MB" if growth else ''
+                print(f"  {record['seconds']:8.2f} s  {rows} rows  {record['item']}{memory}{failed}")
+
+
+# report for the current run
+REPORT = RunReport()
+
+
+# time a stage in the current run's report
+def stage(name, item=None, rows=None):
+    return REPORT.stage(name, item, rows)
+
+
+# start a fresh report (e.g. between benchmark runs)
+def reset():
+    global REPORT
+    REPORT = RunReport()
+    return REPORT
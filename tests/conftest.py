@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# shared fixtures: synthetic archives and the settings reading them
+###############################################################################
+
+# import packages
+import pytest
+
+from benchmarks.synthetic import write_grimm_archive, write_quant_archive
+from quicklook.config import load_settings
+
+
+# a three-day GRIMM archive of two files per day (30 s cadence keeps it small)
+@pytest.fixture
+def grimm_archive(tmp_path):
+    return write_grimm_archive(str(tmp_path / 'data'), days=3, cadence='30s', files_per_day=2)
+
+
+# a three-day Quant archive of two files per day
+@pytest.fixture
+def quant_archive(tmp_path):
+    return write_quant_archive(str(tmp_path / 'data'), days=3, cadence='60s', files_per_day=2)
+
+
+# settings of a built-in site reading tmp_path/data and writing under tmp_path/out
+# # called as settings('wbb', 'grimm', streaming=True, ...)
+@pytest.fixture
+def settings(tmp_path):
+    def make(site, instrument, **overrides):
+        return load_settings(site, instrument, data_dir=str(tmp_path / 'data'), save_dir=str(tmp_path / 'out'),
+                             **overrides)
+    return make
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# binary archive of raw counts
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+
+from quicklook import grimm
+from quicklook.archive import Archive, epoch_ns
+
+
+# archive of the GRIMM files, the last two days ingested before the first one
+def filled_archive(tmp_path, file_paths):
+    read_file = lambda file_path: grimm.read_grimm_file(file_path, str(tmp_path), 'test', 'c')
+    archive = Archive(str(tmp_path / 'archive'), 'grimm')
+    archive.ingest(file_paths[2:], read_file)
+    archive.ingest(file_paths[:2], read_file)
+    return archive, read_file
+
+
+# every row of the files in time order, as (int64 epoch ns, float32 channels)
+def all_rows(tmp_path, file_paths):
+    df = pd.concat([grimm.read_grimm_file(file_path, str(tmp_path), 'test', 'c') for file_path in file_paths])
+    df = df.sort_values(by=0, kind='stable')
+    return epoch_ns(df[0]), df.iloc[:, 1:].to_numpy(dtype=np.float32)
+
+
+def test_slice_across_segments(tmp_path, grimm_archive):
+    archive, _ = filled_archive(tmp_path, grimm_archive)
+    times, values = all_rows(tmp_path, grimm_archive)
+    assert len(archive.segments) == 2
+    assert archive.rows == len(times)
+
+    # 2024-06-01 18:00 to 2024-06-02 06:00 UTC spans the end of one segment and the start of the other
+    start, end = pd.Timestamp('2024-06-01 18:00'), pd.Timestamp('2024-06-02 06:00')
+    inside = (times >= start.value) & (times < end.value)
+    sliced_times, sliced_values = archive.slice(start, end)
+    np.testing.assert_array_equal(sliced_times, times[inside])
+    np.testing.assert_array_equal(sliced_values, values[inside])
+
+    # open bounds and the index saved on disk give the same rows
+    reopened = Archive(str(tmp_path / 'archive'), 'grimm')
+    np.testing.assert_array_equal(reopened.slice()[0], times)
+
+    # one MST day, after compacting into a single segment
+    reopened.compact()
+    assert len(reopened.segments) == 1
+    day_times, _ = reopened.day('2024-06-01')
+    lo = pd.Timestamp('2024-06-01 07:00').value
+    np.testing.assert_array_equal(day_times, times[(times >= lo) & (times < lo + 86_400 * 10**9)])
+
+
+def test_grown_file_appends_only_new_rows(tmp_path, grimm_archive):
+    archive, read_file = filled_archive(tmp_path, grimm_archive)
+    rows = archive.rows
+
+    # nothing new, then one line later than every row of the last file
+    assert archive.ingest(grimm_archive, read_file) == 0
+    with open(grimm_archive[-1], 'ab') as f:
+        f.write(b'2024-06-04 00:00:00,' + b','.join([b'1'] * 32) + b'\n')
+    assert archive.ingest(grimm_archive, read_file) == 1
+    assert archive.rows == rows + 1
+    assert archive.slice()[0][-1] == pd.Timestamp('2024-06-04').value
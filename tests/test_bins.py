@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# size bin specs and dN/dlogDp normalization
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+import pytest
+
+from quicklook.bins import MOMENT_COLUMNS, BinSpec
+
+
+# three bins from 0.3 to 3 µm, named like the Quant OPC channels
+BINS = pd.DataFrame({'Bin Number': ['bin0', 'bin1', 'bin2', 'bin3'], 'Size (µm)': [0.3, 0.5, 1.0, 3.0]})
+
+
+def test_spec_of_a_bins_table():
+    spec = BinSpec.from_table(BINS, prefix='opc')
+    assert spec.columns == ('opc_bin0', 'opc_bin1', 'opc_bin2')
+    assert np.allclose(spec.dp, [0.4, 0.75, 2.0])
+    assert np.allclose(spec.dlogdp, np.log10([0.5 / 0.3, 2.0, 3.0]))
+    assert list(spec.table()['Dp']) == list(spec.dp)
+    with pytest.raises(ValueError):
+        spec.dp[0] = 1.0
+
+
+def test_normalize_divides_by_dlogdp_and_adds_moments():
+    spec = BinSpec.from_table(BINS, prefix='opc')
+    counts = {'opc_bin0': [1.0, 2.0], 'opc_bin1': [3.0, np.inf], 'opc_bin2': [0.0, 1.0]}
+    df = pd.DataFrame({'timestamp': ['a', 'b'], **{column: np.float32(values) for column, values in counts.items()},
+                       'opc_pm1': [5.0, 6.0]})
+    result = spec.normalize(df)
+
+    # the counts become Dp-named dN/dlogDp columns in place, other columns are kept
+    assert list(result.columns) == ['timestamp', *spec.dp, 'opc_pm1', *MOMENT_COLUMNS]
+    assert np.allclose(result[spec.dp[0]], np.array([1.0, 2.0]) / spec.dlogdp[0])
+    assert result[spec.dp[0]].dtype == np.float32
+
+    # number, surface and volume totals of the raw counts (a non-finite channel is left out)
+    assert np.isclose(result['N_total'][0], 4.0)
+    assert np.isclose(result['N_total'][1], 3.0)
+    assert np.isclose(result['S_total'][0], np.pi * (0.4 ** 2 + 3 * 0.75 ** 2), rtol=1e-6)
+    assert np.isclose(result['V_total'][1], np.pi / 6 * (2 * 0.4 ** 3 + 2.0 ** 3), rtol=1e-6)
+
+
+def test_missing_channels_are_skipped():
+    spec = BinSpec.from_table(BINS, prefix='opc')
+    result = spec.normalize(pd.DataFrame({'opc_bin0': [1.0], 'opc_bin2': [2.0]}), moments=False)
+    assert list(result.columns) == [spec.dp[0], spec.dp[2]]
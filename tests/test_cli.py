@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# settings and the command line
+###############################################################################
+
+# import packages
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+from quicklook import plotting
+from quicklook.cli import main
+from quicklook.config import load_settings
+
+
+# write a config file under tmp_path
+def write_config(tmp_path, config):
+    config_path = str(tmp_path / 'config.json')
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+    return config_path
+
+
+def test_settings_are_layered(tmp_path):
+    config_path = write_config(tmp_path, {'render_workers': 4, 'max_count': 1,
+                                          'sites': {'wbb': {'grimm': {'max_count': 2, 'save_dir': '/plots/wbb'}}}})
+    settings = load_settings('wbb', 'grimm', config_path, render_workers=2, data_dir=None)
+    assert (settings['render_workers'], settings['max_count']) == (2, 2)
+    assert settings['data_dir'] == load_settings('wbb', 'grimm')['data_dir']
+    assert settings['manifest_path'] == os.path.join('/plots/wbb', 'grimm_manifest.json')
+
+
+@pytest.mark.parametrize('site, config, message', [
+    ('wbb', {'render_worker': 4}, 'Unknown setting'),
+    ('wbb', {'sites': {'wbb': {'grimm': {'save_dri': '/plots'}}}}, 'Unknown setting'),
+    ('snowbird', {'sites': {'snowbird': {'grimm': {'title': 'GRIMM_(SNB)'}}}}, 'missing the setting'),
+])
+def test_bad_config_is_rejected(tmp_path, site, config, message):
+    with pytest.raises(ValueError, match=message):
+        load_settings(site, 'grimm', write_config(tmp_path, config))
+
+
+def test_dry_run_prints_the_settings_without_heavy_imports(tmp_path):
+    code = ("import sys; from quicklook.cli import main; "
+            "main(['wbb', 'grimm', '--dry-run', '--start', '2024-06-01', '--output-dir', sys.argv[1]]); "
+            "print('pandas' in sys.modules or 'matplotlib' in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', code, str(tmp_path)], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    settings, _, heavy = output.rpartition('}')
+    settings = json.loads(settings + '}')
+    assert (settings['start'], settings['end'], settings['save_dir']) == ('2024-06-01', None, str(tmp_path))
+    assert heavy.strip() == 'False'
+
+
+@pytest.mark.parametrize('argv', [['wbb', 'quant'], ['wbb', 'grimm', '--start', '2024-13-01', '--dry-run'],
+                                  ['wbb', 'opc']])
+def test_bad_arguments_exit(argv):
+    with pytest.raises(SystemExit) as exit_info:
+        main(argv)
+    assert exit_info.value.code == 2
+
+
+def test_run_from_the_command_line(tmp_path, grimm_archive, monkeypatch):
+    plotted = []
+    monkeypatch.setitem(plotting.RENDERERS, 'contour', lambda *args, profiles: plotted.append(args[3]))
+    argv = ['wbb', 'grimm', '--data-dir', str(tmp_path / 'data'), '--output-dir', str(tmp_path / 'out'),
+            '--start', '2024-06-02']
+    assert main(argv) == 0
+    assert plotted == ['2024-06-02', '2024-06-03']
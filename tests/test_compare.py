@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# GRIMM vs Quant comparison on common bins
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+
+from quicklook import pipeline
+from quicklook.bins import BinSpec
+from quicklook.compare import common_edges, compare, day_arrays, overlap_matrix, rebin
+
+
+# parse and cache every day of an instrument, as a run does before plotting
+def cache_days(settings):
+    daily_data, _, manifest, _ = pipeline.prepare(settings)
+    for _ in daily_data:
+        pass
+    manifest.save()
+
+
+def test_rebin_keeps_the_number_of_particles():
+    source, target = np.array([0.3, 0.5, 1.0, 2.0]), np.array([0.3, 1.0, 2.0])
+    values = np.array([[10.0, 20.0, 40.0]])
+    number = lambda v, edges: (v * np.diff(np.log10(edges))).sum()
+    assert np.isclose(number(rebin(values, overlap_matrix(source, target)), target), number(values, source))
+
+
+def test_missing_bins_are_nan_on_the_bins_they_feed(settings):
+    spec = BinSpec.from_table(pd.DataFrame(settings('alta', 'quant')['bins']))
+    matrix = overlap_matrix(spec.edges, common_edges(spec.edges, spec.edges))
+    times = pd.date_range('2024-06-01 12:00', periods=3, freq='min')
+    day_data = pd.DataFrame({'Time_UTC': times, 'Time_MST': times - pd.Timedelta(hours=7),
+                             **{dp: 1.0 for dp in spec.dp[:-1]}})
+
+    _, _, values = day_arrays(day_data, spec, matrix)
+    assert np.isnan(values[:, -1]).all()
+    assert np.isfinite(values[:, 0]).all()
+
+
+def test_compare_writes_a_row_per_shared_day(settings, grimm_archive, quant_archive, tmp_path):
+    grimm, quant = settings('wbb', 'grimm'), settings('alta', 'quant')
+    cache_days(grimm)
+    cache_days(quant)
+
+    path = str(tmp_path / 'compare')
+    assert compare(grimm, quant, path, plots=()) == {}
+    table = pd.read_csv(f"{path}/{grimm['title']}_vs_{quant['title']}_comparison.csv", dtype={'date': str})
+    assert list(table['date']) == ['2024-05-31', '2024-06-01', '2024-06-02', '2024-06-03']
+    assert (table['pairs'] > 0).all()
+    assert (table['N_a'] > 0).all() and (table['N_b'] > 0).all()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# batch and streamed reads give the same days
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+import pytest
+
+from quicklook import pipeline
+from quicklook.daily import resample_day, split
+
+
+# every (date, day_data) pair of one read, the last one of a date winning
+def read_days(settings, instrument):
+    bins = pd.DataFrame(settings['bins'])
+    read = pipeline.read_grimm_days if instrument == 'grimm' else pipeline.read_quant_days
+    daily_data, _ = read(settings, bins, None, None, None)
+    return {date: day_data.reset_index(drop=True) for date, day_data in daily_data}
+
+
+# check two {date: day_data} dicts hold the same days and values
+def assert_same_days(expected, actual):
+    assert list(actual) == list(expected)
+    for date in expected:
+        pd.testing.assert_frame_equal(actual[date], expected[date], check_dtype=False)
+
+
+@pytest.mark.parametrize('site, instrument, archive', [('wbb', 'grimm', 'grimm_archive'),
+                                                       ('alta', 'quant', 'quant_archive')])
+def test_stream_matches_batch(request, settings, site, instrument, archive):
+    request.getfixturevalue(archive)
+    batch = read_days(settings(site, instrument, streaming=False), instrument)
+    stream = read_days(settings(site, instrument, streaming=True), instrument)
+    assert len(batch) == 4
+    assert_same_days(batch, stream)
+
+
+# a file holding rows from before its first line turns up after that day was
+# handed out: the day is joined again from every file feeding it
+def test_stream_redoes_day_of_unsorted_file(settings, grimm_archive, capsys):
+    first, _, third = grimm_archive[:3]
+    with open(first, 'rb') as f:
+        lines = f.readlines()
+
+    # move the first three UTC hours of 2024-06-01 to the end of a 2024-06-02 file
+    with open(first, 'wb') as f:
+        f.writelines(lines[360:])
+    with open(third, 'ab') as f:
+        f.writelines(lines[:360])
+
+    batch = read_days(settings('wbb', 'grimm', streaming=False), 'grimm')
+    stream = read_days(settings('wbb', 'grimm', streaming=True), 'grimm')
+    assert_same_days(batch, stream)
+    assert len(stream['2024-05-31']) == 7 * 120
+    assert '2024-05-31' in capsys.readouterr().out
+
+
+# a streamed rerun mixes spans read back from the saved file index with the
+# fresh span of a changed file
+def test_stream_rerun_after_a_change(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm', streaming=True)
+    daily_data, _, manifest, _ = pipeline.prepare(grimm, None, None)
+    assert len(list(daily_data)) == 4
+    manifest.save()
+
+    # append a duplicate of the last line of 20240603_0.csv (MST 2024-06-02 and 03)
+    with open(grimm_archive[4], 'rb') as f:
+        last = f.readlines()[-1]
+    with open(grimm_archive[4], 'ab') as f:
+        f.write(last)
+    daily_data, _, _, _ = pipeline.prepare(grimm, None, None)
+    assert [date for date, _ in daily_data] == ['2024-06-02', '2024-06-03']
+
+
+# rows of a few MST times (shuffled, with a day without data and a missing time)
+def mst_rows(times):
+    mst = pd.Series(pd.to_datetime(times))
+    return pd.DataFrame({'Time_MST': mst, 'Time_UTC': mst + pd.Timedelta(hours=7), 1.0: np.arange(len(times))})
+
+
+def test_split_hands_out_days_in_order():
+    df = mst_rows(['2024-06-03 08:00:00', '2024-06-01 23:59:59', None, '2024-06-01 00:00:00', '2024-06-03 00:00:00'])
+    days = list(split(df))
+    assert [date for date, _ in days] == ['2024-06-01', '2024-06-03']
+    assert [list(day_data[1.0]) for _, day_data in days] == [[3, 1], [4, 0]]
+    assert list(split(mst_rows([None]))) == []
+
+
+def test_resample_averages_each_step():
+    day_data = mst_rows(['2024-06-01 00:00:00', '2024-06-01 00:00:30', '2024-06-01 00:01:10', '2024-06-01 00:05:00'])
+    day_data[1.0] = [1.0, 3.0, np.nan, 8.0]
+    day_data[2.0] = [1.0, 1.0, 5.0, 100.0]
+
+    result = resample_day(day_data, '1min')
+    assert list(result.columns) == ['Time_MST', 'Time_UTC', 1.0, 2.0, 'n_samples']
+    assert list(result['Time_MST'].dt.minute) == [0, 1, 5]
+    assert list(result['Time_UTC'] - result['Time_MST']) == [pd.Timedelta(hours=7)] * 3
+    assert list(result[1.0].fillna(-1)) == [2.0, -1, 8.0]
+    assert list(result['n_samples']) == [2, 1, 1]
+    assert list(resample_day(day_data, '10min', 'median')[2.0]) == [3.0]
+
+    with pytest.raises(ValueError, match='Unknown resampling'):
+        resample_day(day_data, '1min', 'max')
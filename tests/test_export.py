@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# export of binned days
+###############################################################################
+
+# import packages
+import numpy as np
+import pytest
+
+from quicklook import pipeline
+from quicklook.export import chunks, exported_days, open_days, read_npz_days, resolve_format
+
+
+# parse, export and return every new day of a run, as run() does before plotting
+def export_days(settings):
+    daily_data, _, manifest, _ = pipeline.prepare(settings)
+    days = dict(daily_data)
+    manifest.save()
+    return days
+
+
+def test_unknown_format_is_rejected():
+    assert resolve_format('npz') == 'npz'
+    with pytest.raises(ValueError, match='Unknown export format'):
+        resolve_format('hdf5')
+
+
+def test_chunks_stay_within_the_day():
+    assert chunks(2880, 32) == (600, 8)
+    assert chunks(10, 3) == (10, 3)
+    assert chunks(0, 0) == (1, 1)
+
+
+def test_npz_days_hold_the_binned_data(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm', export_dir='export', export_format='npz')
+    days = export_days(grimm)
+
+    exported = exported_days(grimm['export_dir'], 'grimm', '2024-06-01', '2024-06-02')
+    assert [(date, day['format'], day['samples']) for date, day, _ in exported] == \
+        [(date, 'npz', len(days[date])) for date in ('2024-06-01', '2024-06-02')]
+
+    time, _, dp, values = read_npz_days(grimm['export_dir'], 'grimm', '2024-06-01', '2024-06-01', dp_max=1.0)
+    day_data = days['2024-06-01']
+    assert (dp <= 1.0).all() and len(dp) > 0
+    assert np.array_equal(time, day_data['Time_UTC'].to_numpy(dtype='datetime64[ns]'))
+    assert np.allclose(values, day_data[list(dp)].to_numpy(dtype=np.float32), equal_nan=True)
+
+
+def test_days_processed_again_replace_their_export(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm', export_dir='export', export_format='npz')
+    export_days(grimm)
+
+    # drop the second half of 20240602_1.csv (MST 2024-06-02 only)
+    with open(grimm_archive[3], 'rb') as f:
+        lines = f.readlines()
+    with open(grimm_archive[3], 'wb') as f:
+        f.writelines(lines[:len(lines) // 2])
+    assert list(export_days(grimm)) == ['2024-06-02']
+
+    samples = {date: day['samples'] for date, day, _ in exported_days(grimm['export_dir'], 'grimm')}
+    assert samples == {'2024-05-31': 840, '2024-06-01': 2880, '2024-06-02': 2880 - len(lines) // 2,
+                       '2024-06-03': 2040}
+
+
+def test_open_days_as_one_dataset(settings, grimm_archive):
+    pytest.importorskip('xarray')
+    grimm = settings('wbb', 'grimm', export_dir='export', export_format='npz')
+    days = export_days(grimm)
+    ds = open_days(grimm['export_dir'], 'grimm', dp_min=1.0)
+    assert ds.sizes['time'] == sum(len(day_data) for day_data in days.values())
+    assert (ds['diameter'] >= 1.0).all()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# file index and --start/--end day windows
+###############################################################################
+
+# import packages
+import datetime as dt
+import os
+import pytest
+
+from quicklook.file_index import FileIndex, day_in_window, file_span, parse_day, span_days, window_years
+
+
+def test_parse_day():
+    assert parse_day(None) is None
+    assert parse_day('2024-06-01') == dt.date(2024, 6, 1)
+    assert parse_day('today') - parse_day('yesterday') == dt.timedelta(days=1)
+    with pytest.raises(ValueError):
+        parse_day('06/01/2024')
+
+
+def test_window_of_days():
+    start, end = dt.date(2024, 6, 1), dt.date(2024, 6, 2)
+    assert [day_in_window(day, start, end) for day in ('2024-05-31', '2024-06-01', '2024-06-02', '2024-06-03')] == \
+        [False, True, True, False]
+    assert day_in_window('2024-05-31', None, end)
+
+    # the last MST day of a year reaches into the next UTC year
+    assert window_years(dt.date(2023, 12, 31), dt.date(2023, 12, 31), [2023, 2024]) == [2023, 2024]
+
+
+def test_span_is_read_from_head_and_tail(grimm_archive):
+    # 20240601_0.csv holds 2024-06-01 00:00:00-11:59:30 UTC (30 s cadence)
+    first, last = file_span(grimm_archive[0])
+    assert dt.datetime.fromtimestamp(first, dt.timezone.utc) == dt.datetime(2024, 6, 1, tzinfo=dt.timezone.utc)
+    assert last - first == 12 * 3600 - 30
+    assert span_days((first, last)) == ['2024-05-31', '2024-06-01']
+
+
+def test_select_files_of_a_window(tmp_path, grimm_archive):
+    index = FileIndex(str(tmp_path / 'index.json'))
+    selected = index.select(grimm_archive, dt.date(2024, 6, 3), None)
+    assert [os.path.basename(path) for path in selected] == ['20240603_0.csv', '20240603_1.csv']
+
+    # a later run reads the spans back; a changed file is looked up again
+    with open(grimm_archive[-1], 'a') as f:
+        f.write('2024-06-04 07:30:00' + ',1' * 32 + '\n')
+    index = FileIndex(str(tmp_path / 'index.json'))
+    selected = index.select(grimm_archive, dt.date(2024, 6, 4), None)
+    assert [os.path.basename(path) for path in selected] == ['20240603_1.csv']
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# incremental runs: manifest and cache invalidation
+###############################################################################
+
+# import packages
+import os
+
+from quicklook import pipeline
+from quicklook.file_index import parse_day
+
+
+# dates prepared by one run, saving the manifest as run() does once they are plotted
+def prepare_days(settings, start=None, end=None):
+    daily_data, _, manifest, _ = pipeline.prepare(settings, start, end)
+    dates = [date for date, _ in daily_data]
+    manifest.save()
+    return dates
+
+
+# append a copy of a file's last line (a duplicate time stamp, so the day's data stays the same)
+def touch_contents(file_path):
+    with open(file_path, 'rb') as f:
+        last = f.readlines()[-1]
+    with open(file_path, 'ab') as f:
+        f.write(last)
+
+
+def test_only_changed_days_are_redone(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm')
+    assert prepare_days(grimm) == ['2024-05-31', '2024-06-01', '2024-06-02', '2024-06-03']
+    assert prepare_days(grimm) == []
+
+    # a touched file with the same contents is not read again
+    os.utime(grimm_archive[0])
+    assert prepare_days(grimm) == []
+
+    # 20240603_0.csv covers 2024-06-03 00:00-12:00 UTC: MST 2024-06-02 and 03
+    touch_contents(grimm_archive[4])
+    assert prepare_days(grimm) == ['2024-06-02', '2024-06-03']
+
+    # the days a deleted file fed are redone without it
+    os.remove(grimm_archive[4])
+    assert prepare_days(grimm) == ['2024-06-02', '2024-06-03']
+
+
+def test_settings_change_redoes_everything(settings, grimm_archive):
+    prepare_days(settings('wbb', 'grimm'))
+    assert len(prepare_days(settings('wbb', 'grimm', duplicate_policy='last'))) == 4
+    assert prepare_days(settings('wbb', 'grimm', duplicate_policy='last')) == []
+
+
+def test_unreadable_manifest_means_a_full_run(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm')
+    prepare_days(grimm)
+    with open(grimm['manifest_path'], 'r+') as f:
+        f.truncate(100)
+    assert len(prepare_days(grimm)) == 4
+
+def test_window_is_served_from_the_cache(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm')
+    prepare_days(grimm)
+    dates = prepare_days(grimm, parse_day('2024-06-01'), parse_day('2024-06-02'))
+    assert dates == ['2024-06-01', '2024-06-02']
+
+    # a stale cached day is read from the csv files again
+    touch_contents(grimm_archive[3])
+    dates = prepare_days(grimm, parse_day('2024-06-02'), parse_day('2024-06-02'))
+    assert dates == ['2024-06-02']
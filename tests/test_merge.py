@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# merging files and resolving duplicate time stamps
+###############################################################################
+
+# import packages
+import pandas as pd
+import pytest
+
+from quicklook.merge import merge_runs
+
+
+# one file's rows: time stamps (minutes after midnight, None = NaT) and values
+def run(minutes, values):
+    times = [pd.Timestamp('2024-06-01') + pd.Timedelta(minutes=m) if m is not None else pd.NaT for m in minutes]
+    return pd.DataFrame({'time': pd.to_datetime(times), 'value': [float(v) for v in values]})
+
+
+# 'b' sorts after 'a', so 'a' is the first file whatever order they come in
+RUNS = [run([3, 4], [30, 40]), run([2, 1, 3, None], [2, 1, 3, 0])]
+NAMES = ['b', 'a']
+
+
+@pytest.mark.parametrize('duplicates, values', [('first', [1, 2, 3, 40, 0]),
+                                                ('last', [1, 2, 30, 40, 0]),
+                                                ('mean', [1, 2, 16.5, 40, 0]),
+                                                ('keep', [1, 2, 3, 30, 40, 0])])
+def test_duplicate_policies(duplicates, values):
+    merged, overlaps = merge_runs(RUNS, 'time', duplicates, names=NAMES)
+    assert merged['value'].tolist() == values
+    assert merged['time'].iloc[:-1].is_monotonic_increasing
+    assert merged['time'].iloc[-1] is pd.NaT
+    assert [(o['file'], o['other'], o['shared']) for o in overlaps] == [('a', 'b', 1)]
+
+
+def test_duplicates_within_a_file():
+    merged, overlaps = merge_runs([run([1, 1, 2], [1, 5, 2])], 'time', 'mean')
+    assert merged['value'].tolist() == [3, 2]
+    assert overlaps == []
+
+
+def test_files_following_each_other():
+    merged, overlaps = merge_runs([run([3, 4], [3, 4]), run([1, 2], [1, 2])], 'time', names=['b', 'a'])
+    assert merged['value'].tolist() == [1, 2, 3, 4]
+    assert overlaps == []
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        merge_runs(RUNS, 'time', 'newest')
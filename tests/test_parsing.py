@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# typed csv parsing and time stamps
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+import pytest
+
+from quicklook.grimm import read_grimm_file
+from quicklook.parsing import (GRIMM_CHANNELS, QUANT_PRODUCTS, QUANT_TIME_COLUMN, detect_format, mst_days,
+                               parse_times, quant_dtypes, quant_usecols, resolve_engine)
+from quicklook.quant import read_quant_file
+
+
+def test_grimm_counts_are_float32(tmp_path, grimm_archive):
+    df = read_grimm_file(grimm_archive[0], str(tmp_path / 'out'), 'GRIMM')
+    assert list(df.columns) == list(range(GRIMM_CHANNELS + 1))
+    assert pd.api.types.is_datetime64_any_dtype(df[0])
+    assert (df.dtypes[1:] == np.float32).all()
+
+
+def test_quant_loads_only_the_product_columns(quant_archive):
+    df = read_quant_file(quant_archive[0], usecols=quant_usecols(['neph']), dtypes=quant_dtypes(['neph']))
+    assert set(df.columns) == {QUANT_TIME_COLUMN, *QUANT_PRODUCTS['neph']}
+    assert (df[QUANT_PRODUCTS['neph']].dtypes == np.float32).all()
+
+
+def test_unknown_engine_is_rejected():
+    assert resolve_engine('c') == 'c'
+    assert resolve_engine('pyarrow') in ('c', 'pyarrow')
+    with pytest.raises(ValueError, match='Unknown csv engine'):
+        resolve_engine('python')
+
+
+@pytest.mark.parametrize('stamps, time_format, first', [
+    (['2024-06-01 00:00:06', '2024-06-01 00:00:12'], '%Y-%m-%d %H:%M:%S', '2024-06-01 00:00:06'),
+    (['2024-06-01T00:00:06Z', '2024-06-01T00:00:12Z'], '%Y-%m-%dT%H:%M:%SZ', '2024-06-01 00:00:06'),
+    (['06/01/2024 00:00', '06/01/2024 00:01'], '%m/%d/%Y %H:%M', '2024-06-01 00:00'),
+])
+def test_format_is_detected_from_a_sample(stamps, time_format, first):
+    assert detect_format(pd.Series(stamps)) == time_format
+    assert parse_times(pd.Series(stamps))[0] == pd.Timestamp(first)
+
+
+def test_rows_off_the_format_are_still_parsed():
+    times = parse_times(pd.Series(['2024-06-01 00:00:06', '2024-06-01 00:00:12.5', None]))
+    assert list(times[:2]) == [pd.Timestamp('2024-06-01 00:00:06'), pd.Timestamp('2024-06-01 00:00:12.5')]
+    assert pd.isna(times[2])
+    with pytest.raises(ValueError):
+        parse_times(pd.Series(['2024-06-01 00:00:06', 'not a time']))
+    assert parse_times(pd.Series(['2024-06-01 00:00:06', 'not a time']), errors='coerce').isna().sum() == 1
+
+
+def test_parsed_times_are_passed_through():
+    times = parse_times(pd.Series(['2024-06-01 06:59:59', '2024-06-01 07:00:00']))
+    assert parse_times(times) is times
+    assert str(parse_times(times, utc=True).dt.tz) == 'UTC'
+    assert mst_days(times) == {'2024-05-31', '2024-06-01'}
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# batch runs: plotting, failures and reruns
+###############################################################################
+
+# import packages
+from quicklook import pipeline, plotting
+
+
+# a renderer that draws nothing, records the days it was given and fails on the days in broken
+def fake_renderer(plotted, broken):
+    def render(time_mst, dp, count, date, *args, profiles=('archival',)):
+        plotted.append(date)
+        if date in broken:
+            raise OSError('disk full')
+    return render
+
+
+def test_failed_day_is_retried(settings, grimm_archive, monkeypatch):
+    plotted, broken = [], {'2024-06-01'}
+    monkeypatch.setitem(plotting.RENDERERS, 'contour', fake_renderer(plotted, broken))
+    grimm = settings('wbb', 'grimm')
+
+    failures = pipeline.run(grimm)
+    assert list(failures) == ['2024-06-01']
+    assert plotted == ['2024-05-31', '2024-06-01', '2024-06-02', '2024-06-03']
+
+    # the next run redoes only the failed day, and once it is plotted nothing is left
+    broken.clear()
+    plotted.clear()
+    assert pipeline.run(grimm) == {}
+    assert plotted == ['2024-06-01']
+    plotted.clear()
+    pipeline.run(grimm)
+    assert plotted == []
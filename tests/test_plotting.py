@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# daily size distribution plots
+###############################################################################
+
+# import packages
+import os
+import pandas as pd
+import pytest
+from matplotlib.image import imread
+
+from quicklook import pipeline
+from quicklook.outputs import OutputIndex
+from quicklook.plotting import output_path, plot_size_dist, process_daily_data, resolve_profiles
+
+
+# binned GRIMM days {date: day_data} and the bins table of the plots
+@pytest.fixture
+def grimm_days(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm')
+    daily_data, plot_bins = pipeline.read_grimm_days(grimm, pd.DataFrame(grimm['bins']), None, None, None)
+    return dict(daily_data), plot_bins
+
+
+# png of one day of a plot directory
+def png_path(days, date, path, title='GRIMM'):
+    return output_path(days[date]['Time_MST'].to_numpy(), date, path, title)
+
+
+@pytest.mark.parametrize('renderer', ['contour', 'raster'])
+def test_renderers_write_one_png_per_day(tmp_path, grimm_days, renderer):
+    days, bins = grimm_days
+    path = str(tmp_path / 'plots')
+    for date in ('2024-06-01', '2024-06-02'):
+        plot_size_dist(days[date], date, bins, 0, 60000, path, 'GRIMM', renderer, profiles='thumbnail')
+
+    # the raster renderer redraws one template, so every day has the same size
+    first, second = (imread(png_path(days, date, os.path.join(path, 'thumbnails')))
+                     for date in ('2024-06-01', '2024-06-02'))
+    assert first.shape == second.shape
+    assert first.std() > 0
+
+
+def test_profiles_must_be_known_and_apart():
+    assert resolve_profiles('preview') == ('preview',)
+    with pytest.raises(ValueError, match='Unknown quality profile'):
+        resolve_profiles(['archival', 'poster'])
+    with pytest.raises(ValueError, match='different directories'):
+        resolve_profiles(['preview', 'preview'])
+
+
+def test_unchanged_plots_are_skipped(tmp_path, grimm_days, capsys):
+    days, bins = grimm_days
+    days = {date: days[date] for date in ('2024-06-01', '2024-06-02')}
+    path, index_path = str(tmp_path / 'plots'), str(tmp_path / 'outputs.json')
+
+    def plot(days, max_count=60000):
+        return process_daily_data(days, bins, 0, max_count, path, 'GRIMM', profiles=('preview', 'thumbnail'),
+                                  outputs=OutputIndex(index_path))
+
+    # every profile writes to its own directory
+    assert plot(days) == {}
+    pngs = [png_path(days, date, os.path.join(path, directory)) for date in days
+            for directory in ('preview', 'thumbnails')]
+    written = [os.path.getmtime(png) for png in pngs]
+
+    # nothing changed: nothing is drawn again
+    capsys.readouterr()
+    plot(days)
+    assert 'Skipped 2 unchanged plots' in capsys.readouterr().out
+    assert [os.path.getmtime(png) for png in pngs] == written
+
+    # a missing png, new data or new settings are drawn again
+    os.remove(pngs[0])
+    plot(days)
+    assert 'Skipped 1 unchanged plots' in capsys.readouterr().out
+    days['2024-06-02'] = days['2024-06-02'].iloc[:100]
+    plot(days)
+    assert 'Skipped 1 unchanged plots' in capsys.readouterr().out
+    plot(days, max_count=1000)
+    assert 'Skipped' not in capsys.readouterr().out
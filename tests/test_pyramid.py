@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# multi-resolution aggregate pyramid
+###############################################################################
+
+# import packages
+import datetime as dt
+import numpy as np
+import pandas as pd
+import pytest
+
+from quicklook import pipeline
+from quicklook.pyramid import Pyramid, period_of
+
+
+# binned GRIMM days {date: day_data}
+def grimm_days(settings):
+    grimm = settings('wbb', 'grimm')
+    daily_data, _ = pipeline.read_grimm_days(grimm, pd.DataFrame(grimm['bins']), None, None, None)
+    return dict(daily_data)
+
+
+def test_periods_of_a_date():
+    assert period_of('week', '2024-06-01') == (dt.date(2024, 5, 27), dt.date(2024, 6, 2), '2024-W22')
+    assert period_of('month', '2024-02-10') == (dt.date(2024, 2, 1), dt.date(2024, 2, 29), '2024-02')
+    assert period_of('season', '2024-01-15') == (dt.date(2023, 12, 1), dt.date(2024, 2, 29), '2024-DJF')
+    assert period_of('season', '2024-06-01') == (dt.date(2024, 6, 1), dt.date(2024, 8, 31), '2024-JJA')
+    with pytest.raises(ValueError, match='Unknown period'):
+        period_of('year', '2024-06-01')
+
+
+def test_levels_hold_the_means_of_every_stored_day(tmp_path, settings, grimm_archive):
+    days = grimm_days(settings)
+    pyramid = Pyramid(str(tmp_path / 'pyramid'), 'grimm', 'key', levels=('1h', '1D'))
+    for _ in pyramid.store_days(days):
+        pass
+    assert pyramid.updated_days == set(days)
+
+    # hourly means over the week on a regular grid; the hours without data are NaN
+    first, last = dt.date(2024, 5, 31), dt.date(2024, 6, 3)
+    assert pyramid.choose_level(first, last, max_columns=100) == '1h'
+    grid, dp, values, n_samples = pyramid.read('1h', first, last)
+    assert len(grid) == 4 * 24 and values.shape == (4 * 24, len(dp))
+    assert n_samples.sum() == sum(len(day_data) for day_data in days.values())
+    noon = days['2024-06-01'].set_index('Time_MST').loc['2024-06-01 12:00':'2024-06-01 12:59:59', dp[0]]
+    assert np.isclose(values[24 + 12, 0], noon.mean(), rtol=1e-5)
+    assert np.isnan(values[:17]).all()
+
+    # storing a day again replaces its rows; other settings see an empty pyramid
+    pyramid = Pyramid(str(tmp_path / 'pyramid'), 'grimm', 'key', levels=('1h', '1D'))
+    for _ in pyramid.store_days({'2024-06-01': days['2024-06-01'].iloc[:120]}):
+        pass
+    assert pyramid.read('1D', first, last)[3].tolist() == [len(days['2024-05-31']), 120] + \
+        [len(days[date]) for date in ('2024-06-02', '2024-06-03')]
+    assert Pyramid(str(tmp_path / 'pyramid'), 'grimm', 'other', levels=('1h', '1D')).read('1h', first, last) is None
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# data-quality scan and report
+###############################################################################
+
+# import packages
+import json
+import numpy as np
+
+from quicklook import pipeline
+from quicklook.qc import scan_arrays
+
+
+# parse and check every new day of a run, as run() does before plotting
+def check_days(settings):
+    daily_data, _, manifest, _ = pipeline.prepare(settings)
+    for _ in daily_data:
+        pass
+    manifest.save()
+
+
+def test_scan_finds_time_and_count_issues():
+    seconds = np.array([0, 6, 12, 12, 6, 60, 66], dtype=np.int64)
+    counts = np.array([[1, 2], [1, -2], [1, np.nan], [1, 2], [1, 2], [1, 2], [1, 2]], dtype=np.float32)
+    findings = scan_arrays(seconds * 10 ** 9, counts, ['a', 'b'])
+    assert findings['rows'] == 7
+    assert findings['duplicate_times'] == 2
+    assert findings['non_monotonic'] == 1
+    assert findings['cadence_seconds'] == 6
+    assert findings['gaps'] == 1
+    assert findings['negative_counts'] == {'b': 1}
+    assert findings['nan_counts'] == {'b': 1}
+
+
+def test_rerun_keeps_the_findings_of_earlier_runs(settings, grimm_archive):
+    grimm = settings('wbb', 'grimm', qc_path='{instrument}_qc.json')
+    check_days(grimm)
+    with open(grimm['qc_path'], 'r') as f:
+        first = json.load(f)
+    assert len(first['files']) == 6
+    assert list(first['days']) == ['2024-05-31', '2024-06-01', '2024-06-02', '2024-06-03']
+
+    # nothing new: the report is left as it was
+    check_days(grimm)
+    with open(grimm['qc_path'], 'r') as f:
+        again = json.load(f)
+    assert again['files'] == first['files'] and again['days'] == first['days']
+    assert again['totals'] == first['totals']
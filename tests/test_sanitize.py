@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# null bytes stripped while files are read
+###############################################################################
+
+# import packages
+import glob
+import io
+import os
+import pandas as pd
+
+from benchmarks.synthetic import write_grimm_archive
+from quicklook.grimm import read_grimm_file
+from quicklook.sanitize import NulStripper
+
+
+def test_stripper_counts_bytes_and_lines_across_reads():
+    text = b'2024-06-01 00:00\x00\x00:00,1\n2024-06-01 00:00:06,2\n\x00\x00\x00\x00\n2024-06-01\x00 00:00:12,3\n'
+    stripper = NulStripper(io.BytesIO(text))
+
+    # a 4-byte buffer splits lines and gives a chunk made only of null bytes
+    stream = io.BufferedReader(stripper, 4)
+    assert stream.read() == text.replace(b'\x00', b'')
+    assert stripper.nul_bytes == 7
+    assert stripper.nul_lines == 3
+
+
+def test_corrupted_file_parses_like_a_clean_one(tmp_path):
+    clean, = write_grimm_archive(str(tmp_path / 'clean'), cadence='60s')
+    corrupted, = write_grimm_archive(str(tmp_path / 'corrupted'), cadence='60s', nul_fraction=0.05)
+    save_dir = str(tmp_path / 'out')
+
+    expected = read_grimm_file(clean, save_dir, 'GRIMM')
+    actual = read_grimm_file(corrupted, save_dir, 'GRIMM')
+    pd.testing.assert_frame_equal(actual, expected, check_like=True)
+    assert actual.attrs['nul_bytes'] > 0 and actual.attrs['nul_lines'] > 0
+
+    # the corrupted file (only) gets an error report
+    reports = glob.glob(os.path.join(save_dir, '*_error.txt'))
+    assert [os.path.basename(path) for path in reports] == ['2024-06-01_GRIMM_20240601_error.txt']
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# batch scheduler: several jobs on one pool
+###############################################################################
+
+# import packages
+from quicklook import plotting, scheduler
+
+
+# a renderer that draws nothing and fails on 2024-06-01 while the broken file exists
+def failing_renderer(broken):
+    def render(time_mst, dp, count, date, *args, profiles=('archival',)):
+        if date == '2024-06-01' and broken.exists():
+            raise OSError('disk full')
+    return render
+
+
+def test_jobs_plot_every_day_and_retry_failures(settings, grimm_archive, quant_archive, monkeypatch, tmp_path):
+    broken = tmp_path / 'broken'
+    broken.touch()
+    monkeypatch.setitem(plotting.RENDERERS, 'contour', failing_renderer(broken))
+    jobs = [settings('wbb', 'grimm'), settings('alta', 'quant')]
+
+    results = scheduler.run_jobs(jobs, workers=2)
+    for job in results.values():
+        assert job.error is None
+        assert job.plotted == 3
+        assert list(job.failures) == ['2024-06-01']
+
+    # the failed days are pending in the saved manifests, so the next run redoes only them
+    broken.unlink()
+    results = scheduler.run_jobs(jobs, workers=2)
+    assert [(job.plotted, job.failures) for job in results.values()] == [(1, {}), (1, {})]
+    results = scheduler.run_jobs(jobs, workers=2)
+    assert [job.queued for job in results.values()] == [0, 0]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# daily and hourly summary tables
+###############################################################################
+
+# import packages
+import numpy as np
+import pandas as pd
+import pytest
+
+from quicklook.summary import SummaryTable
+
+
+# bins table of the plots: a fine (0.5 µm) and a coarse (2 µm) bin
+BINS = pd.DataFrame({'Dp': [0.5, 2.0], 'dlogDp': [0.5, 0.25]})
+
+
+# one day of four samples in two hours, dN/dlogDp of both bins (the last fine value missing)
+def day_data(date='2024-06-01', fine=(10.0, 20.0, 30.0, np.nan)):
+    mst = pd.to_datetime([f'{date} 00:00:00', f'{date} 00:00:10', f'{date} 01:00:00', f'{date} 01:00:10'])
+    return pd.DataFrame({'Time_MST': mst, 0.5: fine, 2.0: [1.0] * 4})
+
+
+# a value as read back from a table (csv tables keep 6 significant digits)
+def approx(value):
+    return pytest.approx(value, rel=1e-5)
+
+
+# write the tables of some days and read one back
+def summarize(path, days, product='daily'):
+    summary = SummaryTable(str(path), 'grimm', BINS)
+    for _ in summary.store_days(days):
+        pass
+    return summary.read(product)
+
+
+def test_daily_row_of_one_day(tmp_path):
+    daily = summarize(tmp_path, {'2024-06-01': day_data()})
+    row = daily.iloc[0]
+    assert row['date'] == '2024-06-01'
+    assert row['n_samples'] == 4
+    assert row['N_mean'] == approx(31 / 4)
+    assert row['N_max'] == approx(15.25)
+    assert row['fine_fraction'] == approx(30 / 31)
+    assert row['coarse_fraction'] == approx(1 / 31)
+    assert (row['max_dNdlogDp'], row['Dp_at_max']) == (30.0, 0.5)
+    assert row['coverage'] == approx(40 / 86400)
+
+
+def test_hourly_rows(tmp_path):
+    hourly = summarize(tmp_path, {'2024-06-01': day_data()}, 'hourly')
+    assert list(hourly['time'].dt.hour) == [0, 1]
+    assert list(hourly['n_samples']) == [2, 2]
+    assert list(hourly['N_max']) == approx([10.25, 15.25])
+
+
+def test_days_summarized_again_replace_their_rows(tmp_path):
+    summarize(tmp_path, {'2024-06-01': day_data(), '2024-06-02': day_data('2024-06-02')})
+    daily = summarize(tmp_path, {'2024-06-01': day_data(fine=(0.0, 0.0, 0.0, 0.0))})
+    assert list(daily['date']) == ['2024-06-01', '2024-06-02']
+    assert list(daily['fine_fraction']) == approx([0.0, 30 / 31])
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# following growing csv files
+###############################################################################
+
+# import packages
+import pandas as pd
+
+from quicklook.tail import FileTail
+
+
+# headerless rows parsed the way the GRIMM files are
+def read_rows(stream):
+    return pd.read_csv(stream, header=None)
+
+
+# append bytes to a file
+def append(file_path, data):
+    with open(file_path, 'ab') as f:
+        f.write(data)
+
+
+def test_partial_lines_wait_for_the_next_read(tmp_path):
+    file_path = str(tmp_path / 'today.csv')
+    tail = FileTail()
+    append(file_path, b'2024-06-01 00:00:00,1\n2024-06-01 00:00:06,')
+    assert tail.read_new(file_path) == b'2024-06-01 00:00:00,1\n'
+    assert tail.read_new(file_path) is None
+
+    # the rest of the line (with the null bytes the logger leaves) completes it
+    append(file_path, b'2\x00\x00\n2024-06-01')
+    assert tail.read_new(file_path) == b'2024-06-01 00:00:06,2\n'
+
+
+def test_header_goes_in_front_of_every_read(tmp_path):
+    file_path = str(tmp_path / 'today.csv')
+    tail = FileTail(header=True, time_column='timestamp')
+    append(file_path, b'timestamp,count\n')
+    assert tail.read_new(file_path) is None
+    append(file_path, b'2024-06-01 00:00:00,1\n')
+    assert tail.read_new(file_path) == b'timestamp,count\n2024-06-01 00:00:00,1\n'
+    append(file_path, b'2024-06-01 00:01:00,2\n')
+    assert tail.read_new(file_path) == b'timestamp,count\n2024-06-01 00:01:00,2\n'
+
+
+def test_truncated_file_is_read_again_without_old_rows(tmp_path):
+    file_path = str(tmp_path / 'today.csv')
+    tail = FileTail()
+    append(file_path, b'2024-06-01 00:00:00,1\n2024-06-01 00:00:06,2\n')
+    assert tail.read_frame(file_path, read_rows)[1].tolist() == [1, 2]
+
+    # blank lines are not rows
+    append(file_path, b'\n')
+    assert tail.read_frame(file_path, read_rows) is None
+
+    # replaced by a shorter file: rows up to the last time seen are skipped
+    with open(file_path, 'wb') as f:
+        f.write(b'2024-06-01 00:00:06,2\n2024-06-01 00:00:12,3\n')
+    df = tail.read_frame(file_path, read_rows)
+    assert df[1].tolist() == [3]
+    assert df[0].iloc[0] == pd.Timestamp('2024-06-01 00:00:12')
+
+    # a file cut back to rows seen before gives nothing
+    with open(file_path, 'wb') as f:
+        f.write(b'2024-06-01 00:00:06,2\n')
+    assert tail.read_frame(file_path, read_rows) is None
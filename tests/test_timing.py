@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+###############################################################################
+#%%# stage timing and run reports
+###############################################################################
+
+# import packages
+import csv
+import json
+import pytest
+
+from quicklook import pipeline, timing
+
+
+def test_stages_are_recorded_and_totalled():
+    report = timing.RunReport()
+    for item, rows in (('a.csv', 10), ('b.csv', 5)):
+        with report.stage('read', item, rows=rows):
+            pass
+    with report.stage('plot', '2024-06-01') as record:
+        record['rows'] = 3
+
+    # a failing stage keeps its error and the exception goes on
+    with pytest.raises(KeyError):
+        with report.stage('plot', '2024-06-02'):
+            raise KeyError('Dp')
+
+    totals = report.totals()
+    assert list(totals) == ['read', 'plot']
+    assert (totals['read']['calls'], totals['read']['rows']) == (2, 15)
+    assert (totals['plot']['calls'], totals['plot']['rows']) == (2, 3)
+    assert report.slowest('plot', 5)[0]['stage'] == 'plot'
+    assert [record.get('error') for record in report.records] == [None, None, None, "KeyError('Dp')"]
+
+
+@pytest.mark.parametrize('name', ['report.json', 'report.csv'])
+def test_report_is_written_as_json_or_csv(tmp_path, name):
+    report = timing.RunReport()
+    with report.stage('read', 'a.csv', rows=10) as record:
+        record['nul_bytes'] = 2
+    path = str(tmp_path / 'reports' / name)
+    report.write(path)
+
+    with open(path, 'r') as f:
+        if name.endswith('.json'):
+            records = json.load(f)['records']
+        else:
+            records = list(csv.DictReader(f))
+    records = [(record['stage'], record['item'], str(record['nul_bytes'])) for record in records]
+    assert records == [('read', 'a.csv', '2')]
+
+
+def test_reading_an_archive_times_every_file(settings, grimm_archive):
+    report = timing.reset()
+    daily_data, _, _, _ = pipeline.prepare(settings('wbb', 'grimm'))
+    for _ in daily_data:
+        pass
+    stages = report.totals()
+    assert stages['read']['calls'] == len(grimm_archive)
+    assert stages['read']['rows'] == 3 * 2880